@@ -0,0 +1,441 @@
+#!/usr/bin/env python
+"""Offline benchmarks: the full crew against the local fake LLM provider and Serper endpoint.
+
+No Groq or Serper quota is used. Results are written as JSON so runs can be compared between commits:
+
+    uv run python benchmarks/run_benchmarks.py --runs 5 --batch-size 8
+    uv run python benchmarks/run_benchmarks.py --compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+# Metrics shown by --compare, as (section, metric, statistic); None when the metric is a plain number.
+COMPARED_METRICS = [
+    ("single", "latency_seconds", "p50"),
+    ("single", "latency_seconds", "p95"),
+    ("single", "tokens_per_run", "mean"),
+    ("single", "prompt_tokens_per_run", "mean"),
+    ("single", "cached_prompt_tokens_per_run", "mean"),
+    ("single", "requests_per_run", "mean"),
+    ("single", "admission_wait_seconds", "p95"),
+    ("batch", "latency_seconds", "p95"),
+    ("batch", "plans_per_minute", None),
+    ("startup", "import_main_ms", "p50"),
+    ("startup", "import_crew_ms", "p50"),
+    ("startup", "cli_help_ms", "p50"),
+    ("startup", "quota_rejected_ms", "p50"),
+    ("library", "lookup_ms", "p50"),
+    ("library", "lookup_ms", "p99"),
+]
+# Cold-start cases, each timed in a fresh interpreter: imports, and CLI runs that never reach a kickoff.
+STARTUP_CASES = {
+    "import_main_ms": (["-c", "import bot.main"], {}),
+    "import_crew_ms": (["-c", "import bot.crew"], {}),
+    "cli_help_ms": (["-m", "bot.main", "--help"], {}),
+    "quota_rejected_ms": (["-m", "bot.main", "--destination", "Porto"], {"LLM_DAILY_TOKEN_LIMIT": "1"}),
+}
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline crew benchmarks against fake LLM and Serper backends")
+    parser.add_argument("--runs", type=int, default=5, help="sequential single-trip runs")
+    parser.add_argument("--batch-size", type=int, default=8, help="trips in the batch throughput run (0 skips it)")
+    parser.add_argument("--concurrency", type=int, default=4, help="batch concurrency")
+    parser.add_argument("--days", type=int, default=5, help="trip length in days")
+    parser.add_argument("--keys", type=int, default=2, help="API keys in the pool")
+    parser.add_argument("--latency-ms", type=float, default=200, help="fake LLM latency per call")
+    parser.add_argument("--search-latency-ms", type=float, default=100, help="fake Serper latency per search")
+    parser.add_argument("--completion-tokens", type=int, default=0, help="reported completion tokens per call (0: from the answer)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of LLM calls answered with an injected 429")
+    parser.add_argument("--search-error-rate", type=float, default=0.0, help="fraction of searches answered with a 429")
+    parser.add_argument("--rpm", type=int, default=30, help="fake provider requests per minute per key")
+    parser.add_argument("--tpm", type=int, default=6000, help="fake provider tokens per minute per key")
+    parser.add_argument("--startup-runs", type=int, default=5, help="cold starts per startup case (0 skips them)")
+    parser.add_argument("--library-plans", type=int, default=20000, help="stored plans for the plan library lookup benchmark (0 skips it)")
+    parser.add_argument("--port", type=int, default=8199)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two results files and exit")
+    return parser.parse_args()
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# Point the bot at the fake backends, with every cache and ledger in a throwaway directory.
+def _configure(args: argparse.Namespace, workdir: Path) -> None:
+    base_url = f"http://127.0.0.1:{args.port}"
+    os.environ.update(
+        {
+            "FAKE_PROVIDER_RPM": str(args.rpm),
+            "FAKE_PROVIDER_TPM": str(args.tpm),
+            "FAKE_PROVIDER_LATENCY_MS": str(args.latency_ms),
+            "FAKE_PROVIDER_COMPLETION_TOKENS": str(args.completion_tokens),
+            "FAKE_PROVIDER_429_RATE": str(args.error_rate),
+            "FAKE_SERPER_LATENCY_MS": str(args.search_latency_ms),
+            "FAKE_SERPER_429_RATE": str(args.search_error_rate),
+            "MODEL": "openai/fake-model",
+            "LLM_API_BASE": f"{base_url}/v1",
+            "GROQ_API_KEYS": ",".join(f"bench-key-{index}" for index in range(1, args.keys + 1)),
+            "LLM_PROVIDER_TPM_CAP": str(args.tpm),
+            "LLM_RPM_LIMIT": str(args.rpm),
+            "SERPER_API_KEY": "bench",
+            "SERPER_BASE_URL": base_url,
+            "SERPER_OFFLINE": "0",
+            "SERPER_CACHE_PATH": str(workdir / "cache" / "serper.sqlite"),
+            "LLM_CACHE": "0",
+            "TASK_MEMO": "0",
+            # Runs differ only by budget, so the library would answer them instead of the crew.
+            "PLAN_LIBRARY": "0",
+            "PLAN_LIBRARY_PATH": str(workdir / "cache" / "plans.sqlite"),
+            "LLM_QUOTA_DB": str(workdir / "logs" / "quota.sqlite"),
+            "TOKEN_CALIBRATION_PATH": str(workdir / "cache" / "token_calibration.sqlite"),
+            "CHECKPOINT_DIR": str(workdir / "checkpoints"),
+            "LOG_DIR": str(workdir / "logs"),
+            "TRACE_PATH": str(workdir / "logs" / "traces.jsonl"),
+            "CREWAI_DISABLE_TELEMETRY": "true",
+            # CrewAI's first-run "view execution traces?" prompt would block the run and skew its latency;
+            # CrewAI 1.9 only skips that prompt when CREWAI_TESTING is set as well.
+            "CREWAI_TRACING_ENABLED": "false",
+            "CREWAI_TESTING": "true",
+            "OTEL_SDK_DISABLED": "true",
+        }
+    )
+
+
+def _start_fake_backends(port: int):
+    import uvicorn
+
+    from bot.fake_provider import create_app
+
+    server = uvicorn.Server(uvicorn.Config(create_app(), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise Exception(f"Fake backends did not start on port {port}.")
+        time.sleep(0.05)
+    return server
+
+
+# Nearest-rank percentiles plus mean/max of a sample.
+def _summary(values: list[float]) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(percent: float) -> float:
+        return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+    return {
+        "n": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 3),
+        "p50": round(rank(50), 3),
+        "p90": round(rank(90), 3),
+        "p95": round(rank(95), 3),
+        "p99": round(rank(99), 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+# Limiter wait and 429 totals across every pooled key.
+def _limiter_totals() -> dict:
+    from bot.main import _credential_pool
+
+    keys = _credential_pool().snapshot().values()
+    return {
+        "throttled_seconds": sum(key["throttled_seconds"] for key in keys),
+        "rate_limited": sum(key["rate_limited"] for key in keys),
+    }
+
+
+def _inputs(index: int, days: int) -> dict:
+    from bot.main import _build_inputs_from_record
+
+    record = {
+        "request_id": f"bench-{index}",
+        "destination": "Porto, Portugal",
+        "travel_dates": f"2026-05-01 to 2026-05-{days:02d}",
+        # A distinct budget per run keeps prompts unique, like real traffic.
+        "budget": 1200 + index,
+    }
+    return _build_inputs_from_record(record, record["request_id"])
+
+
+# One end-to-end CLI-style run: admission check, crew kickoff with retries, usage extraction.
+def _single_run(index: int, days: int) -> dict:
+    from bot.crew import Bot
+    from bot.main import _check_daily_quota, _credential_pool, _extract_token_usage, _kickoff_with_backoff
+    from bot.run_metrics import RunMetrics
+
+    inputs = _inputs(index, days)
+    limiter_before = _limiter_totals()
+    started = perf_counter()
+    _check_daily_quota(inputs)
+    check_seconds = perf_counter() - started
+    metrics = RunMetrics()
+    bot = Bot(credentials=_credential_pool(), metrics=metrics, inputs=inputs, output_file=f"reports/{inputs['request_id']}.md")
+    row = {"run": index, "status": "ok"}
+    try:
+        result = _kickoff_with_backoff(inputs, metrics, bot=bot)
+        usage = _extract_token_usage(result, metrics) or {}
+        row.update(
+            {
+                "total_tokens": usage.get("total_tokens", 0),
+                "prompt_tokens": usage.get("prompt_tokens", 0),
+                # Prompt tokens the fake provider's emulated prefix cache served (PROMPT_LAYOUT).
+                "cached_prompt_tokens": usage.get("cached_prompt_tokens", 0),
+                "requests": usage.get("successful_requests", 0),
+            }
+        )
+    except Exception as e:
+        row.update({"status": "error", "error": str(e)})
+    limiter_after = _limiter_totals()
+    row.update(
+        {
+            "latency_seconds": round(perf_counter() - started, 3),
+            # Time spent being admitted: the daily quota check plus waits in the per-key limiters.
+            "admission_wait_seconds": round(
+                check_seconds + limiter_after["throttled_seconds"] - limiter_before["throttled_seconds"], 3
+            ),
+            "rate_limited": limiter_after["rate_limited"] - limiter_before["rate_limited"],
+            "tasks": bot.task_timings(),
+        }
+    )
+    return row
+
+
+def _single_section(rows: list[dict]) -> dict:
+    ok_rows = [row for row in rows if row["status"] == "ok"]
+    task_names = sorted({name for row in ok_rows for name in row["tasks"]})
+    return {
+        "runs": len(rows),
+        "ok": len(ok_rows),
+        "latency_seconds": _summary([row["latency_seconds"] for row in ok_rows]),
+        "tokens_per_run": _summary([row["total_tokens"] for row in ok_rows]),
+        "prompt_tokens_per_run": _summary([row["prompt_tokens"] for row in ok_rows]),
+        "cached_prompt_tokens_per_run": _summary([row["cached_prompt_tokens"] for row in ok_rows]),
+        "requests_per_run": _summary([row["requests"] for row in ok_rows]),
+        "admission_wait_seconds": _summary([row["admission_wait_seconds"] for row in rows]),
+        "rate_limited": sum(row["rate_limited"] for row in rows),
+        "tasks": {name: _summary([row["tasks"][name] for row in ok_rows if name in row["tasks"]]) for name in task_names},
+        "errors": [row["error"] for row in rows if row["status"] != "ok"],
+    }
+
+
+# Modules `module` imports directly, heaviest first, from `python -X importtime` (cumulative ms).
+def _import_profile(module: str, top: int = 10) -> list[dict]:
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Two spaces of indent per nesting level; level 1 is what `module` itself imports.
+        if len(name) - len(name.lstrip()) - 1 <= 2:
+            rows.append({"module": name.strip(), "ms": round(int(cumulative) / 1000, 1)})
+    return sorted(rows, key=lambda row: row["ms"], reverse=True)[:top]
+
+
+# Wall time of fresh-interpreter imports and CLI exits that never reach a kickoff.
+def _startup_section(args: argparse.Namespace) -> dict:
+    section = {}
+    for name, (command, env) in STARTUP_CASES.items():
+        timings = []
+        for _ in range(args.startup_runs):
+            started = perf_counter()
+            subprocess.run([sys.executable, *command], env={**os.environ, **env}, capture_output=True, stdin=subprocess.DEVNULL)
+            timings.append((perf_counter() - started) * 1000)
+        section[name] = _summary(timings)
+    section["import_profile"] = {module: _import_profile(module) for module in ("bot.main", "bot.crew")}
+    return section
+
+
+# Plan library lookups against a library of `--library-plans` synthetic plans spread over destinations,
+# dates, lengths and preferences; one trip is stored many times so its lookups rank a full candidate set.
+def _library_section(args: argparse.Namespace) -> dict:
+    import random
+
+    from bot.plan_library import PlanLibrary
+
+    rng = random.Random(7)
+    library = PlanLibrary(Path(os.environ["PLAN_LIBRARY_PATH"]), max_plans=args.library_plans)
+    topics = ["culture", "food", "walking", "beaches", "museums", "nightlife", "hiking", "temples", "art", "markets"]
+    tasks = {name: {"output": {"raw": "x" * 2000}} for name in ("destination_research_task", "budget_planner_task", "itinerary_designer_task")}
+
+    def trip(destination: str, start_day: int, days: int) -> dict:
+        return {
+            "destination": destination,
+            "travel_dates": f"2026-05-{start_day:02d} to 2026-05-{start_day + days - 1:02d}",
+            "trip_days": days,
+            "currency": "USD",
+            "budget": float(rng.randrange(500, 5000)),
+            "preferences": ", ".join(rng.sample(topics, 4)),
+        }
+
+    started = perf_counter()
+    for index in range(args.library_plans):
+        hot = index % 10 == 0
+        library.add(trip("Porto, Portugal", 1, 5) if hot else trip(f"City {index % 500}", rng.randrange(1, 20), rng.randrange(2, 9)), tasks)
+    fill_seconds = perf_counter() - started
+
+    timings = []
+    for index in range(500):
+        query = trip("Porto, Portugal", 1, 5) if index % 2 else trip(f"City {index % 500}", rng.randrange(1, 20), rng.randrange(2, 9))
+        started = perf_counter()
+        library.search(query)
+        timings.append((perf_counter() - started) * 1000)
+    return {"plans": library.stats()["plans"], "fill_seconds": round(fill_seconds, 3), "lookup_ms": _summary(timings)}
+
+
+# Concurrent batch through the same path as `run_batch`, for throughput.
+def _batch_section(args: argparse.Namespace, workdir: Path) -> dict:
+    from bot.batch import _run_batch_async
+
+    input_path = workdir / "batch.jsonl"
+    records = [
+        {**_inputs(1000 + index, args.days), "request_id": f"batch-{index}"} for index in range(args.batch_size)
+    ]
+    input_path.write_text("\n".join(json.dumps(record) for record in records) + "\n", encoding="utf-8")
+    batch_args = argparse.Namespace(
+        input=str(input_path),
+        output_dir=str(workdir / "reports"),
+        results=str(workdir / "reports" / "results.jsonl"),
+        concurrency=args.concurrency,
+    )
+    started = perf_counter()
+    rows = asyncio.run(_run_batch_async(batch_args))
+    elapsed = perf_counter() - started
+    ok_rows = [row for row in rows if row["status"] == "ok"]
+    return {
+        "requests": len(rows),
+        "ok": len(ok_rows),
+        "concurrency": args.concurrency,
+        "elapsed_seconds": round(elapsed, 3),
+        "plans_per_minute": round(len(ok_rows) / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        "latency_seconds": _summary([row["latency_seconds"] for row in ok_rows]),
+        "total_tokens": sum((row["token_usage"] or {}).get("total_tokens", 0) for row in ok_rows),
+    }
+
+
+def _metric(results: dict, section: str, metric: str, statistic: str | None) -> float | None:
+    value = results.get(section, {}).get(metric)
+    return value.get(statistic) if statistic and isinstance(value, dict) else value
+
+
+# Side-by-side deltas of the headline metrics of two results files.
+def compare(baseline_path: str, current_path: str) -> None:
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+    current = json.loads(Path(current_path).read_text(encoding="utf-8"))
+    print(f"Benchmark compare | baseline={baseline.get('commit')} current={current.get('commit')}")
+    for section, metric, statistic in COMPARED_METRICS:
+        before = _metric(baseline, section, metric, statistic)
+        after = _metric(current, section, metric, statistic)
+        if before is None or after is None:
+            continue
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+        label = f"{section}.{metric}" + (f".{statistic}" if statistic else "")
+        print(f"{label:<40} {before:>12} -> {after:<12} {change}")
+
+
+def main() -> None:
+    args = _parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+    output = Path(args.output).resolve() if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{_git_commit()}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    # The crew log outlives the scratch directory: it sits next to the results file.
+    log_path = output.with_suffix(".log")
+    home = Path.cwd()
+    # Caches, ledgers, checkpoints and reports of the runs live in a scratch directory removed afterwards.
+    with tempfile.TemporaryDirectory(prefix="bot-bench-", ignore_cleanup_errors=True) as scratch:
+        workdir = Path(scratch)
+        _configure(args, workdir)
+        os.chdir(workdir)
+        server = _start_fake_backends(args.port)
+        started = perf_counter()
+        # Timed first, before this process has imported the crew stack or started any threads.
+        startup = _startup_section(args) if args.startup_runs > 0 else {}
+        try:
+            # Crew progress output goes to a log so it neither floods the terminal nor skews timings.
+            with log_path.open("w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+                single_rows = [_single_run(index, args.days) for index in range(1, args.runs + 1)]
+                batch = _batch_section(args, workdir) if args.batch_size > 0 else {}
+            library = _library_section(args) if args.library_plans > 0 else {}
+        finally:
+            server.should_exit = True
+            os.chdir(home)
+    results = {
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("compare", "output")},
+        "elapsed_seconds": round(perf_counter() - started, 3),
+        "single": _single_section(single_rows),
+        "batch": batch,
+        "startup": startup,
+        "library": library,
+        "runs": single_rows,
+    }
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    single = results["single"]
+    print(
+        "Benchmark | "
+        f"runs={single['ok']}/{single['runs']} "
+        f"latency_p50={single['latency_seconds'].get('p50')}s latency_p95={single['latency_seconds'].get('p95')}s "
+        f"tokens_per_run={single['tokens_per_run'].get('mean')} "
+        f"cached_prompt_per_run={single['cached_prompt_tokens_per_run'].get('mean')} "
+        f"admission_wait_p95={single['admission_wait_seconds'].get('p95')}s "
+        f"rate_limited={single['rate_limited']}"
+    )
+    if batch:
+        print(
+            "Benchmark batch | "
+            f"ok={batch['ok']}/{batch['requests']} concurrency={batch['concurrency']} "
+            f"plans_per_minute={batch['plans_per_minute']} elapsed={batch['elapsed_seconds']}s"
+        )
+    if startup:
+        print(
+            "Benchmark startup | "
+            f"import_main_p50={startup['import_main_ms'].get('p50')}ms "
+            f"import_crew_p50={startup['import_crew_ms'].get('p50')}ms "
+            f"cli_help_p50={startup['cli_help_ms'].get('p50')}ms "
+            f"quota_rejected_p50={startup['quota_rejected_ms'].get('p50')}ms"
+        )
+    if library:
+        print(
+            "Benchmark library | "
+            f"plans={library['plans']} "
+            f"lookup_p50={library['lookup_ms'].get('p50')}ms "
+            f"lookup_p99={library['lookup_ms'].get('p99')}ms"
+        )
+    print(f"Results: {output} (crew log: {log_path})")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
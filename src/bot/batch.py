@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter
+
+from bot.checkpoint import CheckpointStore
+from bot.crew import Bot
+from bot.execution_log import log, setup_execution_log
+from bot.main import (
+    _build_inputs_from_record,
+    _check_daily_quota,
+    _credential_pool,
+    _extract_token_usage,
+    _log_run_finished,
+    _log_run_started,
+    _match_plan_library,
+    _print_coalescing_summary,
+    _print_rate_limiter_summary,
+    _print_search_cache_summary,
+    _record_coalescing,
+    _record_usage,
+    _reset_final_output_file,
+    _run_span_attributes,
+    _run_span_name,
+    _store_plan,
+)
+from bot.plan import TravelPlan
+from bot.rate_limiter import is_rate_limit_error
+from bot.run_metrics import RunMetrics
+from bot.tracing import span
+
+
+# Parse batch CLI options with env fallbacks.
+def _parse_batch_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Plan many trips concurrently from a JSONL file")
+    parser.add_argument("input", help="JSONL file with destination/travel_dates/budget/preferences/currency records")
+    parser.add_argument("--output-dir", default=os.getenv("BATCH_OUTPUT_DIR", "reports"))
+    parser.add_argument("--results", default=os.getenv("BATCH_RESULTS_FILE", "reports/results.jsonl"))
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("BATCH_CONCURRENCY", "4")))
+    args, _ = parser.parse_known_args()
+    return args
+
+
+# Stream request records one line at a time so large batches never load fully into memory.
+def _iter_records(path: Path):
+    with path.open(encoding="utf-8") as handle:
+        for line_number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, e
+
+
+# Async kickoff with the same rate-limit retry policy as the single-run CLI.
+async def _kickoff_async_with_backoff(
+    inputs: dict, output_file: str, metrics: RunMetrics, checkpoints: CheckpointStore
+):
+    max_attempts = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    last_error = None
+
+    setup_execution_log()
+    with span(_run_span_name(inputs, checkpoints), "run", **_run_span_attributes(inputs)) as run_span:
+        _log_run_started(inputs)
+        for attempt in range(1, max_attempts + 1):
+            run_span.set(attempts=attempt)
+            try:
+                bot = Bot(
+                    credentials=_credential_pool(),
+                    output_file=output_file,
+                    metrics=metrics,
+                    checkpoints=checkpoints,
+                    inputs=inputs,
+                )
+                # Building may wait on tasks another run is computing, so it stays off the event loop. The batch
+                # executor has a thread per in-flight run, so waiters never starve the claim holder's kickoff.
+                crew = await asyncio.to_thread(bot.build_crew)
+                if not crew.tasks:
+                    result = bot.restored_output()
+                else:
+                    result = await crew.kickoff_async(inputs=inputs)
+                run_span.set(tokens=int(getattr(result.token_usage, "total_tokens", 0) or 0))
+                _log_run_finished("succeeded", run_span.attributes["tokens"])
+                return result
+            except Exception as e:
+                last_error = e
+                if not is_rate_limit_error(e) or attempt == max_attempts:
+                    break
+                wait_seconds = _credential_pool().blocked_seconds()
+                print(f"[{inputs['request_id']}] rate limit hit, retrying in {wait_seconds}s (attempt {attempt}/{max_attempts})...")
+                log.warning("Rate limit hit, retrying in %ss (attempt %s/%s)", wait_seconds, attempt, max_attempts)
+                with span("kickoff retry", "backoff", attempt=attempt, wait_seconds=wait_seconds):
+                    await asyncio.sleep(wait_seconds)
+            finally:
+                checkpoints.release()
+
+        _log_run_finished(f"failed: {last_error}")
+        raise Exception(f"Crew kickoff failed after retries: {last_error}")
+
+
+# Totals and day count read straight from the typed plan (full plan: the report's .json sibling).
+def _plan_summary(plan: TravelPlan | None) -> dict:
+    if plan is None:
+        return {}
+    return {
+        "grand_total": plan.budget.grand_total,
+        "currency": plan.currency,
+        "budget_status": plan.validation.budget_status,
+        "days": len(plan.itinerary.days),
+        "validation_issues": len(plan.validation.issues),
+    }
+
+
+# Plan one trip and return its results row; never raises so one bad record cannot stop the batch.
+async def _run_one(inputs: dict, output_dir: Path) -> dict:
+    report_path = output_dir / f"{inputs['request_id']}.md"
+    row = {"request_id": inputs["request_id"], "report": str(report_path)}
+    started = perf_counter()
+    try:
+        _check_daily_quota(inputs)
+        _reset_final_output_file(report_path)
+        metrics = RunMetrics()
+        # Keyed by request id, so re-running a failed batch resumes each request's finished tasks.
+        checkpoints = CheckpointStore(inputs["request_id"])
+        checkpoints.start(inputs)
+        _match_plan_library(checkpoints, inputs)
+        result = await _kickoff_async_with_backoff(inputs, report_path.as_posix(), metrics, checkpoints)
+        usage = _extract_token_usage(result, metrics)
+        _record_usage(inputs, usage, calibrate=not checkpoints.restored)
+        _record_coalescing(checkpoints)
+        _store_plan(inputs, result, checkpoints)
+        row.update(
+            {
+                "status": "ok",
+                "token_usage": usage,
+                "shared_tasks": sorted(checkpoints.shared),
+                "library_match": checkpoints.library_match,
+                **_plan_summary(result.pydantic),
+            }
+        )
+    except Exception as e:
+        row.update({"status": "error", "error": str(e), "token_usage": None})
+    row["latency_seconds"] = round(perf_counter() - started, 3)
+    return row
+
+
+# Results row for a record rejected before it was planned.
+def _error_row(request_id: str, error: str) -> dict:
+    return {"request_id": request_id, "status": "error", "error": error, "token_usage": None, "latency_seconds": 0.0}
+
+
+async def _run_batch_async(args: argparse.Namespace) -> list[dict]:
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    results_path = Path(args.results)
+    results_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # kickoff_async (and building a crew) runs on the loop's default executor, whose stock size
+    # (min(32, cpu + 4)) would silently cap --concurrency; each in-flight run holds at most one thread.
+    concurrency = max(1, args.concurrency)
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+    semaphore = asyncio.Semaphore(concurrency)
+    pending: set[asyncio.Task] = set()
+    rows: list[dict] = []
+
+    with results_path.open("w", encoding="utf-8") as results_file:
+
+        # Append each finished row immediately so partial batches still leave results behind.
+        def _write_row(row: dict) -> None:
+            rows.append(row)
+            results_file.write(json.dumps(row) + "\n")
+            results_file.flush()
+            print(f"[{row['request_id']}] {row['status']} in {row['latency_seconds']}s")
+
+        async def _worker(inputs: dict) -> None:
+            try:
+                _write_row(await _run_one(inputs, output_dir))
+            finally:
+                semaphore.release()
+
+        input_path = Path(args.input)
+        # Request id -> line that claimed it. Ids name the report and the checkpoint directory a re-run resumes
+        # from, so a second record with the same id would overwrite the first one's report and reuse its tasks.
+        seen_ids: dict[str, int] = {}
+        for line_number, record in _iter_records(input_path):
+            # Records without a request_id are named after their file and line, so batches never share defaults.
+            default_request_id = f"{input_path.stem}-{line_number:05d}"
+            if not isinstance(record, dict):
+                _write_row(_error_row(default_request_id, f"Invalid JSON on line {line_number}: {record}"))
+                continue
+            # A malformed field (e.g. "budget": "abc") fails this record only, before it takes a slot.
+            try:
+                inputs = _build_inputs_from_record(record, default_request_id)
+            except (TypeError, ValueError) as e:
+                _write_row(_error_row(default_request_id, f"Invalid request on line {line_number}: {e}"))
+                continue
+            request_id = inputs["request_id"]
+            if request_id in seen_ids:
+                _write_row(
+                    _error_row(
+                        f"{request_id}@{line_number}",
+                        f"Duplicate request_id '{request_id}' on line {line_number} (first used on line {seen_ids[request_id]}).",
+                    )
+                )
+                continue
+            seen_ids[request_id] = line_number
+            # Bound in-flight crews before reading the next record.
+            await semaphore.acquire()
+            task = asyncio.create_task(_worker(inputs))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        if pending:
+            await asyncio.gather(*pending)
+
+    return rows
+
+
+# Batch entrypoint: plan every request in a JSONL file with bounded concurrency.
+def run_batch():
+    """Run the travel planner crew for every record in a JSONL file."""
+    args = _parse_batch_args()
+    started = perf_counter()
+    rows = asyncio.run(_run_batch_async(args))
+    elapsed = perf_counter() - started
+
+    succeeded = sum(1 for row in rows if row["status"] == "ok")
+    total_tokens = sum((row["token_usage"] or {}).get("total_tokens", 0) for row in rows)
+    throughput = (succeeded / elapsed * 60) if elapsed > 0 else 0.0
+    print(
+        "Batch summary | "
+        f"requests={len(rows)} ok={succeeded} failed={len(rows) - succeeded} "
+        f"elapsed={elapsed:.1f}s plans_per_minute={throughput:.2f} total_tokens={total_tokens} "
+        f"results={args.results}"
+    )
+    _print_search_cache_summary()
+    _print_rate_limiter_summary()
+    _print_coalescing_summary()
+
+
+if __name__ == "__main__":
+    run_batch()
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from bot.cache_store import SQLiteCache, get_cache
+from bot.coalescing import coalescing_enabled
+from bot.execution_log import log
+
+TEMPLATE_VARIABLE = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+PROMPT_FIELDS = {"task": ("description", "expected_output"), "agent": ("role", "goal", "backstory")}
+FLIGHT_POLL_SECONDS = 0.5
+
+# CrewAI is imported only where a checkpoint is rebuilt, so the CLI's pre-kickoff path stays light.
+if TYPE_CHECKING:
+    from crewai.tasks.task_output import TaskOutput
+
+
+# Cross-run task memo: reuse any task whose fingerprint was already computed by an earlier run.
+def task_memo_enabled() -> bool:
+    return os.getenv("TASK_MEMO", "1").lower() not in ("0", "false", "no")
+
+
+# Shared task-output memo keyed by fingerprint; entries age out so research does not go stale forever.
+def get_task_memo() -> SQLiteCache:
+    return get_cache(
+        os.getenv("TASK_MEMO_PATH", "cache/tasks.sqlite"),
+        max_bytes=int(float(os.getenv("TASK_MEMO_MAX_MB", "50")) * 1024 * 1024),
+    )
+
+
+def task_memo_ttl_seconds() -> int:
+    return int(os.getenv("TASK_MEMO_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+# Longest a run may hold a task's in-flight claim; a crashed run's claim frees itself after this.
+def task_flight_ttl_seconds() -> int:
+    return int(os.getenv("TASK_FLIGHT_TTL_SECONDS", "600"))
+
+
+# Longest a run waits on another run's claim before computing the task itself; defaults to the claim TTL.
+def task_flight_wait_seconds() -> float:
+    return float(os.getenv("TASK_FLIGHT_WAIT_SECONDS", str(task_flight_ttl_seconds())))
+
+
+# Names of the `{var}` placeholders a task prompt actually interpolates.
+def template_variables(*texts: str) -> set[str]:
+    return {name for text in texts if text for name in TEMPLATE_VARIABLE.findall(text)}
+
+
+# Stable fingerprint of a task: its prompt templates (task + agent yaml), the input values those
+# templates actually use, the model, and its context tasks' fingerprints.
+def task_fingerprint(
+    task_name: str,
+    task_config: dict,
+    agent_config: dict,
+    inputs: dict,
+    upstream: list[str],
+    model: str = "",
+) -> str:
+    prompts = {
+        **{field: str(task_config.get(field, "")) for field in PROMPT_FIELDS["task"]},
+        **{f"agent_{field}": str(agent_config.get(field, "")) for field in PROMPT_FIELDS["agent"]},
+    }
+    used = template_variables(*prompts.values())
+    payload = {
+        "task": task_name,
+        "prompts": prompts,
+        "inputs": {name: inputs.get(name) for name in sorted(used)},
+        "model": model,
+        "upstream": upstream,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class CheckpointStore:
+    """Per-run directory of finished task outputs, backed by a cross-run memo of unchanged tasks."""
+
+    def __init__(self, run_id: str, root: str | Path | None = None):
+        self.run_id = re.sub(r"[^A-Za-z0-9_-]+", "_", run_id)
+        self.directory = Path(root or os.getenv("CHECKPOINT_DIR", "checkpoints")) / self.run_id
+        self.inputs: dict = {}
+        self.started_at = time.time()
+        # Restored entries by task name; counted once even when several retries restore them.
+        self.restored: dict[str, dict] = {}
+        # Restored entries another run computed while this one was in progress, and tasks this run computed.
+        self.shared: dict[str, dict] = {}
+        self.saved: set[str] = set()
+        self._claims: set[str] = set()
+        # Task entries of a stored plan from the plan library, used when neither checkpoint nor memo has one.
+        self.seeded: dict[str, dict] = {}
+        self.library_match: dict | None = None
+
+    # Write via a temp file so a crash mid-write never leaves a truncated checkpoint.
+    def _write_json(self, path: Path, payload: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def _read_json(self, path: Path) -> dict | None:
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    # Bind the run's inputs and persist them so `--resume <run_id>` can rebuild the same run.
+    def start(self, inputs: dict) -> None:
+        self.inputs = dict(inputs)
+        self.started_at = time.time()
+        self._write_json(self.directory / "inputs.json", self.inputs)
+
+    def saved_inputs(self) -> dict | None:
+        return self._read_json(self.directory / "inputs.json")
+
+    # Serve a library plan's tasks (all but validation, or all but the budget stage) in place of running them.
+    def seed(self, match: dict) -> None:
+        self.seeded = match["tasks"]
+        self.library_match = {key: match[key] for key in ("plan_id", "tier", "similarity")}
+
+    # Return an output produced from the same fingerprint: this run's checkpoint first, then the cross-run memo,
+    # then a seeded library plan.
+    def load(self, task_name: str, fingerprint: str) -> "TaskOutput | None":
+        from crewai.tasks.task_output import TaskOutput
+
+        entry = self._read_json(self.directory / f"{task_name}.json")
+        if not entry or entry.get("fingerprint") != fingerprint:
+            cached = get_task_memo().get(fingerprint) if task_memo_enabled() else None
+            if cached is not None:
+                entry = json.loads(cached)
+            elif task_name in self.seeded:
+                entry = {**self.seeded[task_name], "fingerprint": fingerprint}
+            else:
+                return None
+            # Promote into this run so a later --resume does not depend on the memo entry surviving.
+            self._write_json(self.directory / f"{task_name}.json", entry)
+        self.restored[task_name] = entry
+        if entry.get("run_id", self.run_id) != self.run_id and entry.get("saved_at", 0) >= self.started_at:
+            self.shared[task_name] = entry
+        return TaskOutput.model_validate(entry["output"])
+
+    # Single-flight per fingerprint: take the memo's in-flight claim before computing a task. While another
+    # run (thread or process sharing the memo) holds it, wait, then reuse the output it published.
+    # Returns that output, or None when this run now owns the claim (or gave up waiting) and has to compute the task.
+    def claim(self, task_name: str, fingerprint: str) -> "TaskOutput | None":
+        if not coalescing_enabled() or not task_memo_enabled():
+            return None
+        key = f"inflight:{fingerprint}"
+        deadline = time.monotonic() + task_flight_wait_seconds()
+        while not get_task_memo().claim(key, self.run_id, ttl_seconds=task_flight_ttl_seconds()):
+            if time.monotonic() >= deadline:
+                # A stuck holder keeps its claim until the TTL; past the wait, duplicate the work rather than stall.
+                log.warning("Gave up waiting for in-flight task %s; computing it without the claim", task_name)
+                return self.load(task_name, fingerprint)
+            time.sleep(FLIGHT_POLL_SECONDS)
+        self._claims.add(key)
+        # The holder may have published between our memo lookup and the claim, or failed and left nothing.
+        output = self.load(task_name, fingerprint)
+        if output is not None:
+            self._release(key)
+        return output
+
+    def _release(self, key: str) -> None:
+        if key in self._claims:
+            get_task_memo().release(key)
+            self._claims.discard(key)
+
+    # Drop every claim this run still holds (end of an attempt), so waiting runs compute those tasks.
+    def release(self) -> None:
+        for key in list(self._claims):
+            self._release(key)
+
+    def save(self, task_name: str, fingerprint: str, output: "TaskOutput", tokens: int, seconds: float) -> None:
+        entry = {
+            "fingerprint": fingerprint,
+            "tokens": tokens,
+            "seconds": round(seconds, 3),
+            "run_id": self.run_id,
+            "saved_at": time.time(),
+            "output": output.model_dump(mode="json", exclude={"pydantic", "messages"}),
+        }
+        self._write_json(self.directory / f"{task_name}.json", entry)
+        if task_memo_enabled():
+            get_task_memo().set(fingerprint, json.dumps(entry), ttl_seconds=task_memo_ttl_seconds())
+        self.saved.add(task_name)
+        self._release(f"inflight:{fingerprint}")
+
+    # Checkpoint entries of every task of this run, restored or computed, for the plan library.
+    def entries(self) -> dict[str, dict]:
+        entries = dict(self.restored)
+        for task_name in self.saved:
+            entry = self._read_json(self.directory / f"{task_name}.json")
+            if entry is not None:
+                entries[task_name] = entry
+        return entries
+
+    # Tokens and wall-clock seconds the restored tasks originally cost.
+    def savings(self) -> dict:
+        return {
+            "restored_tasks": len(self.restored),
+            "saved_tokens": sum(entry.get("tokens", 0) for entry in self.restored.values()),
+            "saved_seconds": round(sum(entry.get("seconds", 0.0) for entry in self.restored.values()), 1),
+        }
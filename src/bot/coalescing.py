@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+from bot.research import OVERVIEW_RESEARCH_TASK, RESEARCH_TOPICS
+
+# Fields of the input envelope that decide a plan; ids, the year stamp and trigger payloads do not.
+REQUEST_FIELDS = ("destination", "travel_dates", "budget", "preferences", "currency", "trip_days")
+
+
+# Single-flight for identical trips: attach duplicate requests to a matching in-flight run and
+# let runs that share task fingerprints (same destination and dates) wait for one computation.
+def coalescing_enabled() -> bool:
+    return os.getenv("COALESCE_REQUESTS", "1").lower() not in ("0", "false", "no")
+
+
+def _normalize_text(value) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip().casefold()
+
+
+# Stable key of a trip request; spacing and letter case of free-text fields do not change it.
+def request_key(inputs: dict) -> str:
+    envelope = {
+        "destination": _normalize_text(inputs.get("destination")),
+        "travel_dates": _normalize_text(inputs.get("travel_dates")),
+        "budget": round(float(inputs.get("budget") or 0), 2),
+        "preferences": _normalize_text(inputs.get("preferences")),
+        "currency": _normalize_text(inputs.get("currency")).upper(),
+        "trip_days": int(inputs.get("trip_days") or 0),
+    }
+    return hashlib.sha256(json.dumps(envelope, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class CoalescingStats:
+    """Process-wide counts of runs served by other in-flight runs, whole or in part."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        # Served entirely by an identical in-flight run (attached job, or every task waited for).
+        self.coalesced = 0
+        # Ran its own budget/itinerary tasks but took the research stage from another run.
+        self.shared_research = 0
+        self.shared_tasks = 0
+        self.saved_tokens = 0
+
+    # Count a request attached to an identical job before it ran anything.
+    def record_attached(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.coalesced += 1
+
+    # Count a finished run from the tasks it took from in-flight runs (`shared`) and those it computed (`saved`).
+    def record_run(self, shared: dict[str, dict], saved: set[str]) -> None:
+        with self._lock:
+            self.requests += 1
+            self.shared_tasks += len(shared)
+            self.saved_tokens += sum(entry.get("tokens", 0) for entry in shared.values())
+            if shared and not saved:
+                self.coalesced += 1
+            elif any(name in shared for name in (*RESEARCH_TOPICS, OVERVIEW_RESEARCH_TASK)):
+                self.shared_research += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "coalesced": self.coalesced,
+                "shared_research": self.shared_research,
+                "shared_tasks": self.shared_tasks,
+                "saved_tokens": self.saved_tokens,
+                "coalescing_rate": round(self.coalesced / self.requests, 3) if self.requests else 0.0,
+            }
+
+
+_stats = CoalescingStats()
+
+
+def get_coalescing_stats() -> CoalescingStats:
+    return _stats
@@ -0,0 +1,134 @@
+import re
+from typing import Callable
+
+from crewai import Crew, Task
+from crewai.tasks.task_output import TaskOutput
+from pydantic import Field
+
+from bot.token_estimator import count_tokens
+from bot.validator import parse_budget_table, parse_itinerary_days
+
+HEADING = re.compile(r"^\s*#{1,6}\s*(.+?)\s*:?\s*$")
+BULLET = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+SOURCE_NOTE = re.compile(r"\(\s*(?:sources?|via)\s*:?\s*([^)]+)\)", re.IGNORECASE)
+URL = re.compile(r"https?://[^\s)\]>]+")
+ACTIVITY = re.compile(r"(?i)^\s*[-*]\s*(?:morning|afternoon|evening|night|lunch|dinner|breakfast)\b[^:]*:\s*(.+)$")
+DAY_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+# Word caps for one research fact and one itinerary activity in the summary.
+FACT_WORDS = 18
+ACTIVITY_WORDS = 6
+# Tasks whose output is a day-by-day itinerary (the single task or one of its chunks).
+ITINERARY_TASK = re.compile(r"^itinerary_(?:designer|chunk_\d+)_task$")
+
+
+# `text` cut to its first `words` words.
+def _clip(text: str, words: int) -> str:
+    parts = text.split()
+    return " ".join(parts[:words]) + ("…" if len(parts) > words else "")
+
+
+# Drop inline source references from a fact, returning (fact, sources).
+def _split_sources(line: str) -> tuple[str, list[str]]:
+    sources = [source.strip() for note in SOURCE_NOTE.findall(line) for source in note.split(",")]
+    sources.extend(URL.findall(line))
+    fact = URL.sub("", SOURCE_NOTE.sub("", line))
+    fact = re.sub(r"\[([^\]]*)\]\(\s*\)", r"\1", fact)
+    return re.sub(r"\s{2,}", " ", fact).strip(" -–:;,"), sources
+
+
+# Research overview as unique (topic, fact) pairs plus every source it cites.
+def _facts(markdown: str) -> tuple[list[tuple[str, str]], list[str]]:
+    facts, sources, topic = [], [], ""
+    for line in (markdown or "").splitlines():
+        heading = HEADING.match(line)
+        if heading:
+            topic = heading.group(1) if heading.group(1).lower() != "destination overview" else ""
+            continue
+        if not line.strip() or line.strip().startswith("|"):
+            continue
+        fact, cited = _split_sources(BULLET.sub("", line))
+        sources.extend(source for source in cited if source not in sources)
+        fact = _clip(fact, FACT_WORDS)
+        if fact and all(fact != known for _, known in facts):
+            facts.append((topic, fact))
+    return facts, sources
+
+
+# One line per research topic: "Topic: fact; fact".
+def _fact_lines(facts: list[tuple[str, str]]) -> list[str]:
+    topics: dict[str, list[str]] = {}
+    for topic, fact in facts:
+        topics.setdefault(topic, []).append(fact)
+    return [f"{topic}: " + "; ".join(found) if topic else "; ".join(found) for topic, found in topics.items()]
+
+
+# Every budget row as "Label: amount"; the rationale notes are left out.
+def _budget_lines(markdown: str) -> list[str]:
+    return [f"{row['label']}: {row['text']}" for row in parse_budget_table(markdown).values()]
+
+
+# One line per itinerary day: date, activities and spend; `terse` keeps only the date and spend.
+def _day_lines(markdown: str, terse: bool = False) -> list[str]:
+    lines = []
+    for day in parse_itinerary_days(markdown):
+        date = DAY_DATE.search(day["text"].splitlines()[0])
+        activities = [
+            _clip(match.group(1).strip(), ACTIVITY_WORDS) for match in map(ACTIVITY.match, day["text"].splitlines()) if match
+        ]
+        parts = [f"Day {day['day']}" + (f" ({date.group(0)})" if date else "")]
+        if activities and not terse:
+            parts.append("; ".join(activities))
+        if day["spend"] is not None:
+            parts.append(f"spend {day['spend']:g}")
+        lines.append(" | ".join(parts))
+    return lines
+
+
+def _render(sections: list[tuple[str, list[str]]]) -> str:
+    return "\n\n".join(
+        f"### {title}\n" + "\n".join(f"- {line}" for line in lines) for title, lines in sections if lines
+    )
+
+
+# Structured summary of upstream outputs, trimmed to `token_budget` tokens.
+# Budget numbers are never dropped; sources, then facts, are trimmed from the end, then days lose their activities.
+def compact_context(outputs: list[TaskOutput], token_budget: int) -> str:
+    budget, days, terse_days, facts, sources, other = [], [], [], [], [], []
+    for output in outputs:
+        raw = output.raw or ""
+        if output.name == "budget_planner_task":
+            budget.extend(_budget_lines(raw))
+        elif ITINERARY_TASK.match(output.name or ""):
+            days.extend(_day_lines(raw))
+            terse_days.extend(_day_lines(raw, terse=True))
+        elif output.name == "destination_research_task":
+            found_facts, found_sources = _facts(raw)
+            facts.extend(found_facts)
+            sources.extend(source for source in found_sources if source not in sources)
+        else:
+            other.append(raw.strip())
+
+    def text() -> str:
+        sections = [("Budget", budget), ("Days", days), ("Key Facts", _fact_lines(facts)), ("Sources", sources)]
+        return "\n\n".join(part for part in [_render(sections), *other] if part)
+
+    for trimmable in (sources, facts):
+        while trimmable and count_tokens(text()) > token_budget:
+            trimmable.pop()
+    if count_tokens(text()) > token_budget:
+        days[:] = terse_days
+    return text()
+
+
+class CompactContextCrew(Crew):
+    """Crew whose tasks read a compact summary of their context tasks instead of the raw outputs."""
+
+    # Returns the context string for a task, or None to keep CrewAI's concatenated raw outputs.
+    context_builder: Callable[[Task], str | None] | None = Field(default=None, exclude=True)
+
+    def _get_context(self, task: Task, task_outputs: list[TaskOutput]) -> str:
+        if self.context_builder is not None and isinstance(task.context, list) and task.context:
+            context = self.context_builder(task)
+            if context is not None:
+                return context
+        return super()._get_context(task, task_outputs)
@@ -0,0 +1,238 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from bot.model_routing import downgrade_below
+from bot.quota import DailyQuotaExceeded, QuotaStore
+from bot.rate_limiter import SharedRateLimiter
+
+# Hard provider caps per API key, enforced regardless of environment overrides.
+HARD_LIMITS = {
+    "rpm": 30,
+    "rpd": 14400,
+    "tpm": int(os.getenv("LLM_PROVIDER_TPM_CAP", "6000")),
+    "tpd": 500000,
+}
+
+
+# Apply configured limits while respecting hard caps.
+def _effective_limit(env_name: str, hard_cap: int) -> int:
+    return min(int(os.getenv(env_name, str(hard_cap))), hard_cap)
+
+
+# Per-key limits when a pool entry does not set its own.
+def default_key_limits() -> dict:
+    return {
+        "rpm": _effective_limit("LLM_RPM_LIMIT", HARD_LIMITS["rpm"]),
+        "tpm": HARD_LIMITS["tpm"],
+        "rpd": _effective_limit("LLM_DAILY_LIMIT", HARD_LIMITS["rpd"]),
+        "tpd": _effective_limit("LLM_DAILY_TOKEN_LIMIT", HARD_LIMITS["tpd"]),
+    }
+
+
+class Credential:
+    """One provider account (key, model, endpoint) with its own rate limiter and daily quota ledger."""
+
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        api_key: str,
+        api_base: str | None = None,
+        limits: dict | None = None,
+        ledger_path: str | Path = "logs/quota.sqlite",
+        fast_model: str | None = None,
+    ):
+        self.name = name
+        self.model = model
+        self.fast_model = fast_model
+        self.api_key = api_key
+        self.api_base = api_base
+        # Per-key overrides may lower the limits but never raise them past the provider's hard caps.
+        self.limits = {key: min(value, HARD_LIMITS[key]) for key, value in {**default_key_limits(), **(limits or {})}.items()}
+        self.rate_limiter = SharedRateLimiter(
+            rpm=self.limits["rpm"],
+            tpm=self.limits["tpm"],
+            backoff_seconds=float(os.getenv("LLM_BACKOFF_SECONDS", "2")),
+        )
+        self.quota = QuotaStore(ledger_path)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tokens = 0
+
+    # Requests/tokens left today on this key (shared with every process using the same ledger).
+    def daily_remaining(self) -> dict:
+        usage = self.quota.usage()
+        return {
+            "requests": max(0, self.limits["rpd"] - usage["daily_requests"]),
+            "tokens": max(0, self.limits["tpd"] - usage["daily_tokens"]),
+        }
+
+    def exhausted(self) -> bool:
+        remaining = self.daily_remaining()
+        return remaining["requests"] <= 0 or remaining["tokens"] <= 0
+
+    # Model for a routing tier; reasoning calls drop to the fast model once the key's daily tokens run low.
+    def model_for(self, tier: str) -> str:
+        if not self.fast_model:
+            return self.model
+        if tier == "fast":
+            return self.fast_model
+        threshold = downgrade_below()
+        if threshold > 0 and self.daily_remaining()["tokens"] < threshold * self.limits["tpd"]:
+            return self.fast_model
+        return self.model
+
+    # Admit a `tokens`-sized call on this key: the in-process bucket paces this interpreter's calls, then the
+    # shared ledger's sliding window caps every process using the key together. Returns the reservation.
+    def admit(self, tokens: int) -> dict:
+        reservation = self.rate_limiter.acquire(tokens)
+        try:
+            while True:
+                ledger, wait_seconds = self.quota.reserve(1, reservation["tokens"], self.limits)
+                if ledger is not None:
+                    break
+                time.sleep(wait_seconds)
+        except Exception:
+            self.rate_limiter.settle(reservation, 0)
+            raise
+        reservation["ledger"] = ledger
+        return reservation
+
+    # A 429'd call consumed nothing: hand its tokens back to the bucket and its slot back to the shared window.
+    def rate_limited(self, reservation: dict, headers=None) -> float:
+        self.quota.settle(reservation.get("ledger"), 0, 0)
+        return self.rate_limiter.on_rate_limited(reservation, headers)
+
+    # Book one completed provider call against this key's ledger, replacing its reserved estimate;
+    # `charged` is what the call cost the per-minute budget when the provider counts more than it used.
+    def record(self, tokens: int, reservation: dict | None = None, charged: int | None = None) -> None:
+        tokens = max(0, int(tokens))
+        self.quota.settle((reservation or {}).get("ledger"), 1, tokens, None if charged is None else max(0, int(charged)))
+        with self._lock:
+            self.requests += 1
+            self.tokens += tokens
+
+    def snapshot(self) -> dict:
+        usage = self.quota.usage()
+        with self._lock:
+            process_usage = {"requests": self.requests, "tokens": self.tokens}
+        return {
+            "model": self.model,
+            "fast_model": self.fast_model,
+            "daily_requests": usage["daily_requests"],
+            "daily_tokens": usage["daily_tokens"],
+            "rpd": self.limits["rpd"],
+            "tpd": self.limits["tpd"],
+            "process_requests": process_usage["requests"],
+            "process_tokens": process_usage["tokens"],
+            **self.rate_limiter.snapshot(),
+        }
+
+
+class CredentialPool:
+    """Routes each LLM call to the key with the most headroom and fails over when a key is limited or spent."""
+
+    def __init__(self, credentials: list[Credential]):
+        if not credentials:
+            raise ValueError("At least one LLM credential is required.")
+        self.credentials = credentials
+
+    # First configured credential; its model drives provider-specific behaviour of the LLM client.
+    def primary(self) -> Credential:
+        return self.credentials[0]
+
+    # Shortest limiter wait first, then the fullest token bucket relative to its size.
+    @staticmethod
+    def _headroom(credential: Credential, tokens: int) -> tuple[float, float]:
+        stats = credential.rate_limiter.snapshot()
+        return credential.rate_limiter.wait_seconds(tokens), -stats["tokens_available"] / stats["tpm"]
+
+    # Pick a key for a `tokens`-sized call and reserve it there; returns (credential, reservation).
+    def acquire(self, tokens: int) -> tuple[Credential, dict]:
+        available = [credential for credential in self.credentials if not credential.exhausted()]
+        if not available:
+            raise DailyQuotaExceeded(
+                "Daily LLM quota reached on every configured credential. Try again tomorrow or add keys."
+            )
+        credential = min(available, key=lambda candidate: self._headroom(candidate, tokens))
+        return credential, credential.admit(tokens)
+
+    # Aggregate daily headroom across keys, for run admission.
+    def daily_remaining(self) -> dict:
+        remaining = [credential.daily_remaining() for credential in self.credentials]
+        return {
+            "requests": sum(item["requests"] for item in remaining),
+            "tokens": sum(item["tokens"] for item in remaining),
+        }
+
+    # Seconds until the least-blocked key accepts calls again.
+    def blocked_seconds(self) -> float:
+        return min(credential.rate_limiter.snapshot()["blocked_seconds"] for credential in self.credentials)
+
+    def snapshot(self) -> dict:
+        return {credential.name: credential.snapshot() for credential in self.credentials}
+
+
+# Ledger per key next to LLM_QUOTA_DB; the single-key "default" credential keeps the original file.
+def _ledger_path(name: str) -> Path:
+    base = Path(os.getenv("LLM_QUOTA_DB", "logs/quota.sqlite"))
+    return base if name == "default" else base.with_name(f"{base.stem}-{name}{base.suffix}")
+
+
+# LLM_CREDENTIALS: path to a JSON file or an inline JSON list of key entries.
+def _configured_entries() -> list[dict] | None:
+    raw = os.getenv("LLM_CREDENTIALS", "").strip()
+    if not raw:
+        return None
+    text = raw if raw.startswith("[") else Path(raw).read_text(encoding="utf-8")
+    entries = json.loads(text)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("LLM_CREDENTIALS must be a non-empty JSON list of credential entries.")
+    return entries
+
+
+def _credential_from_entry(entry: dict, index: int) -> Credential:
+    name = str(entry.get("name") or f"key{index}")
+    api_key = entry.get("api_key") or os.getenv(str(entry.get("api_key_env", "")), "")
+    if not api_key:
+        raise ValueError(f"LLM credential '{name}' has no api_key and its api_key_env is unset.")
+    model = entry.get("model") or os.getenv("MODEL")
+    if not model:
+        raise ValueError(f"LLM credential '{name}' has no model and MODEL is unset.")
+    return Credential(
+        name=name,
+        model=model,
+        api_key=api_key,
+        api_base=entry.get("api_base") or os.getenv("LLM_API_BASE") or None,
+        limits={key: int(entry[key]) for key in ("rpm", "tpm", "rpd", "tpd") if key in entry},
+        ledger_path=entry.get("ledger") or _ledger_path(name),
+        fast_model=entry.get("fast_model") or os.getenv("FAST_MODEL") or None,
+    )
+
+
+# Pool from LLM_CREDENTIALS, else GROQ_API_KEYS (comma-separated), else the single GROQ_API_KEY.
+def load_credentials() -> CredentialPool:
+    entries = _configured_entries()
+    if entries is None:
+        keys = [key.strip() for key in os.getenv("GROQ_API_KEYS", "").split(",") if key.strip()]
+        if keys:
+            entries = [{"name": f"key{index}", "api_key": key} for index, key in enumerate(keys, start=1)]
+        else:
+            entries = [{"name": "default", "api_key_env": "GROQ_API_KEY"}]
+    return CredentialPool([_credential_from_entry(entry, index) for index, entry in enumerate(entries, start=1)])
+
+
+_credential_pool: CredentialPool | None = None
+_credential_pool_lock = threading.Lock()
+
+
+# Process-wide pool so every crew in this interpreter shares the same keys, limiters and ledgers.
+def get_credential_pool() -> CredentialPool:
+    global _credential_pool
+    with _credential_pool_lock:
+        if _credential_pool is None:
+            _credential_pool = load_credentials()
+        return _credential_pool
@@ -1,12 +1,65 @@
 import os
-from typing import List
+import re
+import time
+from pathlib import Path
+from typing import Any, Callable, List
 
-from crewai import Agent, Crew, LLM, Process, Task
+from crewai import Agent, Crew, CrewOutput, Process, Task
 from crewai.agents.agent_builder.base_agent import BaseAgent
-from crewai.project import CrewBase, agent, crew, task
-from crewai_tools import SerperDevTool
+from crewai.tasks.conditional_task import ConditionalTask
+from crewai.tasks.task_output import TaskOutput
+from crewai.types.usage_metrics import UsageMetrics
+from crewai.utilities.formatter import aggregate_raw_outputs_from_tasks
+from crewai.project import CrewBase, after_kickoff, agent, before_kickoff, crew, task
+from pydantic import Field
 
-from bot.tools import TravelBudgetCalculatorTool
+from bot.checkpoint import TEMPLATE_VARIABLE, CheckpointStore, task_fingerprint
+from bot.context_compaction import CompactContextCrew, compact_context
+from bot.credentials import CredentialPool
+from bot.execution_log import console_verbose, log, setup_execution_log
+from bot.itinerary import chunk_task_config, plan_itinerary_chunks, stitch_itinerary
+from bot.llm import RateLimitedLLM
+from bot.model_routing import agent_route, context_compaction_mode
+from bot.plan import TravelPlan, render_plan
+from bot.prompt_layout import load_prompt_config
+from bot.registry import shared_tool
+from bot.report_writer import ReportWriter
+from bot.research import merge_research_sections, research_task_names
+from bot.run_metrics import RunMetrics
+from bot.token_estimator import count_tokens
+from bot.tools import CachedSerperDevTool, TravelBudgetCalculatorTool
+from bot.tools.cached_serper_tool import search_offline_mode
+from bot.tracing import current_span, span
+from bot.validator import build_plan, deterministic_validation_enabled, parse_budget
+
+# The auditor's own "Validation Summary" section, kept as notes on the typed plan.
+VALIDATION_SUMMARY = re.compile(r"(?ims)^\s*#{1,6}\s*validation\s+summary\s*:?\s*$(.*?)(?=^\s*#{1,2}\s|\Z)")
+
+
+class TracedAgent(Agent):
+    """Agent whose task executions are traced as task spans of the run that built the crew, and logged."""
+
+    # Run span of the current kickoff; async tasks run on fresh threads that do not inherit it.
+    trace_parent: Any = Field(default=None, exclude=True)
+
+    def execute_task(self, task: Task, context: str | None = None, tools: list | None = None) -> Any:
+        current = current_span()
+        task_span = current.parent if current is not None and current.kind == "agent_iteration" else current
+        # CrewAI retries a failed execution by calling execute_task again from inside the first one.
+        if task_span is not None and task_span.kind == "task" and task_span.name == task.name:
+            task_span.add("retries")
+            log.warning("Task %s failed, retrying (retry %s)", task.name, task_span.attributes["retries"])
+            return super().execute_task(task, context, tools)
+        with span(task.name, "task", parent=self.trace_parent, agent=self.role.strip()):
+            log.info("Task %s started (agent: %s)", task.name, self.role.strip())
+            started = time.perf_counter()
+            try:
+                result = super().execute_task(task, context, tools)
+            except Exception as e:
+                log.error("Task %s failed: %s", task.name, e)
+                raise
+            log.info("Task %s finished in %.2fs", task.name, time.perf_counter() - started)
+            return result
 
 
 @CrewBase
@@ -17,6 +70,73 @@ class Bot:
     tasks: List[Task]
     HARD_MAX_RPM = 30
 
+    def __init__(
+        self,
+        credentials: CredentialPool | None = None,
+        output_file: str = "output.md",
+        metrics: RunMetrics | None = None,
+        task_callback: Callable | None = None,
+        checkpoints: CheckpointStore | None = None,
+        inputs: dict | None = None,
+        section_callback: Callable[[str, str], None] | None = None,
+    ):
+        # Optional key pool shared across concurrent crews (per-key limiters), per-run report path and counters.
+        self.credentials = credentials
+        self.output_file = output_file
+        self.metrics = metrics
+        self.task_callback = task_callback
+        # Optional per-run task checkpoints; finished tasks are restored instead of re-run.
+        self.checkpoints = checkpoints
+        self._llms: list[RateLimitedLLM] = []
+        self._fingerprints: dict[str, str] = {}
+        # Provider tokens already attributed to a checkpoint, per agent LLM.
+        self._checkpointed_tokens: dict[int, int] = {}
+        # Provider prompt and cached prompt tokens already attributed to a finished task, per agent LLM.
+        self._reported_prompt_tokens: dict[int, tuple[int, int]] = {}
+        # Known before crew() is built so long trips can be split into itinerary chunks.
+        self.run_inputs: dict = dict(inputs or {})
+        self.validation_issues: list[str] = []
+        self._validated_in_code = False
+        # Per-run task graph: dynamic itinerary chunks plus every task (restored or pending) of this run.
+        self._itinerary_chunks: list[Task] = []
+        self._dynamic_task_configs: dict[str, dict] = {}
+        self._run_tasks: list[Task] = []
+        # Report sections are written as their tasks finish; `section_callback` streams them to the caller.
+        self.section_callback = section_callback
+        self.report_writer: ReportWriter | None = None
+        # CrewBase installs its own YAML loader on the class and parses agents.yaml/tasks.yaml for every
+        # instance; the registry parses them once per process and hands each Bot its own copy, laid out
+        # for prefix caching (PROMPT_LAYOUT).
+        self.load_yaml = load_prompt_config
+
+    # Reset per-run state so one warm Bot can serve many sequential runs (service workers).
+    def prepare_run(
+        self,
+        metrics: RunMetrics | None = None,
+        task_callback: Callable | None = None,
+        checkpoints: CheckpointStore | None = None,
+        inputs: dict | None = None,
+        section_callback: Callable[[str, str], None] | None = None,
+    ) -> None:
+        self.metrics = metrics
+        self.task_callback = task_callback
+        self.checkpoints = checkpoints
+        self.run_inputs = dict(inputs or {})
+        self.section_callback = section_callback
+        self.report_writer = None
+        self._checkpointed_tokens = {}
+        self._reported_prompt_tokens = {}
+        for llm in self._llms:
+            llm.metrics = metrics
+            # Crew usage sums each agent's LLM counters, so they must start from zero per run.
+            llm._token_usage = {key: 0 for key in llm._token_usage}
+        # Collect from tasks: topic researchers share a role, so CrewBase lists only one of them in self.agents.
+        task_agents = {id(crew_task.agent): crew_task.agent for crew_task in getattr(self, "tasks", [])}
+        for crew_agent in task_agents.values():
+            # Memoized agents reuse their executor, which would otherwise replay the previous run's messages.
+            if crew_agent.agent_executor is not None:
+                crew_agent.agent_executor.messages = []
+
     # Read required env vars centrally to fail with clear errors.
     @staticmethod
     def _require_env(name: str) -> str:
@@ -25,117 +145,512 @@ class Bot:
             raise ValueError(f"Missing required environment variable: {name}")
         return value
 
-    # Build the shared LLM client for all agents.
-    def _llm(self) -> LLM:
-        model = self._require_env("MODEL")
-        api_key = self._require_env("GROQ_API_KEY")
+    # Build an agent's LLM client from its route in models.yaml; with a key pool, each call is
+    # routed to the key with the most headroom.
+    def _llm(self, agent_name: str) -> RateLimitedLLM:
+        route = agent_route(agent_name)
+        if self.credentials is not None:
+            primary = self.credentials.primary()
+            model = route["model"] or primary.model_for(route["tier"])
+            api_key, api_base = primary.api_key, primary.api_base
+        else:
+            fast_model = os.getenv("FAST_MODEL") if route["tier"] == "fast" else None
+            model = route["model"] or fast_model or self._require_env("MODEL")
+            api_key = self._require_env("GROQ_API_KEY")
+            api_base = os.getenv("LLM_API_BASE") or None
         if "prompt-guard" in model.lower():
             raise ValueError("MODEL is set to a Prompt-Guard classifier. Use a Groq generative model with tool-calling (example: groq/llama-3.3-70b-versatile).")
-        return LLM(model=model, api_key=api_key, temperature=0.1, max_tokens=int(os.getenv("LLM_MAX_TOKENS", "700")))
+        llm = RateLimitedLLM(
+            model=model,
+            api_key=api_key,
+            temperature=route["temperature"],
+            max_tokens=route["max_tokens"],
+            # OpenAI-compatible endpoint override (e.g. the local fake provider).
+            base_url=api_base,
+            credentials=self.credentials,
+            metrics=self.metrics,
+            agent_name=agent_name,
+            route=route,
+        )
+        self._llms.append(llm)
+        return llm
 
-    # Enforce hard per-minute request ceiling for the crew.
-    def _max_rpm(self) -> int:
+    # Hard per-minute request ceiling for crews without the key pool (train/replay/test).
+    def _max_rpm(self) -> int | None:
+        if self.credentials is not None:
+            return None
         configured = int(os.getenv("LLM_RPM_LIMIT", str(self.HARD_MAX_RPM)))
         return min(configured, self.HARD_MAX_RPM)
 
-    # Research agent with live web search tool.
+    # Stable per-Bot task callback; memoized tasks keep it across runs, so swap the target instead.
+    def _on_task_complete(self, output: TaskOutput) -> None:
+        log.debug("Task %s output (%s):\n%s", output.name, output.agent, output.raw)
+        if output.name == "validation_task" and output.pydantic is None:
+            self._attach_audited_plan(output)
+        self._record_prefix_cache(output.name)
+        if self.checkpoints is not None and output.name in self._fingerprints:
+            crew_task = next(t for t in self._run_tasks if t.name == output.name)
+            # Every agent runs one task, so its own LLM counter attributes tokens even when tasks overlap.
+            llm = crew_task.agent.llm
+            tokens_used = llm._token_usage["total_tokens"]
+            self.checkpoints.save(
+                output.name,
+                self._fingerprints[output.name],
+                output,
+                tokens=tokens_used - self._checkpointed_tokens.get(id(llm), 0),
+                seconds=crew_task.execution_duration or 0.0,
+            )
+            self._checkpointed_tokens[id(llm)] = tokens_used
+        if self.report_writer is not None:
+            self.report_writer.on_task_output(output)
+        if self.task_callback is not None:
+            self.task_callback(output)
+
+    # Prompt tokens a finished task sent and how many the provider served from its prefix cache.
+    # Tasks completed in code (merge, stitch, deterministic validation) made no call and are skipped.
+    def _record_prefix_cache(self, task_name: str) -> None:
+        crew_task = next((t for t in self._run_tasks if t.name == task_name), None)
+        llm = getattr(getattr(crew_task, "agent", None), "llm", None)
+        if self.metrics is None or not isinstance(llm, RateLimitedLLM):
+            return
+        prompt_tokens, cached_tokens = llm._token_usage["prompt_tokens"], llm._token_usage["cached_prompt_tokens"]
+        reported_prompt, reported_cached = self._reported_prompt_tokens.get(id(llm), (0, 0))
+        self._reported_prompt_tokens[id(llm)] = (prompt_tokens, cached_tokens)
+        if prompt_tokens > reported_prompt:
+            self.metrics.record_prefix_cache(task_name, prompt_tokens - reported_prompt, cached_tokens - reported_cached)
+
+    # Research agent with cached web search tool.
     @agent
     def destination_researcher(self) -> Agent:
-        self._require_env("SERPER_API_KEY")
-        return Agent(
+        return self._build_researcher()
+
+    # One researcher per topic task: concurrent tasks must not share an agent executor.
+    def _build_researcher(self) -> Agent:
+        # Offline mode answers from the local cache only, so no Serper key is needed.
+        if not search_offline_mode():
+            self._require_env("SERPER_API_KEY")
+        return TracedAgent(
             config=self.agents_config["destination_researcher"],  # type: ignore[index]
-            llm=self._llm(),
-            tools=[SerperDevTool()],
+            llm=self._llm("destination_researcher"),
+            tools=[shared_tool(CachedSerperDevTool)],
             max_iter=3,
             max_retry_limit=1,
             allow_delegation=False,
-            verbose=True,
+            verbose=console_verbose(),
         )
 
     # Budget agent with calculator tool for deterministic arithmetic.
     @agent
     def budget_planner(self) -> Agent:
-        return Agent(
+        return TracedAgent(
             config=self.agents_config["budget_planner"],  # type: ignore[index]
-            llm=self._llm(),
-            tools=[TravelBudgetCalculatorTool()],
+            llm=self._llm("budget_planner"),
+            tools=[shared_tool(TravelBudgetCalculatorTool)],
             max_iter=3,
             max_retry_limit=1,
             allow_delegation=False,
-            verbose=True,
+            verbose=console_verbose(),
         )
 
     # Itinerary agent focused on scheduling and pacing.
     @agent
     def itinerary_designer(self) -> Agent:
-        return Agent(
+        return self._build_itinerary_designer()
+
+    # One designer per itinerary chunk so concurrent chunks never share an executor.
+    def _build_itinerary_designer(self) -> Agent:
+        return TracedAgent(
             config=self.agents_config["itinerary_designer"],  # type: ignore[index]
-            llm=self._llm(),
+            llm=self._llm("itinerary_designer"),
             max_iter=3,
             max_retry_limit=1,
             allow_delegation=False,
-            verbose=True,
+            verbose=console_verbose(),
         )
 
     # Final QA/validator agent producing structured output.
     @agent
     def validation_agent(self) -> Agent:
-        return Agent(
+        return TracedAgent(
             config=self.agents_config["validation_agent"],  # type: ignore[index]
-            llm=self._llm(),
+            llm=self._llm("validation_agent"),
             max_iter=3,
             max_retry_limit=1,
             allow_delegation=False,
-            verbose=True,
+            verbose=console_verbose(),
         )
 
-    # Task: destination research.
+    # Topic research tasks run concurrently, each on its own researcher.
+    def _research_topic_task(self, name: str) -> Task:
+        return Task(
+            config=self.tasks_config[name],  # type: ignore[index]
+            agent=self._build_researcher(),
+            async_execution=True,
+        )
+
+    @task
+    def attractions_research_task(self) -> Task:
+        return self._research_topic_task("attractions_research_task")
+
+    @task
+    def transport_research_task(self) -> Task:
+        return self._research_topic_task("transport_research_task")
+
+    @task
+    def food_research_task(self) -> Task:
+        return self._research_topic_task("food_research_task")
+
+    @task
+    def caveats_research_task(self) -> Task:
+        return self._research_topic_task("caveats_research_task")
+
+    # Short trips research every topic in this one call instead of fanning out.
+    @task
+    def overview_research_task(self) -> Task:
+        return self._research_topic_task("overview_research_task")
+
+    # Task: destination overview, merged in code from the topic tasks (never an LLM call).
     @task
     def destination_research_task(self) -> Task:
-        return Task(config=self.tasks_config["destination_research_task"])  # type: ignore[index]
+        return ConditionalTask(
+            config=self.tasks_config["destination_research_task"],  # type: ignore[index]
+            condition=self._merge_research,
+        )
 
     # Task: budget plan.
     @task
     def budget_planner_task(self) -> Task:
         return Task(config=self.tasks_config["budget_planner_task"])  # type: ignore[index]
 
-    # Task: day-wise itinerary.
+    # Task: day-wise itinerary; for long trips it stitches concurrent chunk outputs instead of calling the LLM.
     @task
     def itinerary_designer_task(self) -> Task:
-        return Task(config=self.tasks_config["itinerary_designer_task"])  # type: ignore[index]
+        return ConditionalTask(
+            config=self.tasks_config["itinerary_designer_task"],  # type: ignore[index]
+            condition=self._needs_single_itinerary,
+        )
+
+    # Concurrent day-range itinerary tasks for trips longer than ITINERARY_CHUNK_DAYS.
+    def _build_itinerary_chunks(self, context: list[Task]) -> list[Task]:
+        chunk_plan = plan_itinerary_chunks(self.run_inputs)
+        base_config = self.tasks_config["itinerary_designer_task"]  # type: ignore[index]
+        self._dynamic_task_configs = {}
+        # Chunk designers are rebuilt with every crew; a warm Bot must not keep the previous build's LLMs.
+        stale = {id(chunk.agent.llm) for chunk in self._itinerary_chunks}
+        self._llms = [llm for llm in self._llms if id(llm) not in stale]
+        chunk_tasks = []
+        for chunk in chunk_plan:
+            name = f"itinerary_chunk_{chunk['index']}_task"
+            config = chunk_task_config(base_config, chunk, len(chunk_plan), int(self.run_inputs["trip_days"]))
+            self._dynamic_task_configs[name] = {**config, "chunk": chunk}
+            chunk_tasks.append(
+                Task(
+                    name=name,
+                    description=config["description"],
+                    expected_output=config["expected_output"],
+                    agent=self._build_itinerary_designer(),
+                    context=context,
+                    async_execution=True,
+                )
+            )
+        return chunk_tasks
 
-    # Task: final validation and file output.
+    # Task: final validation; the LLM auditor only runs when code checks find issues.
+    # The report file is written by the ReportWriter (atomically), not by CrewAI's output_file.
     @task
     def validation_task(self) -> Task:
-        return Task(
+        return ConditionalTask(
             config=self.tasks_config["validation_task"],  # type: ignore[index]
-            output_file="output.md",
+            condition=self._needs_llm_validation,
+        )
+
+    # Report path for this run; `{run_id}` style placeholders come from the run inputs.
+    def _report_path(self) -> Path:
+        return Path(TEMPLATE_VARIABLE.sub(lambda match: str(self.run_inputs.get(match.group(1), "")), self.output_file))
+
+    # Inputs for this kickoff, needed by the in-process validator and the report writer.
+    @before_kickoff
+    def _capture_inputs(self, inputs: dict | None) -> dict | None:
+        self.run_inputs = dict(inputs or {})
+        if self.report_writer is not None:
+            self.report_writer.inputs = self.run_inputs
+            self.report_writer.path = self._report_path()
+        return inputs
+
+    # Raw research, budget and itinerary outputs the validation step reads.
+    def _upstream_outputs(self) -> tuple[str, str, str]:
+        research, budget, itinerary = (
+            crew_task.output.raw if crew_task.output else ""
+            for crew_task in (self.destination_research_task(), self.budget_planner_task(), self.itinerary_designer_task())
+        )
+        return research, budget, itinerary
+
+    # Typed plan parsed once from the upstream outputs, with the deterministic check results.
+    def _build_plan(self, inputs: dict) -> TravelPlan:
+        plan = build_plan(*self._upstream_outputs(), inputs)
+        self.validation_issues = plan.validation.issues
+        return plan
+
+    # Plan that passed every deterministic check, or None when the LLM auditor has to review it.
+    def _deterministic_plan(self, inputs: dict) -> TravelPlan | None:
+        if not deterministic_validation_enabled():
+            return None
+        plan = self._build_plan(inputs)
+        return None if plan.validation.issues else plan
+
+    # Record a code-validated plan as the validation task's output (report file, checkpoint, callbacks).
+    def _complete_validation(self, plan: TravelPlan) -> None:
+        validation_task = self.validation_task()
+        validation_task.output = TaskOutput(
+            name=validation_task.name,
+            description=validation_task.description,
+            expected_output=validation_task.expected_output,
+            raw=render_plan(plan),
+            pydantic=plan,
+            json_dict=plan.model_dump(mode="json"),
+            agent="Deterministic validator",
+        )
+        self._validated_in_code = True
+        self._on_task_complete(validation_task.output)
+
+    # LLM-audited run: the auditor's corrected budget table replaces the upstream one (and is re-checked); its
+    # summary is kept as notes on the typed plan and the report is rendered from that plan.
+    # Day blocks always come from the itinerary task: the auditor may only have seen the compacted day lines.
+    def _attach_audited_plan(self, output: TaskOutput) -> None:
+        research, budget, itinerary = self._upstream_outputs()
+        # The summary's own check table would otherwise be read as budget rows ("Budget status").
+        document = VALIDATION_SUMMARY.sub("", output.raw or "")
+        if parse_budget(document).grand_total is not None:
+            budget = document
+        plan = build_plan(research, budget, itinerary, self.run_inputs)
+        self.validation_issues = plan.validation.issues
+        summary = VALIDATION_SUMMARY.search(output.raw or "")
+        plan.validation.validated_in_code = False
+        plan.validation.auditor_notes = (summary.group(1) if summary else output.raw or "").strip()
+        output.raw = render_plan(plan)
+        output.pydantic = plan
+        output.json_dict = plan.model_dump(mode="json")
+
+    # Combine finished topic outputs into the overview consumed by budget and itinerary tasks.
+    def _complete_research_merge(self) -> None:
+        research_task = self.destination_research_task()
+        sections = {
+            topic_task.name: topic_task.output.raw if topic_task.output else "" for topic_task in research_task.context
+        }
+        research_task.output = TaskOutput(
+            name=research_task.name,
+            description=research_task.description,
+            expected_output=research_task.expected_output,
+            raw=merge_research_sections(sections),
+            agent="Research merge",
+        )
+        self._on_task_complete(research_task.output)
+
+    # Join chunk outputs into the itinerary consumed by validation.
+    def _complete_itinerary_stitch(self) -> None:
+        itinerary_task = self.itinerary_designer_task()
+        itinerary_task.output = TaskOutput(
+            name=itinerary_task.name,
+            description=itinerary_task.description,
+            expected_output=itinerary_task.expected_output,
+            raw=stitch_itinerary(
+                [chunk.output.raw if chunk.output else "" for chunk in self._itinerary_chunks],
+                [self._dynamic_task_configs[chunk.name]["chunk"] for chunk in self._itinerary_chunks],
+            ),
+            agent="Itinerary stitch",
+        )
+        self._on_task_complete(itinerary_task.output)
+
+    # ConditionalTask hook: short trips run the itinerary LLM call; chunked trips are stitched in code.
+    def _needs_single_itinerary(self, _: TaskOutput) -> bool:
+        if not self._itinerary_chunks:
+            return True
+        self._complete_itinerary_stitch()
+        return False
+
+    # ConditionalTask hook: runs after every topic future has finished; always skips the LLM.
+    def _merge_research(self, _: TaskOutput) -> bool:
+        self._complete_research_merge()
+        return False
+
+    # ConditionalTask hook: False skips the validation_agent LLM call.
+    def _needs_llm_validation(self, _: TaskOutput) -> bool:
+        plan = self._deterministic_plan(self.run_inputs)
+        if plan is None:
+            return True
+        self._complete_validation(plan)
+        return False
+
+    # A skipped validation leaves an empty final output; surface the code-built report instead.
+    # Either way the result carries the typed plan (result.pydantic / result.json_dict).
+    @after_kickoff
+    def _use_code_validated_report(self, result: CrewOutput) -> CrewOutput:
+        final_output = self.validation_task().output
+        if self._validated_in_code:
+            result.raw = final_output.raw
+            result.tasks_output = [output for output in result.tasks_output if output.raw] + [final_output]
+        if final_output is not None:
+            result.pydantic = final_output.pydantic
+            result.json_dict = final_output.json_dict
+        return result
+
+    # YAML key of the agent assigned to a task; topic researchers are extra instances of the same config.
+    def _agent_name(self, crew_task: Task) -> str:
+        return next(
+            name
+            for name, config in self.agents_config.items()
+            if str(config["role"]).strip() == crew_task.agent.role.strip()
+        )
+
+    # Prefill outputs of tasks whose fingerprint is unchanged; return only the tasks that must run.
+    # A changed input re-runs the tasks that read it plus everything downstream through context.
+    # Tasks are claimed in graph order, so two runs never wait on each other's claims.
+    def _restore_checkpoints(self, tasks: list[Task]) -> list[Task]:
+        self._fingerprints = {}
+        pending = []
+        for crew_task in tasks:
+            context_tasks = crew_task.context if isinstance(crew_task.context, list) else []
+            self._fingerprints[crew_task.name] = task_fingerprint(
+                crew_task.name,
+                self._dynamic_task_configs.get(crew_task.name) or self.tasks_config[crew_task.name],
+                self.agents_config[self._agent_name(crew_task)],
+                self.checkpoints.inputs,
+                upstream=[self._fingerprints[context_task.name] for context_task in context_tasks],
+                model=crew_task.agent.llm.model,
+            )
+            output = self.checkpoints.load(crew_task.name, self._fingerprints[crew_task.name])
+            # Another run computing the same fingerprint (a duplicate request, or the research of one with
+            # the same destination and dates) is waited for instead of repeated.
+            if output is None:
+                output = self.checkpoints.claim(crew_task.name, self._fingerprints[crew_task.name])
+                if crew_task.name in self.checkpoints.shared:
+                    log.info("Task %s shared from an in-flight run", crew_task.name)
+            # Checkpoints keep the typed plan as json_dict; older validation entries without one are redone.
+            if output is not None and crew_task.name == "validation_task" and not output.json_dict:
+                self.checkpoints.restored.pop(crew_task.name, None)
+                output = None
+            if output is None:
+                pending.append(crew_task)
+            else:
+                crew_task.output = output
+                if crew_task.name == "validation_task":
+                    output.pydantic = TravelPlan.model_validate(output.json_dict)
+                if self.report_writer is not None:
+                    self.report_writer.on_task_output(output)
+
+        # CrewAI rejects a crew that starts with a ConditionalTask, so resolve leading ones here.
+        while pending and isinstance(pending[0], ConditionalTask):
+            replacement = self._resolve_conditional(pending[0])
+            if replacement is not None:
+                pending[0] = replacement
+                break
+            pending.pop(0)
+        return pending
+
+    # Settle a leading ConditionalTask before kickoff: None when done in code, else the task to run.
+    def _resolve_conditional(self, conditional: Task) -> Task | None:
+        if conditional is self.destination_research_task():
+            self._complete_research_merge()
+            return None
+        if conditional is self.itinerary_designer_task():
+            if not self._itinerary_chunks:
+                return self._unconditional_copy(conditional)
+            self._complete_itinerary_stitch()
+            return None
+        plan = self._deterministic_plan(self.checkpoints.inputs)
+        if plan is None:
+            return self._unconditional_copy(conditional)
+        self._complete_validation(plan)
+        return None
+
+    # Plain-Task copy of a ConditionalTask that has to run as the first task of a resumed crew.
+    def _unconditional_copy(self, conditional: Task) -> Task:
+        return Task(
+            config=self.tasks_config[conditional.name],  # type: ignore[index]
+            name=conditional.name,
+            context=conditional.context,
+        )
+
+    # Compact summary of a task's context tasks within its agent's context budget (None: CrewAI's raw outputs).
+    # In `report` mode the raw context is still sent; only the would-be savings are recorded.
+    def _task_context(self, crew_task: Task) -> str | None:
+        mode = context_compaction_mode()
+        outputs = [context_task.output for context_task in crew_task.context if context_task.output is not None]
+        if mode == "off" or not outputs:
+            return None
+        raw = aggregate_raw_outputs_from_tasks(crew_task.context)
+        compact = compact_context(outputs, agent_route(self._agent_name(crew_task))["context_tokens"])
+        raw_tokens, compact_tokens = count_tokens(raw), count_tokens(compact)
+        # Outputs that are already terse are passed through rather than rewritten.
+        if compact_tokens >= raw_tokens:
+            compact, compact_tokens = None, raw_tokens
+        if self.metrics is not None:
+            self.metrics.record_context(crew_task.name, raw_tokens, compact_tokens, applied=mode == "on")
+        return compact if mode == "on" else None
+
+    # CrewAI memoizes crew() per instance; a warm Bot reused across runs needs a fresh Crew (tasks stay memoized).
+    def build_crew(self) -> Crew:
+        return type(self).crew.__wrapped__(self)
+
+    # Wall-clock seconds of each task that ran in the last kickoff (restored and code-completed tasks excluded).
+    def task_timings(self) -> dict[str, float]:
+        return {crew_task.name: round(crew_task.execution_duration, 3) for crew_task in self._run_tasks if crew_task.execution_duration}
+
+    # Crew-shaped result for a run whose every task was restored from checkpoints.
+    def restored_output(self) -> CrewOutput:
+        final_task = self.validation_task()
+        return CrewOutput(
+            raw=final_task.output.raw,
+            pydantic=final_task.output.pydantic,
+            json_dict=final_task.output.json_dict,
+            tasks_output=[crew_task.output for crew_task in self._run_tasks],
+            token_usage=UsageMetrics(),
         )
 
     @crew
     def crew(self) -> Crew:
         """Creates the travel planner crew."""
 
+        topic_tasks = [getattr(self, name)() for name in research_task_names(self.run_inputs)]
         destination_task = self.destination_research_task()
         budget_task = self.budget_planner_task()
         itinerary_task = self.itinerary_designer_task()
         validation_task = self.validation_task()
 
+        # Queue-backed execution log (logs/execution.log, logs/runs/<run_id>.log) instead of CrewAI's output_log_file.
+        setup_execution_log()
+
         # Wire task dependencies so downstream tasks reuse prior outputs.
+        destination_task.context = topic_tasks
         budget_task.context = [destination_task]
-        itinerary_task.context = [destination_task, budget_task]
+        self._itinerary_chunks = self._build_itinerary_chunks([destination_task, budget_task])
+        itinerary_task.context = self._itinerary_chunks or [destination_task, budget_task]
         validation_task.context = [destination_task, budget_task, itinerary_task]
 
-        return Crew(
+        self._validated_in_code = False
+        self.report_writer = ReportWriter(self._report_path(), self.run_inputs, on_section=self.section_callback)
+        tasks = [*topic_tasks, destination_task, budget_task, *self._itinerary_chunks, itinerary_task, validation_task]
+        self._run_tasks = list(tasks)
+        # Task spans hang off the run span open while the crew is built (see _kickoff_with_backoff).
+        for crew_task in tasks:
+            if isinstance(crew_task.agent, TracedAgent):
+                crew_task.agent.trace_parent = current_span()
+        if self.checkpoints is not None:
+            tasks = self._restore_checkpoints(tasks)
+
+        return CompactContextCrew(
             agents=[
+                *(topic_task.agent for topic_task in topic_tasks),
                 self.destination_researcher(),
                 self.budget_planner(),
                 self.itinerary_designer(),
+                *(chunk_task.agent for chunk_task in self._itinerary_chunks),
                 self.validation_agent(),
             ],
-            tasks=[destination_task, budget_task, itinerary_task, validation_task],
+            tasks=tasks,
             process=Process.sequential,
             max_rpm=self._max_rpm(),
-            verbose=True,
-            output_log_file="logs/execution.log",
+            task_callback=self._on_task_complete,
+            context_builder=self._task_context,
+            verbose=console_verbose(),
         )
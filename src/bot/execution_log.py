@@ -0,0 +1,166 @@
+import atexit
+import gzip
+import logging
+import os
+import queue
+import re
+import shutil
+import sys
+import threading
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+
+from bot.tracing import current_run_id
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(run_id)s] %(message)s"
+# Per-run files kept open at once; older ones are closed and reopened if their run logs again.
+MAX_OPEN_RUN_FILES = 32
+
+# Execution log for runs, tasks, LLM and tool calls (replaces CrewAI's synchronous output_log_file).
+log = logging.getLogger("bot.execution")
+
+
+# LOG_LEVEL (DEBUG, INFO, WARNING, ...) for the execution log; DEBUG adds LLM/tool calls and task outputs.
+def log_level() -> int:
+    level = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO").strip().upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown LOG_LEVEL '{os.getenv('LOG_LEVEL')}' (use DEBUG, INFO, WARNING or ERROR).")
+    return level
+
+
+# CrewAI's step-by-step console echo: interactive terminals only; LOG_LEVEL=DEBUG forces it on, WARNING+ off.
+def console_verbose() -> bool:
+    level = log_level()
+    if level <= logging.DEBUG:
+        return True
+    if level >= logging.WARNING:
+        return False
+    return sys.stdout.isatty()
+
+
+def log_dir() -> Path:
+    return Path(os.getenv("LOG_DIR", "logs"))
+
+
+# Rotated files are gzip-compressed: execution.log.1.gz, execution.log.2.gz, ...
+def _gzip_rotator(source: str, dest: str) -> None:
+    with open(source, "rb") as plain, gzip.open(dest, "wb") as packed:
+        shutil.copyfileobj(plain, packed)
+    os.remove(source)
+
+
+def _rotating_handler(path: Path) -> RotatingFileHandler:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=int(float(os.getenv("LOG_MAX_MB", "10")) * 1024 * 1024),
+        backupCount=int(os.getenv("LOG_BACKUPS", "5")),
+        encoding="utf-8",
+    )
+    handler.namer = lambda name: f"{name}.gz"
+    handler.rotator = _gzip_rotator
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+class RunFileHandler(logging.Handler):
+    """Writes each run's records to logs/runs/<run_id>.log and keeps only the newest LOG_RUN_FILES files."""
+
+    def __init__(self, directory: Path, keep: int):
+        super().__init__()
+        self.directory = directory
+        self.keep = keep
+        self._files: OrderedDict[str, RotatingFileHandler] = OrderedDict()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.run_id == "-":
+            return
+        run_id = re.sub(r"[^A-Za-z0-9_.-]+", "_", record.run_id)
+        handler = self._files.pop(run_id, None)
+        if handler is None:
+            self._prune()
+            handler = _rotating_handler(self.directory / f"{run_id}.log")
+        self._files[run_id] = handler
+        handler.emit(record)
+        # The run's last record closes its file.
+        if getattr(record, "run_finished", False):
+            self._files.pop(run_id).close()
+        while len(self._files) > MAX_OPEN_RUN_FILES:
+            self._files.popitem(last=False)[1].close()
+
+    # Delete the oldest per-run logs (and their rotated parts) beyond the newest `keep` runs.
+    def _prune(self) -> None:
+        runs = sorted(self.directory.glob("*.log"), key=lambda path: path.stat().st_mtime)
+        for path in runs[: max(0, len(runs) - self.keep + 1)]:
+            if path.stem in self._files:
+                continue
+            for part in [path, *path.parent.glob(f"{path.name}.*.gz")]:
+                part.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        for handler in self._files.values():
+            handler.close()
+        self._files.clear()
+        super().close()
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Hands records to the writer thread; tags them with the run id and drops them when the queue is full."""
+
+    def __init__(self, records: queue.Queue):
+        super().__init__(records)
+        self.dropped = 0
+
+    # Runs on the calling thread, where the run's trace context is still in scope.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.run_id = current_run_id() or "-"
+        return super().prepare(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: QueueListener | None = None
+_setup_lock = threading.Lock()
+
+
+# Start the background writer once per process: records are queued by the caller and written to
+# logs/execution.log and logs/runs/<run_id>.log by one thread, so runs never block on disk I/O.
+def setup_execution_log() -> None:
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        directory = log_dir()
+        records: queue.Queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+        _listener = QueueListener(
+            records,
+            _rotating_handler(directory / "execution.log"),
+            RunFileHandler(directory / "runs", keep=int(os.getenv("LOG_RUN_FILES", "200"))),
+        )
+        log.addHandler(BoundedQueueHandler(records))
+        log.setLevel(log_level())
+        log.propagate = False
+        _listener.start()
+        atexit.register(stop_execution_log)
+
+
+# Drain the queue and close the files (at exit; also lets tests and benchmarks flush).
+def stop_execution_log() -> None:
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        dropped = sum(getattr(handler, "dropped", 0) for handler in log.handlers)
+        if dropped:
+            print(f"Execution log dropped {dropped} records (queue full; raise LOG_QUEUE_SIZE).", file=sys.stderr)
+        for handler in list(log.handlers):
+            log.removeHandler(handler)
+        _listener = None
@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Prompts carry trip values inline (PROMPT_LAYOUT=yaml) or in a trailing "- name: value" block (prefix).
+BUDGET_PATTERN = re.compile(r"(?:total budget|^- budget:)\s+([\d.]+)", re.M)
+DATES_PATTERN = re.compile(r"(?:from|^- travel_dates:)\s+(\d{4}-\d{2}-\d{2})\s+to\s+(\d{4}-\d{2}-\d{2})", re.M)
+DAY_RANGE_PATTERN = re.compile(r"Only write Day (\d+) to Day (\d+)")
+TOOL_NAME_PATTERN = re.compile(r"Tool Name: ([^\n]+)")
+DESTINATION_PATTERN = re.compile(r"insights for ([^\[\n]+?) for |^- destination: (.+?)$", re.M)
+
+
+class ProviderBucket:
+    """Provider-side per-minute request/token buckets that answer with Groq-style rate-limit headers."""
+
+    def __init__(self, rpm: int, tpm: int, window_seconds: float = 60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window_seconds = window_seconds
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / self.window_seconds)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / self.window_seconds)
+
+    def _headers(self) -> dict:
+        return {
+            "x-ratelimit-limit-requests": str(self.rpm),
+            "x-ratelimit-limit-tokens": str(self.tpm),
+            "x-ratelimit-remaining-requests": str(max(0, int(self._requests))),
+            "x-ratelimit-remaining-tokens": str(max(0, int(self._tokens))),
+            "x-ratelimit-reset-requests": f"{max(0.0, 1 - self._requests) * self.window_seconds / self.rpm:.2f}s",
+            "x-ratelimit-reset-tokens": f"{max(0.0, self.tpm - self._tokens) * self.window_seconds / self.tpm:.2f}s",
+        }
+
+    # Admit a request of `tokens` or reject it; returns (admitted, headers).
+    def take(self, tokens: int) -> tuple[bool, dict]:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._requests < 1 or self._tokens < tokens:
+                needed = max((1 - self._requests) / self.rpm, (tokens - self._tokens) / self.tpm, 0.0)
+                headers = self._headers()
+                headers["retry-after"] = f"{needed * self.window_seconds:.2f}"
+                return False, headers
+            self._requests -= 1
+            self._tokens -= tokens
+            return True, self._headers()
+
+
+class PrefixCache:
+    """Provider-side prompt prefix cache: the longest block-aligned prefix seen before is reported as cached."""
+
+    def __init__(self, block_tokens: int, max_entries: int = 100_000):
+        self.block_chars = max(1, block_tokens) * 4
+        self.max_entries = max_entries
+        self._seen: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Cached tokens of `prompt` (prompt characters / 4, like the reported prompt tokens); remembers its prefixes.
+    def lookup(self, prompt: str) -> int:
+        digest = hashlib.sha1()
+        cached = 0
+        with self._lock:
+            # Each key hashes the whole prefix up to its block, so a hit means every earlier block matched too.
+            for end in range(self.block_chars, len(prompt) + 1, self.block_chars):
+                digest.update(prompt[end - self.block_chars : end].encode("utf-8"))
+                key = digest.hexdigest()
+                if key in self._seen:
+                    self._seen.move_to_end(key)
+                    cached = end
+                else:
+                    self._seen[key] = None
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+        return cached // 4
+
+
+# Canned budget table for the requested cap.
+def _budget_answer(prompt: str) -> str:
+    match = BUDGET_PATTERN.search(prompt)
+    cap = float(match.group(1)) if match else 1000.0
+    shares = {"Accommodation": 0.4, "Food": 0.15, "Transport": 0.1, "Activities": 0.1, "Contingency": 0.05}
+    rows = [f"| {name} | {cap * share:.0f} | estimate |" for name, share in shares.items()]
+    return "\n".join(
+        [
+            "## Budget Breakdown",
+            "| Category | Estimated Cost | Rationale |",
+            "| --- | ---: | --- |",
+            *rows,
+            f"| Subtotal | {cap * 0.75:.0f} | Sum before contingency |",
+            f"| Grand Total | {cap * 0.8:.0f} | Final total trip estimate |",
+            "| Budget Status | Under budget | Compared with the cap |",
+        ]
+    )
+
+
+# Canned day blocks for the trip window (or the chunk's day range).
+def _itinerary_answer(prompt: str) -> str:
+    dates = DATES_PATTERN.search(prompt)
+    start = datetime.strptime(dates.group(1), "%Y-%m-%d") if dates else datetime(2026, 1, 1)
+    trip_days = (datetime.strptime(dates.group(2), "%Y-%m-%d") - start).days + 1 if dates else 3
+    day_range = DAY_RANGE_PATTERN.search(prompt)
+    first, last = (int(day_range.group(1)), int(day_range.group(2))) if day_range else (1, trip_days)
+    blocks = [
+        f"### Day {day}: {start + timedelta(days=day - 1):%Y-%m-%d}\n"
+        "- Morning: old town walk\n- Afternoon: market lunch\n- Evening: riverside stroll\n- Estimated spend: 10 USD"
+        for day in range(first, last + 1)
+    ]
+    return "## Day-wise Itinerary\n" + "\n".join(blocks)
+
+
+# Destination plus a digest of the task text, so each topic task issues its own search.
+def _search_query(messages: list[dict]) -> str:
+    prompt = "\n".join(str(message.get("content", "")) for message in messages)
+    destination = DESTINATION_PATTERN.search(prompt)
+    task = next((str(message.get("content", "")) for message in messages if message.get("role") == "user"), "")
+    return f"{(destination.group(1) or destination.group(2)) if destination else 'destination'} travel {hashlib.sha1(task.encode()).hexdigest()[:8]}"
+
+
+# One web search before answering: an OpenAI tool call when tools are sent natively, a ReAct
+# "Action" otherwise. None once the search result is in the conversation (or there is no search tool).
+def fake_tool_call(messages: list[dict], tools: list[dict] | None) -> dict | None:
+    prompt = "\n".join(str(message.get("content", "")) for message in messages)
+    if tools:
+        names = [tool.get("function", {}).get("name", "") for tool in tools]
+        search = next((name for name in names if "search" in name.lower() or "serper" in name.lower()), None)
+        if search is None or any(message.get("role") == "tool" for message in messages):
+            return None
+        arguments = json.dumps({"search_query": _search_query(messages)})
+        call = {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function", "function": {"name": search, "arguments": arguments}}
+        return {"role": "assistant", "content": None, "tool_calls": [call]}
+    search = next((name for name in TOOL_NAME_PATTERN.findall(prompt) if "serper" in name.lower() or "search" in name.lower()), None)
+    # The format instructions in the system prompt mention "Observation:" too; only a tool result counts.
+    observed = any("Observation:" in str(message.get("content", "")) for message in messages if message.get("role") != "system")
+    if search is None or observed:
+        return None
+    action = json.dumps({"search_query": _search_query(messages)})
+    return {"role": "assistant", "content": f"Thought: I should search first\nAction: {search.strip()}\nAction Input: {action}"}
+
+
+# ReAct-style final answer chosen from the agent role in the system prompt.
+def fake_answer(messages: list[dict]) -> str:
+    system = str(messages[0].get("content", "")) if messages else ""
+    prompt = "\n".join(str(message.get("content", "")) for message in messages)
+    if "Budget Planner" in system:
+        body = _budget_answer(prompt)
+    elif "Itinerary Designer" in system:
+        body = _itinerary_answer(prompt)
+    else:
+        body = "## Destination Overview\n- Historic centre (assumption: verify opening hours)\n- Transport: metro and buses"
+    return f"Thought: I now know the final answer\nFinal Answer: {body}"
+
+
+# Serper-style organic results for a query.
+def fake_search_results(query: str, num: int = 5) -> dict:
+    organic = [
+        {
+            "title": f"{query.title()} guide #{index}",
+            "link": f"https://travel-guide-{index}.example/{re.sub(r'[^a-z0-9]+', '-', query.lower()).strip('-')}",
+            "snippet": f"Result {index} for {query}: opening hours, typical prices and local transport tips.",
+            "position": index,
+        }
+        for index in range(1, num + 1)
+    ]
+    return {"searchParameters": {"q": query, "type": "search", "num": num}, "organic": organic, "credits": 1}
+
+
+def _rate_limited(headers: dict | None = None) -> JSONResponse:
+    error = {"message": "Rate limit reached for tokens. Please try again later.", "type": "tokens"}
+    return JSONResponse({"error": error}, status_code=429, headers=headers or {"retry-after": "1"})
+
+
+# A request larger than the per-minute token budget can never be admitted; like a real provider, refuse it for good.
+def _too_large(requested: int, limit: int) -> JSONResponse:
+    error = {
+        "message": f"Request too large on tokens per minute (TPM): Limit {limit}, Requested {requested}. "
+        "Please reduce your message size and try again.",
+        "type": "tokens",
+        "code": "request_too_large",
+    }
+    return JSONResponse({"error": error}, status_code=413)
+
+
+# Fake LLM provider and Serper endpoint; latency, reported completion tokens and injected 429s are configurable.
+def create_app() -> FastAPI:
+    rpm = int(os.getenv("FAKE_PROVIDER_RPM", "30"))
+    tpm = int(os.getenv("FAKE_PROVIDER_TPM", "6000"))
+    latency = float(os.getenv("FAKE_PROVIDER_LATENCY_MS", "200")) / 1000
+    # Reported completion tokens per call (0: derived from the answer length).
+    completion_tokens_override = int(os.getenv("FAKE_PROVIDER_COMPLETION_TOKENS", "0"))
+    # Fraction of admitted calls answered with a 429 anyway, as a real provider does under load.
+    error_rate = float(os.getenv("FAKE_PROVIDER_429_RATE", "0"))
+    tool_calls = os.getenv("FAKE_PROVIDER_TOOL_CALLS", "1").lower() not in ("0", "false", "no")
+    search_latency = float(os.getenv("FAKE_SERPER_LATENCY_MS", "100")) / 1000
+    search_error_rate = float(os.getenv("FAKE_SERPER_429_RATE", "0"))
+    chance = random.Random(int(os.getenv("FAKE_PROVIDER_SEED", "0")))
+    # Block size of the emulated prompt prefix cache (0 disables it); real providers cache from ~1024 tokens.
+    prefix_block_tokens = int(os.getenv("FAKE_PROVIDER_PREFIX_CACHE_BLOCK", "64"))
+    prefix_cache = PrefixCache(prefix_block_tokens) if prefix_block_tokens > 0 else None
+    app = FastAPI(title="Fake LLM provider")
+    # One set of limits per API key, like a real provider account.
+    buckets: dict[str, ProviderBucket] = {}
+    buckets_lock = threading.Lock()
+    app.state.buckets = buckets
+
+    def bucket_for(authorization: str) -> ProviderBucket:
+        with buckets_lock:
+            if authorization not in buckets:
+                buckets[authorization] = ProviderBucket(rpm=rpm, tpm=tpm)
+            return buckets[authorization]
+
+    # OpenAI-compatible chat completions with provider-style rate limiting.
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> JSONResponse:
+        body = await request.json()
+        messages = body.get("messages", [])
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in messages) // 4
+        bucket = bucket_for(request.headers.get("authorization", ""))
+        requested = prompt_tokens + int(body.get("max_tokens") or 0)
+        if requested > bucket.tpm:
+            return _too_large(requested, bucket.tpm)
+        admitted, headers = bucket.take(requested)
+        if not admitted:
+            return _rate_limited(headers)
+        if error_rate and chance.random() < error_rate:
+            return _rate_limited({**headers, "retry-after": "1"})
+        await asyncio.sleep(latency)
+        message = (fake_tool_call(messages, body.get("tools")) if tool_calls else None) or {
+            "role": "assistant",
+            "content": fake_answer(messages),
+        }
+        completion_tokens = completion_tokens_override or len(json.dumps(message)) // 4
+        prompt = "".join(f"{message.get('role')}\n{message.get('content', '')}\n" for message in messages)
+        cached_tokens = prefix_cache.lookup(prompt) if prefix_cache is not None else 0
+        return JSONResponse(
+            {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": message,
+                        "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                    "prompt_tokens_details": {"cached_tokens": min(cached_tokens, prompt_tokens)},
+                },
+            },
+            headers=headers,
+        )
+
+    # Serper-compatible search (point SERPER_BASE_URL at this server).
+    @app.post("/{search_type}")
+    async def search(search_type: str, request: Request) -> JSONResponse:
+        body = await request.json()
+        if search_error_rate and chance.random() < search_error_rate:
+            return JSONResponse({"message": "Too many requests", "statusCode": 429}, status_code=429)
+        await asyncio.sleep(search_latency)
+        return JSONResponse(fake_search_results(str(body.get("q", "")), int(body.get("num") or 5)))
+
+    return app
+
+
+# Local OpenAI-compatible provider (and Serper endpoint) for exercising rate limiting without real keys.
+def serve():
+    """Serve the fake LLM provider."""
+    import uvicorn
+
+    uvicorn.run(
+        create_app(),
+        host=os.getenv("FAKE_PROVIDER_HOST", "127.0.0.1"),
+        port=int(os.getenv("FAKE_PROVIDER_PORT", "8100")),
+    )
+
+
+if __name__ == "__main__":
+    serve()
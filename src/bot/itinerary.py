@@ -0,0 +1,81 @@
+import os
+import re
+from datetime import datetime, timedelta
+
+
+DAY_HEADING_LINE = re.compile(r"^[^\n]*\n?")
+
+
+# Trips longer than this many days are generated as concurrent day-range chunks.
+def itinerary_chunk_days() -> int:
+    return max(1, int(os.getenv("ITINERARY_CHUNK_DAYS", "7")))
+
+
+def _start_date(travel_dates: str) -> datetime | None:
+    try:
+        return datetime.strptime(travel_dates.split("to")[0].strip(), "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+# Split a trip into consecutive day ranges; empty when it fits in a single completion.
+def plan_itinerary_chunks(inputs: dict, chunk_days: int | None = None) -> list[dict]:
+    chunk_days = chunk_days or itinerary_chunk_days()
+    trip_days = int(inputs.get("trip_days") or 0)
+    if trip_days <= chunk_days:
+        return []
+    start = _start_date(str(inputs.get("travel_dates", "")))
+    budget = float(inputs.get("budget") or 0)
+    chunks = []
+    for first_day in range(1, trip_days + 1, chunk_days):
+        last_day = min(first_day + chunk_days - 1, trip_days)
+        chunks.append(
+            {
+                "index": len(chunks) + 1,
+                "first_day": first_day,
+                "last_day": last_day,
+                "first_date": (start + timedelta(days=first_day - 1)).strftime("%Y-%m-%d") if start else "",
+                "last_date": (start + timedelta(days=last_day - 1)).strftime("%Y-%m-%d") if start else "",
+                # Even per-day share of the cap, so stitched chunks stay inside the total budget.
+                "budget_share": round(budget * (last_day - first_day + 1) / trip_days, 2),
+            }
+        )
+    return chunks
+
+
+# Task config for one chunk: the itinerary prompt narrowed to its day range.
+def chunk_task_config(base_config: dict, chunk: dict, chunk_count: int, trip_days: int) -> dict:
+    dates = f" ({chunk['first_date']} to {chunk['last_date']})" if chunk["first_date"] else ""
+    return {
+        "description": (
+            f"{base_config['description'].rstrip()}\n\n"
+            f"This is part {chunk['index']} of {chunk_count} of a {trip_days}-day trip. Only write "
+            f"Day {chunk['first_day']} to Day {chunk['last_day']}{dates}, numbered with those absolute day numbers. "
+            f"Keep these days' combined spend within about {chunk['budget_share']:g} {{currency}}.\n"
+        ),
+        "expected_output": (
+            f"Markdown blocks '### Day N: <date>' for Day {chunk['first_day']}..Day {chunk['last_day']} only, "
+            "each with morning/afternoon/evening notes and one 'Estimated spend:' line."
+        ),
+    }
+
+
+# Join chunk outputs in order, forcing absolute day numbering when a chunk restarted at Day 1.
+def stitch_itinerary(chunk_outputs: list[str], chunks: list[dict]) -> str:
+    # The validator pulls in the pydantic plan models, which the pre-kickoff token estimate does not need.
+    from bot.validator import parse_itinerary_days
+
+    blocks = []
+    for text, chunk in zip(chunk_outputs, chunks):
+        days = parse_itinerary_days(text)
+        offset = chunk["first_day"] - 1 if days and days[0]["day"] == 1 and chunk["first_day"] > 1 else 0
+        start = datetime.strptime(chunk["first_date"], "%Y-%m-%d") if chunk["first_date"] else None
+        for day in days:
+            number = day["day"] + offset
+            # Drop days a chunk wrote outside its range; the neighbouring chunk owns them.
+            if not chunk["first_day"] <= number <= chunk["last_day"]:
+                continue
+            date = f": {(start + timedelta(days=number - chunk['first_day'])):%Y-%m-%d}" if start else ""
+            body = DAY_HEADING_LINE.sub("", day["text"], count=1).rstrip()
+            blocks.append(f"### Day {number}{date}\n{body}")
+    return "## Day-wise Itinerary\n" + "\n\n".join(blocks) + "\n"
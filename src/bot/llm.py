@@ -0,0 +1,277 @@
+import json
+import os
+import threading
+import time
+import weakref
+from typing import Any
+
+import litellm
+from crewai import LLM
+from litellm.integrations.custom_logger import CustomLogger
+
+from bot.llm_cache import (
+    completion_cache_enabled,
+    completion_cache_key,
+    completion_cache_ttl_seconds,
+    get_completion_cache,
+)
+from bot.credentials import Credential, CredentialPool
+from bot.execution_log import log
+from bot.rate_limiter import SharedRateLimiter, is_rate_limit_error
+from bot.registry import llm_http_handler
+from bot.run_metrics import RunMetrics
+from bot.tracing import current_span, enter_agent_iteration, record_span, span
+
+
+class RateLimitHeaderListener(CustomLogger):
+    """LiteLLM callback that feeds each completion's x-ratelimit-* headers to the limiter of the key it used."""
+
+    def __init__(self):
+        super().__init__()
+        self.limiters: weakref.WeakValueDictionary[str, SharedRateLimiter] = weakref.WeakValueDictionary()
+
+    def log_success_event(self, kwargs, response_obj, start_time, end_time):
+        headers = (getattr(response_obj, "_hidden_params", None) or {}).get("additional_headers")
+        metadata = (kwargs.get("litellm_params") or {}).get("metadata") or {}
+        limiter = self.limiters.get(str(metadata.get("credential")))
+        if headers and limiter is not None:
+            limiter.observe_headers(headers)
+
+    async def async_log_success_event(self, kwargs, response_obj, start_time, end_time):
+        self.log_success_event(kwargs, response_obj, start_time, end_time)
+
+
+_header_listener: RateLimitHeaderListener | None = None
+_header_listener_lock = threading.Lock()
+
+
+# Register one process-wide LiteLLM callback and subscribe every pooled key's limiter to its headers.
+def _listen_for_rate_limit_headers(credentials: CredentialPool) -> None:
+    global _header_listener
+    with _header_listener_lock:
+        if _header_listener is None:
+            _header_listener = RateLimitHeaderListener()
+            litellm.callbacks.append(_header_listener)
+        for credential in credentials.credentials:
+            _header_listener.limiters[credential.name] = credential.rate_limiter
+
+
+# Response headers attached to a LiteLLM error (retry-after, x-ratelimit-reset-*), if any.
+def _error_headers(err: Exception) -> dict:
+    headers = getattr(err, "litellm_response_headers", None)
+    if headers is None:
+        headers = getattr(getattr(err, "response", None), "headers", None)
+    return dict(headers or {})
+
+
+# Field of a provider usage payload, whether LiteLLM hands it over as a dict or as a usage object.
+def _usage_field(usage: Any, name: str) -> Any:
+    if usage is None:
+        return None
+    return usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+
+
+# Providers LiteLLM calls through its own HTTP handler, which takes the shared pool as `client`;
+# OpenAI-compatible providers pick it up from litellm.client_session instead.
+HTTP_HANDLER_PROVIDERS = ("groq",)
+
+
+class RateLimitedLLM(LLM):
+    """LiteLLM-backed client that sends every completion through a pooled credential's rate limiter."""
+
+    # Route through LiteLLM so this subclass is always the instance that gets built.
+    def __new__(
+        cls,
+        model: str,
+        credentials: CredentialPool | None = None,
+        metrics: RunMetrics | None = None,
+        agent_name: str = "",
+        route: dict | None = None,
+        **kwargs: Any,
+    ):
+        kwargs["is_litellm"] = True
+        return super().__new__(cls, model, **kwargs)
+
+    def __init__(
+        self,
+        model: str,
+        credentials: CredentialPool | None = None,
+        metrics: RunMetrics | None = None,
+        agent_name: str = "",
+        route: dict | None = None,
+        **kwargs: Any,
+    ):
+        kwargs["is_litellm"] = True
+        if credentials is not None:
+            # SDK-level retries would hide 429s and their headers from the key's limiter.
+            kwargs.setdefault("max_retries", 0)
+        super().__init__(model=model, **kwargs)
+        self.credentials = credentials
+        self.metrics = metrics
+        # Agent this client serves and its model route (tier / pinned model), for routing and per-agent metrics.
+        self.agent_name = agent_name
+        self.route = route or {}
+        # Key chosen for the call in flight on this thread; applied when LiteLLM params are built.
+        self._active = threading.local()
+        llm_http_handler()
+        if credentials is not None:
+            _listen_for_rate_limit_headers(credentials)
+
+    # Rough pre-call token reservation: prompt characters / 4 plus the completion cap.
+    def _estimate_call_tokens(self, messages: Any) -> int:
+        prompt = messages if isinstance(messages, str) else json.dumps(messages, default=str)
+        return len(prompt) // 4 + int(self.max_tokens or 0)
+
+    # What a finished call cost the per-minute token budget, on the same basis as the estimate: providers
+    # count the prompt plus the completion cap when the request arrives, not the completion it produced.
+    def _charged_tokens(self, usage_before: dict) -> int:
+        prompt = self._token_usage["prompt_tokens"] - usage_before["prompt_tokens"]
+        completion = self._token_usage["completion_tokens"] - usage_before["completion_tokens"]
+        return prompt + max(completion, int(self.max_tokens or 0))
+
+    # Sampling parameters that change the completion and therefore the cache key.
+    def _sampling_params(self) -> dict:
+        return {
+            "temperature": self.temperature,
+            "top_p": self.top_p,
+            "max_tokens": self.max_tokens,
+            "stop": self.stop,
+            "seed": self.seed,
+            "response_format": str(self.response_format) if self.response_format else None,
+        }
+
+    # Point the completion at the key (and its model/endpoint) picked for this call.
+    def _prepare_completion_params(self, messages, tools=None, **kwargs: Any) -> dict[str, Any]:
+        params = super()._prepare_completion_params(messages, tools, **kwargs)
+        credential: Credential | None = getattr(self._active, "credential", None)
+        if credential is not None:
+            params.pop("api_base", None)
+            params.pop("base_url", None)
+            params.update(model=self._model_for(credential), api_key=credential.api_key)
+            if credential.api_base:
+                params["base_url"] = credential.api_base
+            params["metadata"] = {**(params.get("metadata") or {}), "credential": credential.name}
+        if str(params.get("model", "")).split("/", 1)[0] in HTTP_HANDLER_PROVIDERS:
+            params["client"] = llm_http_handler()
+        return params
+
+    # A pinned model wins; otherwise the key picks the model for this agent's tier.
+    def _model_for(self, credential: Credential) -> str:
+        return self.route.get("model") or credential.model_for(self.route.get("tier", "reasoning"))
+
+    # CrewAI only reads a top-level cached-token count; OpenAI-compatible providers (and LiteLLM's
+    # normalized usage, Anthropic cache reads included) report prefix-cache hits in prompt_tokens_details.
+    def _track_token_usage_internal(self, usage_data: Any) -> None:
+        super()._track_token_usage_internal(usage_data)
+        if _usage_field(usage_data, "cached_tokens") or _usage_field(usage_data, "cached_prompt_tokens"):
+            return
+        cached = _usage_field(_usage_field(usage_data, "prompt_tokens_details"), "cached_tokens")
+        self._token_usage["cached_prompt_tokens"] += int(cached or 0)
+
+    # Models that can answer a call from this client: the pinned model, or each pooled key's model for the tier.
+    def _cache_models(self) -> list[str]:
+        if self.credentials is None:
+            return [self.model]
+        return list(dict.fromkeys(self._model_for(credential) for credential in self.credentials.credentials))
+
+    # Count the call in the run metrics and on its trace span (token split from the provider's usage).
+    def _record_call(self, model: str, started: float, tokens: int, usage_before: dict) -> None:
+        # Model that answered the last call on this thread, for the completion cache key.
+        self._active.model = model
+        seconds = time.perf_counter() - started
+        prompt_tokens = self._token_usage["prompt_tokens"] - usage_before["prompt_tokens"]
+        completion_tokens = self._token_usage["completion_tokens"] - usage_before["completion_tokens"]
+        if self.metrics is not None:
+            # Per-model split, so the token estimator calibrates the model that answered rather than MODEL.
+            self.metrics.record_llm_call(self.agent_name, model, seconds, tokens, prompt_tokens, completion_tokens)
+        log.debug("LLM call %s on %s: %s tokens in %.2fs", self.agent_name, model, tokens, seconds)
+        current_span().set(
+            model=model,
+            tokens=tokens,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cached_prompt_tokens=self._token_usage["cached_prompt_tokens"] - usage_before["cached_prompt_tokens"],
+        )
+
+    def call(self, messages, tools=None, **kwargs: Any):
+        # Each agent-loop step starts a new iteration span; the LLM call and the tools it triggers nest under it.
+        enter_agent_iteration(getattr(getattr(kwargs.get("from_agent"), "agent_executor", None), "iterations", None))
+        with span(self.agent_name or self.model, "llm_call", agent=self.agent_name, model=self.model) as call_span:
+            # Tool-executing and structured-output calls are never served from cache.
+            cacheable = (
+                completion_cache_enabled()
+                and not kwargs.get("available_functions")
+                and kwargs.get("response_model") is None
+            )
+            if cacheable:
+                for model in self._cache_models():
+                    cached = get_completion_cache().get(completion_cache_key(model, messages, tools, self._sampling_params()))
+                    if cached is not None:
+                        entry = json.loads(cached)
+                        if self.metrics is not None:
+                            self.metrics.record_cache_hit(entry.get("total_tokens", 0))
+                        call_span.set(cache_hit=True, cached_tokens=entry.get("total_tokens", 0), model=model)
+                        return entry["response"]
+
+            tokens_before = self._token_usage["total_tokens"]
+            result = self._call_with_rate_limit(messages, tools, **kwargs)
+            if cacheable and isinstance(result, str) and result:
+                # Keyed on the model that actually answered, which depends on the key the pool picked.
+                cache_key = completion_cache_key(self._active.model, messages, tools, self._sampling_params())
+                entry = {"response": result, "total_tokens": self._token_usage["total_tokens"] - tokens_before}
+                get_completion_cache().set(cache_key, json.dumps(entry), ttl_seconds=completion_cache_ttl_seconds())
+            return result
+
+    def _call_with_rate_limit(self, messages, tools=None, **kwargs: Any):
+        if self.credentials is None:
+            started = time.perf_counter()
+            usage_before = dict(self._token_usage)
+            result = super().call(messages, tools=tools, **kwargs)
+            used = self._token_usage["total_tokens"] - usage_before["total_tokens"]
+            self._record_call(self.model, started, used, usage_before)
+            return result
+
+        max_attempts = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "5")) + 1
+        call_span = current_span()
+        for attempt in range(1, max_attempts + 1):
+            waiting = time.perf_counter()
+            credential, reservation = self.credentials.acquire(self._estimate_call_tokens(messages))
+            # Time spent queued on the key pool's per-minute budgets before the request could go out.
+            record_span(
+                credential.name,
+                "quota_wait",
+                time.perf_counter() - waiting,
+                attempt=attempt,
+                tokens_reserved=reservation["tokens"],
+            )
+            usage_before = dict(self._token_usage)
+            self._active.credential = credential
+            started = time.perf_counter()
+            call_span.set(attempt=attempt, credential=credential.name)
+            try:
+                result = super().call(messages, tools=tools, **kwargs)
+            except Exception as e:
+                # Other failures keep their estimate reserved; the provider may still have counted them.
+                if not is_rate_limit_error(e):
+                    raise
+                # 429: pause this key for the provider-advised wait; the retry fails over to the key with most headroom.
+                credential.rate_limited(reservation, _error_headers(e))
+                call_span.add("rate_limited")
+                log.warning(
+                    "LLM call %s rate limited on key %s (attempt %s/%s)", self.agent_name, credential.name, attempt, max_attempts
+                )
+                if attempt == max_attempts:
+                    raise
+                continue
+            finally:
+                self._active.credential = None
+            used = self._token_usage["total_tokens"] - usage_before["total_tokens"]
+            if used > 0:
+                charged = max(used, self._charged_tokens(usage_before))
+            else:
+                # Keep the estimate when the provider reported no usage.
+                used = charged = reservation["tokens"]
+            credential.rate_limiter.settle(reservation, charged)
+            credential.record(used, reservation, charged)
+            self._record_call(self._model_for(credential), started, used, usage_before)
+            return result
@@ -0,0 +1,35 @@
+import hashlib
+import json
+import os
+from typing import Any
+
+from bot.cache_store import SQLiteCache, get_cache
+
+
+# Completion caching is opt-in: identical prompts only repeat safely for replays/tests/popular trips.
+def completion_cache_enabled() -> bool:
+    return os.getenv("LLM_CACHE", "").lower() in ("1", "true", "yes")
+
+
+# Shared completion cache for this process; entries age out by TTL and the file is size-capped.
+def get_completion_cache() -> SQLiteCache:
+    return get_cache(
+        os.getenv("LLM_CACHE_PATH", "cache/llm.sqlite"),
+        max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", "200")) * 1024 * 1024),
+    )
+
+
+def completion_cache_ttl_seconds() -> int:
+    return int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+
+# Exact-match key over everything that changes the completion.
+def completion_cache_key(model: str, messages: Any, tools: Any, sampling: dict) -> str:
+    payload = {
+        "model": model,
+        "messages": messages,
+        "tools": tools,
+        "sampling": sampling,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
@@ -5,26 +5,33 @@ import logging
 import os
 import re
 import sys
+import uuid
 import warnings
 from datetime import datetime
 from pathlib import Path
-from time import sleep
-
-from bot.crew import Bot
+from time import perf_counter, sleep
+from typing import TYPE_CHECKING, Callable
+
+from bot.checkpoint import CheckpointStore
+from bot.coalescing import get_coalescing_stats
+from bot.credentials import CredentialPool, get_credential_pool
+from bot.plan_library import get_plan_library, plan_library_enabled
+from bot.prompt_layout import prefix_cache_history, prompt_layout, record_prefix_cache
+from bot.quota import DailyQuotaExceeded
+from bot.rate_limiter import is_rate_limit_error
+from bot.run_metrics import RunMetrics
+from bot.token_estimator import estimate_run_floor, estimate_run_usage, record_run_usage
+
+# The crew stack (CrewAI, crewai_tools, LiteLLM) costs seconds to import, and the execution log and
+# tracer start threads; both are loaded only once a kickoff is certain, so --help, input errors and
+# quota rejections return immediately.
+if TYPE_CHECKING:
+    from bot.crew import Bot
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 logging.getLogger("LiteLLM").setLevel(logging.CRITICAL)
 logging.getLogger("litellm").setLevel(logging.CRITICAL)
 
-# Hard provider caps enforced regardless of environment overrides.
-HARD_LIMITS = {
-    "rpm": 30,
-    "rpd": 14400,
-    "tpm": int(os.getenv("LLM_PROVIDER_TPM_CAP", "6000")),
-    "tpd": 500000,
-}
-
-
 # Create a starter output skeleton on first run.
 def _ensure_output_file_exists() -> None:
     """Auto-create output.md when missing."""
@@ -47,103 +54,10 @@ def _ensure_output_file_exists() -> None:
 
 
 # Clear previous report so each run writes a fresh final document.
-def _reset_final_output_file() -> None:
+def _reset_final_output_file(output_path: Path = Path("output.md")) -> None:
     """Ensure final report always overwrites previous content."""
-    Path("output.md").write_text("", encoding="utf-8")
-
-
-# Ensure required top-level sections exist even if LLM output is partial.
-def _ensure_required_output_sections(inputs: dict) -> None:
-    """Guarantee required sections exist in output.md."""
-    output_path = Path("output.md")
-    content = output_path.read_text(encoding="utf-8") if output_path.exists() else ""
-
-    required_sections = [
-        (
-            r"(?im)^\s*#?\s*travel\s*plan\s*:",
-            f"# Travel Plan: {inputs.get('destination', '<Destination>')}",
-        ),
-        (r"(?im)^\s*##\s*destination\s*overview\s*:?\s*$", "## Destination Overview"),
-        (
-            r"(?im)^\s*##\s*budget\s*breakdown\s*:?\s*$",
-            "## Budget Breakdown",
-        ),
-        (r"(?im)^\s*##\s*day-wise\s*itinerary\s*:?\s*$", "## Day-wise Itinerary"),
-        (
-            r"(?im)^\s*##\s*validation\s*summary\s*:?\s*$",
-            "## Validation Summary\n- Budget status: <Under / At / Over budget>\n- Assumptions: <key assumptions>\n- Risk factors: <key risks>",
-        ),
-    ]
-
-    # Append only the sections that are absent.
-    missing_lines = [line for pattern, line in required_sections if not re.search(pattern, content)]
-    if missing_lines:
-        suffix = ("\n\n" if content.strip() else "") + "\n".join(missing_lines) + "\n"
-        output_path.write_text(content + suffix, encoding="utf-8")
-
-
-# Parse numeric totals from markdown budget rows.
-def _extract_budget_total_from_markdown(content: str) -> float | None:
-    """Extract budget total from markdown table rows when available."""
-    # Prefer Grand Total if present, otherwise use Total.
-    for label in ("Grand Total", "Total"):
-        pattern = rf"(?im)^\|\s*{re.escape(label)}\s*\|\s*([^|]+?)\s*\|"
-        match = re.search(pattern, content)
-        if not match:
-            continue
-        amount_text = re.sub(r"[^\d.\-]", "", match.group(1))
-        if not amount_text:
-            continue
-        try:
-            return float(amount_text)
-        except ValueError:
-            continue
-    return None
-
-
-# Fill unresolved validation placeholders with concrete defaults.
-def _upsert_validation_summary(content: str, inputs: dict) -> str:
-    """Replace placeholder validation values with concrete defaults."""
-    total_estimate = _extract_budget_total_from_markdown(content)
-    budget_cap = float(inputs.get("budget", 0))
-
-    # Derive budget status from computed total vs user budget cap.
-    status = "Unknown"
-    if total_estimate is not None and budget_cap > 0:
-        if total_estimate < budget_cap:
-            status = "Under budget"
-        elif total_estimate > budget_cap:
-            status = "Over budget"
-        else:
-            status = "At budget"
-
-    replacements = {
-        r"(?im)^- Budget status:\s*<[^>]+>\s*$": f"- Budget status: {status}",
-        r"(?im)^- Assumptions:\s*<[^>]+>\s*$": "- Assumptions: Cost estimates may vary by season, availability, and booking timing.",
-        r"(?im)^- Risk factors:\s*<[^>]+>\s*$": "- Risk factors: Price fluctuations, attraction closures, and transport delays can affect this plan.",
-        r"(?im)^\|\s*Budget status\s*\|\s*<[^>]+>\s*\|\s*$": f"| Budget status | {status} |",
-        r"(?im)^\|\s*Assumptions\s*\|\s*<[^>]+>\s*\|\s*$": "| Assumptions | Cost estimates may vary by season, availability, and booking timing. |",
-        r"(?im)^\|\s*Risk factors\s*\|\s*<[^>]+>\s*\|\s*$": "| Risk factors | Price fluctuations, attraction closures, and transport delays can affect this plan. |",
-    }
-
-    updated = content
-    for pattern, replacement in replacements.items():
-        updated = re.sub(pattern, replacement, updated)
-    return updated
-
-
-# Keep execution log file available for external tooling/hooks.
-def _ensure_execution_log_file() -> None:
-   
-    log_path = Path("logs/execution.log")
-    txt_log_path = Path("logs/execution.log")
-    log_path.parent.mkdir(parents=True, exist_ok=True)
-    if log_path.exists():
-        return
-    if txt_log_path.exists():
-        log_path.write_text(txt_log_path.read_text(encoding="utf-8"), encoding="utf-8")
-        return
-    log_path.write_text("", encoding="utf-8")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text("", encoding="utf-8")
 
 
 # Convert date-range input into inclusive trip-day count.
@@ -227,133 +141,138 @@ def _build_inputs_from_args() -> dict:
     }
 
 
-# Resolve and create quota state path.
-def _quota_file() -> Path:
-    path = Path("logs/quota_usage.json")
-    path.parent.mkdir(parents=True, exist_ok=True)
-    return path
-
-
-# Load persisted quota counters with safe defaults.
-def _load_quota_state() -> dict:
-    path = _quota_file()
-    if not path.exists():
-        return {"days": {}, "minutes": {}}
-    try:
-        loaded = json.loads(path.read_text(encoding="utf-8"))
-    except json.JSONDecodeError:
-        return {"days": {}, "minutes": {}}
-    return {
-        "days": loaded.get("days", {}),
-        "minutes": loaded.get("minutes", {}),
-    }
-
-
-# Persist quota counters after each successful run.
-def _save_quota_state(state: dict) -> None:
-    _quota_file().write_text(json.dumps(state, indent=2), encoding="utf-8")
-
-
-# Rough token estimate to guard against hard TPM limits.
-def _estimate_tokens_for_inputs(inputs: dict) -> int:
-    payload_size = len(json.dumps(inputs))
-    estimated = max(800, payload_size // 2)
-    configured = int(os.getenv("LLM_EST_TOKENS_PER_RUN", str(estimated)))
-    return min(configured, HARD_LIMITS["tpm"])
-
-
-# Apply configured limits while respecting hard caps.
-def _effective_limit(env_name: str, hard_cap: int) -> int:
-    return min(int(os.getenv(env_name, str(hard_cap))), hard_cap)
-
+# Parse checkpoint options: a fresh run id, or `--resume <run_id>` to continue an interrupted run.
+def _parse_checkpoint_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--run-id", default=os.getenv("RUN_ID"))
+    parser.add_argument("--resume", metavar="RUN_ID")
+    args, _ = parser.parse_known_args()
+    return args
+
+
+# Checkpoint store plus inputs for this CLI run; a resumed run reuses the inputs it was started with.
+def _prepare_checkpoints(inputs: dict | None = None) -> tuple[CheckpointStore, dict]:
+    args = _parse_checkpoint_args()
+    if args.resume:
+        checkpoints = CheckpointStore(args.resume)
+        inputs = checkpoints.saved_inputs()
+        if inputs is None:
+            raise Exception(f"No checkpoints found for run id '{args.resume}' in {checkpoints.directory}.")
+        print(f"Resuming run {checkpoints.run_id}")
+    else:
+        checkpoints = CheckpointStore(args.run_id or f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}")
+        inputs = inputs or _build_inputs_from_args()
+        print(f"Run id: {checkpoints.run_id} (resume with --resume {checkpoints.run_id})")
+    checkpoints.start(inputs)
+    if not args.resume:
+        _match_plan_library(checkpoints, inputs)
+        if checkpoints.library_match is not None:
+            match = checkpoints.library_match
+            print(f"Plan library | plan_id={match['plan_id']} tier={match['tier']} similarity={match['similarity']}")
+    return checkpoints, inputs
+
+
+# Seed a fresh run from the closest stored plan: served whole, or with only the budget stage re-run.
+def _match_plan_library(checkpoints: CheckpointStore, inputs: dict) -> None:
+    if not plan_library_enabled():
+        return
+    match = get_plan_library().match(inputs)
+    if match is not None:
+        checkpoints.seed(match)
 
-# Enforce daily/per-minute request and token budgets.
-def _check_quota(inputs: dict) -> None:
-    requests_per_run = _effective_limit("LLM_EST_REQUESTS_PER_RUN", HARD_LIMITS["rpm"])
-    tokens_per_run = _estimate_tokens_for_inputs(inputs)
-    daily_limit = _effective_limit("LLM_DAILY_LIMIT", HARD_LIMITS["rpd"])
-    daily_token_limit = _effective_limit("LLM_DAILY_TOKEN_LIMIT", HARD_LIMITS["tpd"])
 
-    if requests_per_run > HARD_LIMITS["rpm"]:
-        raise Exception(f"Per-run request estimate exceeds hard RPM cap ({HARD_LIMITS['rpm']}).")
-    if tokens_per_run > HARD_LIMITS["tpm"]:
-        raise Exception(f"Per-run token estimate exceeds hard TPM cap ({HARD_LIMITS['tpm']}).")
+# Keep a plan that passed every code check for later near-duplicate requests (a plan served whole is already kept).
+def _store_plan(inputs: dict, result, checkpoints: CheckpointStore) -> None:
+    plan = getattr(result, "pydantic", None)
+    if not plan_library_enabled() or plan is None or plan.validation.issues:
+        return
+    if checkpoints.library_match is not None and checkpoints.library_match["tier"] == "plan":
+        return
+    get_plan_library().add(inputs, checkpoints.entries())
 
-    today = datetime.now().strftime("%Y-%m-%d")
-    this_minute = datetime.now().strftime("%Y-%m-%d %H:%M")
-    state = _load_quota_state()
 
-    day_entry = state["days"].get(today, {"requests": 0, "tokens": 0})
-    minute_entry = state["minutes"].get(this_minute, {"requests": 0, "tokens": 0})
+# Build the same input envelope as the CLI from one request record (batch JSONL line or HTTP body).
+def _build_inputs_from_record(record: dict, default_request_id: str) -> dict:
+    travel_dates = str(record.get("travel_dates", os.getenv("TRAVEL_DATES", "2026-04-10 to 2026-04-14")))
+    raw_id = str(record.get("request_id") or default_request_id)
+    return {
+        # Safe for use in report file names.
+        "request_id": re.sub(r"[^A-Za-z0-9_-]+", "_", raw_id),
+        "destination": str(record.get("destination", os.getenv("TRAVEL_DESTINATION", "Kyoto, Japan"))),
+        "travel_dates": travel_dates,
+        "budget": float(record.get("budget", os.getenv("TRAVEL_BUDGET", "1500"))),
+        "preferences": str(
+            record.get(
+                "preferences",
+                os.getenv("TRAVEL_PREFERENCES", "culture, food, walking, low-cost local experiences"),
+            )
+        ),
+        "currency": str(record.get("currency", os.getenv("TRAVEL_CURRENCY", "USD"))),
+        "trip_days": _parse_trip_days(travel_dates),
+        "current_year": str(datetime.now().year),
+    }
 
-    used_daily_requests = int(day_entry.get("requests", 0))
-    used_daily_tokens = int(day_entry.get("tokens", 0))
-    used_minute_requests = int(minute_entry.get("requests", 0))
-    used_minute_tokens = int(minute_entry.get("tokens", 0))
 
-    # Fail fast for daily limits.
-    if used_daily_requests + requests_per_run > daily_limit:
-        raise Exception(
-            f"Daily LLM request limit reached: {used_daily_requests}/{daily_limit}. "
+# Per-run token estimate from the rendered task prompts.
+# With `at_most`, a run whose completions alone exceed it is sized without loading the tokenizer.
+def _estimate_tokens_for_inputs(inputs: dict, at_most: int | None = None) -> int:
+    if os.getenv("LLM_EST_TOKENS_PER_RUN"):
+        return int(os.environ["LLM_EST_TOKENS_PER_RUN"])
+    floor = estimate_run_floor(inputs)["completion_tokens"]
+    if at_most is not None and floor > at_most:
+        return floor
+    return estimate_run_usage(inputs)["total_tokens"]
+
+
+# Estimate requests per run from the calibrated call count.
+def _estimate_requests_for_inputs(inputs: dict) -> int:
+    if os.getenv("LLM_EST_REQUESTS_PER_RUN"):
+        return int(os.environ["LLM_EST_REQUESTS_PER_RUN"])
+    return estimate_run_floor(inputs)["requests"]
+
+
+# Fail fast when a run would exceed what is left of the pooled daily request/token budgets.
+# Per-minute pacing and per-key usage booking happen on every call inside the key pool.
+def _check_daily_quota(inputs: dict) -> None:
+    remaining = _credential_pool().daily_remaining()
+    requests_per_run = _estimate_requests_for_inputs(inputs)
+    if requests_per_run > remaining["requests"]:
+        raise DailyQuotaExceeded(
+            f"Daily LLM request limit reached: {remaining['requests']} requests left across all keys. "
             "Try again tomorrow or increase quota."
         )
-    if used_daily_tokens + tokens_per_run > daily_token_limit:
-        raise Exception(
-            f"Daily LLM token limit reached: {used_daily_tokens}/{daily_token_limit}. "
+    tokens_per_run = _estimate_tokens_for_inputs(inputs, at_most=remaining["tokens"])
+    if tokens_per_run > remaining["tokens"]:
+        raise DailyQuotaExceeded(
+            f"Daily LLM token limit reached: {remaining['tokens']} tokens left across all keys. "
             "Try again tomorrow or reduce token usage."
         )
-    # Soft-throttle minute limits instead of failing immediately.
-    if used_minute_requests + requests_per_run > HARD_LIMITS["rpm"]:
-        # Throttle until next minute window to avoid hard-failing on RPM.
-        seconds_to_next_minute = max(1, 60 - datetime.now().second)
-        print(
-            f"Per-minute request limit near cap ({used_minute_requests}/{HARD_LIMITS['rpm']}). "
-            f"Sleeping {seconds_to_next_minute}s to stay within limits..."
-        )
-        sleep(seconds_to_next_minute)
-        return _check_quota(inputs)
-    if used_minute_tokens + tokens_per_run > HARD_LIMITS["tpm"]:
-        # Throttle until next minute window to avoid hard-failing on TPM.
-        seconds_to_next_minute = max(1, 60 - datetime.now().second)
-        print(
-            f"Per-minute token limit near cap ({used_minute_tokens}/{HARD_LIMITS['tpm']}). "
-            f"Sleeping {seconds_to_next_minute}s to stay within limits..."
-        )
-        sleep(seconds_to_next_minute)
-        return _check_quota(inputs)
-
 
-# Record estimated usage into daily and minute windows.
-def _record_usage(inputs: dict) -> None:
-    requests_per_run = _effective_limit("LLM_EST_REQUESTS_PER_RUN", HARD_LIMITS["rpm"])
-    tokens_per_run = _estimate_tokens_for_inputs(inputs)
-    today = datetime.now().strftime("%Y-%m-%d")
-    this_minute = datetime.now().strftime("%Y-%m-%d %H:%M")
-    state = _load_quota_state()
 
-    day_entry = state["days"].get(today, {"requests": 0, "tokens": 0})
-    day_entry["requests"] = int(day_entry.get("requests", 0)) + requests_per_run
-    day_entry["tokens"] = int(day_entry.get("tokens", 0)) + tokens_per_run
-    state["days"][today] = day_entry
-
-    minute_entry = state["minutes"].get(this_minute, {"requests": 0, "tokens": 0})
-    minute_entry["requests"] = int(minute_entry.get("requests", 0)) + requests_per_run
-    minute_entry["tokens"] = int(minute_entry.get("tokens", 0)) + tokens_per_run
-    state["minutes"][this_minute] = minute_entry
+# Fold a complete run (nothing served from caches or checkpoints) into the estimator's calibration;
+# every run's per-task prefix-cache counts go into the cross-run hit-ratio history.
+def _record_usage(inputs: dict, usage: dict | None = None, calibrate: bool = True) -> None:
+    if usage:
+        record_prefix_cache(usage.get("prefix_cache", []))
+    if calibrate and usage and not usage["cache_hits"]:
+        record_run_usage(inputs, usage)
 
-    # Keep recent minute windows only.
-    minute_keys = sorted(state["minutes"].keys())
-    if len(minute_keys) > 120:
-        for old_key in minute_keys[:-120]:
-            state["minutes"].pop(old_key, None)
 
-    _save_quota_state(state)
+# Count a finished run in the process-wide coalescing stats (tasks it waited for vs computed itself).
+def _record_coalescing(checkpoints: CheckpointStore) -> None:
+    get_coalescing_stats().record_run(checkpoints.shared, checkpoints.saved)
 
 
 # Normalize token usage metrics returned by CrewAI kickoff output.
-def _extract_token_usage(result) -> dict | None:
+def _extract_token_usage(result, metrics: RunMetrics | None = None) -> dict | None:
     usage = getattr(result, "token_usage", None)
-    if usage is None:
+    # Tokens served from the local completion cache never reach the provider.
+    cache_stats = (
+        metrics.snapshot()
+        if metrics
+        else {"cache_hits": 0, "cache_hit_tokens": 0, "agents": [], "context": [], "prefix_cache": []}
+    )
+    if usage is None and not cache_stats["cache_hits"]:
         return None
 
     total_tokens = int(getattr(usage, "total_tokens", 0) or 0)
@@ -362,7 +281,7 @@ def _extract_token_usage(result) -> dict | None:
     cached_prompt_tokens = int(getattr(usage, "cached_prompt_tokens", 0) or 0)
     successful_requests = int(getattr(usage, "successful_requests", 0) or 0)
 
-    if total_tokens <= 0 and prompt_tokens <= 0 and completion_tokens <= 0:
+    if total_tokens <= 0 and prompt_tokens <= 0 and completion_tokens <= 0 and not cache_stats["cache_hits"]:
         return None
 
     return {
@@ -371,12 +290,24 @@ def _extract_token_usage(result) -> dict | None:
         "completion_tokens": completion_tokens,
         "cached_prompt_tokens": cached_prompt_tokens,
         "successful_requests": successful_requests,
+        "cache_hits": cache_stats["cache_hits"],
+        "cache_hit_tokens": cache_stats["cache_hit_tokens"],
+        # Provider calls, tokens and latency per agent and model.
+        "agents": cache_stats["agents"],
+        # Context tokens each task received raw vs compacted (CONTEXT_COMPACTION).
+        "context": cache_stats["context"],
+        # Prompt tokens per task and the share the provider served from its prefix cache (PROMPT_LAYOUT).
+        "prefix_cache": cache_stats["prefix_cache"],
     }
 
 
 # Print token metrics in CLI output after crew completion.
-def _print_token_usage_summary(result, inputs: dict) -> None:
-    usage = _extract_token_usage(result)
+def _print_token_usage_summary(result, inputs: dict, metrics: RunMetrics | None = None) -> None:
+    _print_usage(_extract_token_usage(result, metrics), inputs)
+
+
+# Print token, per-agent, context and prefix-cache lines for one run's usage (CLI or a finished worker job).
+def _print_usage(usage: dict | None, inputs: dict) -> None:
     if usage:
         print(
             "Token usage | "
@@ -384,8 +315,38 @@ def _print_token_usage_summary(result, inputs: dict) -> None:
             f"prompt={usage['prompt_tokens']} "
             f"completion={usage['completion_tokens']} "
             f"cached_prompt={usage['cached_prompt_tokens']} "
-            f"requests={usage['successful_requests']}"
+            f"requests={usage['successful_requests']} "
+            f"cache_hits={usage['cache_hits']} "
+            f"cache_hit_tokens={usage['cache_hit_tokens']}"
         )
+        for entry in usage["agents"]:
+            print(
+                f"Agent usage [{entry['agent']}] | "
+                f"model={entry['model']} "
+                f"calls={entry['calls']} "
+                f"tokens={entry['tokens']} "
+                f"seconds={entry['seconds']}"
+            )
+        for entry in usage["context"]:
+            print(
+                f"Context compaction [{entry['task']}] | "
+                f"{'applied' if entry['applied'] else 'report-only'} "
+                f"raw_tokens={entry['raw_tokens']} "
+                f"compact_tokens={entry['compact_tokens']} "
+                f"saved_tokens={entry['saved_tokens']}"
+            )
+        history = prefix_cache_history().get(prompt_layout(), {})
+        for entry in usage.get("prefix_cache", []):
+            past = history.get(entry["task"], {})
+            print(
+                f"Prefix cache [{entry['task']}] | "
+                f"layout={prompt_layout()} "
+                f"prompt_tokens={entry['prompt_tokens']} "
+                f"cached_tokens={entry['cached_tokens']} "
+                f"hit_ratio={entry['hit_ratio']} "
+                f"runs={past.get('runs', 0)} "
+                f"history_hit_ratio={past.get('hit_ratio', 0.0)}"
+            )
         return
 
     estimated_tokens = _estimate_tokens_for_inputs(inputs)
@@ -396,64 +357,224 @@ def _print_token_usage_summary(result, inputs: dict) -> None:
     )
 
 
-# Detect provider rate-limit style failures.
-def _is_rate_limit_error(err: Exception) -> bool:
-    message = str(err).lower()
-    return "429" in message or "rate limit" in message or "quota" in message
+# Print what restoring checkpointed tasks saved compared with re-running them.
+def _print_resume_summary(checkpoints: CheckpointStore) -> None:
+    savings = checkpoints.savings()
+    if not savings["restored_tasks"]:
+        return
+    print(
+        "Reused tasks | "
+        f"run_id={checkpoints.run_id} "
+        f"restored_tasks={savings['restored_tasks']} "
+        f"saved_tokens={savings['saved_tokens']} "
+        f"saved_seconds={savings['saved_seconds']} "
+        f"shared_from_inflight={len(checkpoints.shared)}"
+    )
 
 
-# Extract provider-advised retry wait when available.
-def _extract_retry_seconds(message: str) -> int | None:
-    # Matches provider hints like "try again in 8.57s".
-    match = re.search(r"try again in\s+([0-9]+(?:\.[0-9]+)?)s", message.lower())
-    if not match:
-        return None
-    try:
-        return max(2, int(float(match.group(1))) + int(os.getenv("LLM_RETRY_BUFFER_SECONDS", "2")))
-    except ValueError:
-        return None
+# Print how often runs in this process were served by an identical or overlapping in-flight run.
+def _print_coalescing_summary() -> None:
+    stats = get_coalescing_stats().snapshot()
+    print(
+        "Coalescing | "
+        f"requests={stats['requests']} "
+        f"coalesced={stats['coalesced']} "
+        f"shared_research={stats['shared_research']} "
+        f"shared_tasks={stats['shared_tasks']} "
+        f"saved_tokens={stats['saved_tokens']} "
+        f"coalescing_rate={stats['coalescing_rate']}"
+    )
+
+
+# Stream each report section to the terminal as soon as its task finishes (the file is updated too).
+def _section_printer() -> Callable[[str, str], None]:
+    started = perf_counter()
+
+    def _print_section(heading: str, markdown: str) -> None:
+        print(f"\n===== Report section: {heading} ({perf_counter() - started:.1f}s) =====")
+        # The final document is printed once the run completes.
+        if heading != "Final Report":
+            print(markdown + "\n")
+
+    return _print_section
 
 
-# Retry kickoff with exponential backoff on rate-limit errors.
-def _kickoff_with_backoff(inputs: dict):
+# Print Serper cache effectiveness for this process.
+def _print_search_cache_summary() -> None:
+    from bot.tools.cached_serper_tool import get_search_cache
+
+    stats = get_search_cache().stats()
+    print(
+        "Search cache | "
+        f"hits={stats['hits']} "
+        f"misses={stats['misses']} "
+        f"entries={stats['entries']} "
+        f"size_kb={stats['bytes'] // 1024}"
+    )
+
+
+# Print per-key quota usage, headroom and how much pacing/429 handling each key needed.
+def _print_rate_limiter_summary() -> None:
+    for name, stats in _credential_pool().snapshot().items():
+        print(
+            f"Rate limiter [{name}] | "
+            f"model={stats['model']} "
+            f"calls={stats['process_requests']} "
+            f"tokens={stats['process_tokens']} "
+            f"daily_requests={stats['daily_requests']}/{stats['rpd']} "
+            f"daily_tokens={stats['daily_tokens']}/{stats['tpd']} "
+            f"requests_available={stats['requests_available']}/{stats['rpm']} "
+            f"tokens_available={stats['tokens_available']}/{stats['tpm']} "
+            f"rate_scale={stats['rate_scale']} "
+            f"rate_limited={stats['rate_limited']} "
+            f"throttled_seconds={stats['throttled_seconds']}"
+        )
+
+
+# Process-wide key pool; each key paces its own calls under its RPM/TPM caps.
+def _credential_pool() -> CredentialPool:
+    return get_credential_pool()
+
+
+# Retry kickoff when a rate limit outlasted the per-call retries; the key pool says how long to wait.
+# With checkpoints, each retry resumes from the first unfinished task instead of restarting the crew.
+# The whole run (attempts and backoff sleeps) is traced as one run span.
+def _kickoff_with_backoff(
+    inputs: dict,
+    metrics: RunMetrics | None = None,
+    bot: "Bot | None" = None,
+    checkpoints: CheckpointStore | None = None,
+    section_callback: Callable[[str, str], None] | None = None,
+):
+    from bot.crew import Bot
+    from bot.execution_log import log, setup_execution_log
+    from bot.tracing import span
+
     max_attempts = int(os.getenv("LLM_MAX_RETRIES", "3"))
-    initial_sleep = int(os.getenv("LLM_BACKOFF_SECONDS", "10"))
     last_error = None
+    run_checkpoints = checkpoints if checkpoints is not None else getattr(bot, "checkpoints", None)
+
+    setup_execution_log()
+    with span(_run_span_name(inputs, checkpoints), "run", **_run_span_attributes(inputs)) as run_span:
+        _log_run_started(inputs)
+        for attempt in range(1, max_attempts + 1):
+            run_span.set(attempts=attempt)
+            try:
+                # Warm callers (the HTTP service) pass a prepared Bot; CLI runs build a fresh one per attempt.
+                crew_bot = bot or Bot(
+                    credentials=_credential_pool(),
+                    metrics=metrics,
+                    checkpoints=checkpoints,
+                    inputs=inputs,
+                    section_callback=section_callback,
+                )
+                crew = crew_bot.build_crew()
+                if not crew.tasks:
+                    result = crew_bot.restored_output()
+                else:
+                    result = crew.kickoff(inputs=inputs)
+                run_span.set(tokens=int(getattr(result.token_usage, "total_tokens", 0) or 0))
+                _log_run_finished("succeeded", run_span.attributes["tokens"])
+                return result
+            except Exception as e:
+                last_error = e
+                if not is_rate_limit_error(e) or attempt == max_attempts:
+                    break
+                wait_seconds = _credential_pool().blocked_seconds()
+                print(f"Rate limit hit, retrying in {wait_seconds}s (attempt {attempt}/{max_attempts})...")
+                log.warning("Rate limit hit, retrying in %ss (attempt %s/%s)", wait_seconds, attempt, max_attempts)
+                with span("kickoff retry", "backoff", attempt=attempt, wait_seconds=wait_seconds):
+                    sleep(wait_seconds)
+            finally:
+                # Claims on tasks this attempt did not finish go to the runs waiting on them.
+                if run_checkpoints is not None:
+                    run_checkpoints.release()
+
+        _log_run_finished(f"failed: {last_error}")
+        raise Exception(f"Crew kickoff failed after retries: {last_error}")
+
+
+# Trace name of a run: its request / checkpoint id, else the destination.
+def _run_span_name(inputs: dict, checkpoints: CheckpointStore | None = None) -> str:
+    if checkpoints is not None:
+        return checkpoints.run_id
+    return str(inputs.get("request_id") or inputs.get("destination", "run"))
+
+
+# The first record of a run: what is being planned.
+def _log_run_started(inputs: dict) -> None:
+    from bot.execution_log import log
+
+    log.info(
+        "Run started: %s, %s, budget %s %s",
+        inputs.get("destination"),
+        inputs.get("travel_dates"),
+        inputs.get("budget"),
+        inputs.get("currency"),
+    )
 
-    for attempt in range(1, max_attempts + 1):
-        try:
-            return Bot().crew().kickoff(inputs=inputs)
-        except Exception as e:
-            last_error = e
-            if not _is_rate_limit_error(e) or attempt == max_attempts:
-                break
-            wait_seconds = _extract_retry_seconds(str(e)) or (initial_sleep * (2 ** (attempt - 1)))
-            print(f"Rate limit hit, retrying in {wait_seconds}s (attempt {attempt}/{max_attempts})...")
-            sleep(wait_seconds)
 
-    raise Exception(f"Crew kickoff failed after retries: {last_error}")
+# The last record of a run; it also closes the run's own log file.
+def _log_run_finished(status: str, tokens: int = 0) -> None:
+    from bot.execution_log import log
+
+    log.info("Run %s (%s tokens)", status, tokens, extra={"run_finished": True})
+
+
+# Trip fields recorded on a run span.
+def _run_span_attributes(inputs: dict) -> dict:
+    return {
+        "destination": inputs.get("destination"),
+        "trip_days": inputs.get("trip_days"),
+        "budget": inputs.get("budget"),
+    }
+
+
+# Hand a fresh run to a warm `serve` process (BOT_WORKER_URL), so this CLI never imports the crew stack.
+# Returns False when no worker is listening; the caller then runs the crew locally.
+def _run_on_worker(url: str, inputs: dict) -> bool:
+    from bot.worker_client import submit_trip, wait_for_trip
+
+    try:
+        job_id = submit_trip(url, inputs)
+    except OSError as e:
+        print(f"Worker {url} unreachable ({e}); running locally.")
+        return False
+    print(f"Handed off to worker {url} as job {job_id}")
+    job, report = wait_for_trip(url, job_id, section_callback=_section_printer())
+    Path("output.md").write_text(report, encoding="utf-8")
+    print(report)
+    _print_usage(job["token_usage"], inputs)
+    return True
 
 
 # Primary local entrypoint for standard runs.
 def run():
     """Run the travel planner crew."""
     _ensure_output_file_exists()
-    inputs = _build_inputs_from_args()
     try:
+        inputs = None
+        # Resumed runs need their local checkpoints, so only fresh runs go to the worker.
+        worker_url = os.getenv("BOT_WORKER_URL")
+        if worker_url and not _parse_checkpoint_args().resume:
+            inputs = _build_inputs_from_args()
+            # The worker checks the pooled daily quota against its own ledgers before it runs the job.
+            if _run_on_worker(worker_url, inputs):
+                return
+        checkpoints, inputs = _prepare_checkpoints(inputs)
+        # A rejected run leaves the previous report in place.
+        _check_daily_quota(inputs)
         _reset_final_output_file()
-        _check_quota(inputs)
-        result = _kickoff_with_backoff(inputs)
-        _record_usage(inputs)
-        _ensure_required_output_sections(inputs)
-        # Final cleanup pass to replace unresolved placeholders.
-        output_path = Path("output.md")
-        output_path.write_text(
-            _upsert_validation_summary(output_path.read_text(encoding="utf-8"), inputs),
-            encoding="utf-8",
-        )
-        _ensure_execution_log_file()
-        print(result)
-        _print_token_usage_summary(result, inputs)
+        metrics = RunMetrics()
+        result = _kickoff_with_backoff(inputs, metrics, checkpoints=checkpoints, section_callback=_section_printer())
+        _record_usage(inputs, _extract_token_usage(result, metrics), calibrate=not checkpoints.restored)
+        _record_coalescing(checkpoints)
+        _store_plan(inputs, result, checkpoints)
+        print(result.raw)
+        _print_token_usage_summary(result, inputs, metrics)
+        _print_resume_summary(checkpoints)
+        _print_search_cache_summary()
+        _print_rate_limiter_summary()
     except Exception as e:
         raise Exception(f"An error occurred while running the crew: {e}")
 
@@ -461,6 +582,8 @@ def run():
 # CrewAI training mode entrypoint.
 def train():
     """Train the crew for a given number of iterations."""
+    from bot.crew import Bot
+
     inputs = _build_inputs_from_args()
     try:
         Bot().crew().train(n_iterations=int(sys.argv[1]), filename=sys.argv[2], inputs=inputs)
@@ -471,6 +594,8 @@ def train():
 # Replay a prior run from a selected task id.
 def replay():
     """Replay the crew execution from a specific task."""
+    from bot.crew import Bot
+
     try:
         Bot().crew().replay(task_id=sys.argv[1])
     except Exception as e:
@@ -480,6 +605,8 @@ def replay():
 # CrewAI test mode entrypoint.
 def test():
     """Test crew execution and return the results."""
+    from bot.crew import Bot
+
     inputs = _build_inputs_from_args()
     try:
         Bot().crew().test(n_iterations=int(sys.argv[1]), eval_llm=sys.argv[2], inputs=inputs)
@@ -504,18 +631,19 @@ def run_with_trigger():
     inputs["crewai_trigger_payload"] = trigger_payload
 
     try:
+        # Checkpoints give triggers fired together for the same trip one shared computation per task.
+        checkpoints, inputs = _prepare_checkpoints(inputs)
+        _check_daily_quota(inputs)
         _reset_final_output_file()
-        _check_quota(inputs)
-        result = _kickoff_with_backoff(inputs)
-        _record_usage(inputs)
-        _ensure_required_output_sections(inputs)
-        output_path = Path("output.md")
-        output_path.write_text(
-            _upsert_validation_summary(output_path.read_text(encoding="utf-8"), inputs),
-            encoding="utf-8",
-        )
-        _ensure_execution_log_file()
-        _print_token_usage_summary(result, inputs)
+        metrics = RunMetrics()
+        result = _kickoff_with_backoff(inputs, metrics, checkpoints=checkpoints, section_callback=_section_printer())
+        _record_usage(inputs, _extract_token_usage(result, metrics), calibrate=not checkpoints.restored)
+        _record_coalescing(checkpoints)
+        _store_plan(inputs, result, checkpoints)
+        _print_token_usage_summary(result, inputs, metrics)
+        _print_resume_summary(checkpoints)
+        _print_search_cache_summary()
+        _print_rate_limiter_summary()
         return result
     except Exception as e:
         raise Exception(f"An error occurred while running the crew with trigger: {e}")
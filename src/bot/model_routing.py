@@ -0,0 +1,43 @@
+import os
+from pathlib import Path
+
+from bot.registry import load_yaml
+
+MODEL_ROUTING_PATH = Path(__file__).parent / "config" / "models.yaml"
+
+
+def _routes() -> dict:
+    return load_yaml(os.getenv("MODEL_ROUTING_PATH", str(MODEL_ROUTING_PATH)))
+
+
+# Tier, pinned model, sampling settings and context budget for one agent
+# (defaults: reasoning tier, LLM_MAX_TOKENS, 0.1, CONTEXT_TOKEN_BUDGET).
+def agent_route(agent_name: str) -> dict:
+    route = _routes().get(agent_name) or {}
+    tier = route.get("tier", "reasoning")
+    if tier not in ("reasoning", "fast"):
+        raise ValueError(f"Unknown model tier '{tier}' for agent '{agent_name}' (use 'reasoning' or 'fast').")
+    return {
+        "tier": tier,
+        "model": route.get("model"),
+        "max_tokens": int(route.get("max_tokens", os.getenv("LLM_MAX_TOKENS", "700"))),
+        "temperature": float(route.get("temperature", 0.1)),
+        "context_tokens": int(route.get("context_tokens", os.getenv("CONTEXT_TOKEN_BUDGET", "800"))),
+    }
+
+
+# Below this fraction of a key's daily tokens, reasoning-tier calls drop to the fast model (0 disables).
+def downgrade_below() -> float:
+    return float(os.getenv("LLM_DOWNGRADE_BELOW", "0"))
+
+
+# How upstream outputs reach downstream prompts: `on` (compact summaries), `report` (raw, savings only measured), `off`.
+def context_compaction_mode() -> str:
+    mode = os.getenv("CONTEXT_COMPACTION", "on").lower()
+    if mode in ("1", "true", "yes"):
+        return "on"
+    if mode in ("0", "false", "no"):
+        return "off"
+    if mode not in ("on", "report", "off"):
+        raise ValueError(f"Unknown CONTEXT_COMPACTION '{mode}' (use on, report or off).")
+    return mode
@@ -0,0 +1,188 @@
+import html
+import re
+
+from pydantic import BaseModel, Field
+
+DEFAULT_ASSUMPTIONS = "Cost estimates may vary by season, availability, and booking timing."
+DEFAULT_RISKS = "Price fluctuations, attraction closures, and transport delays can affect this plan."
+REPORT_FORMATS = ("markdown", "json", "html")
+MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+
+
+def format_amount(amount: float) -> str:
+    return f"{amount:,.0f}" if float(amount).is_integer() else f"{amount:,.2f}"
+
+
+class BudgetLineItem(BaseModel):
+    """One budget table row."""
+
+    category: str = Field(..., min_length=1)
+    amount: float = Field(..., ge=0, description="Amount in the trip currency; ranges count as their upper bound")
+    note: str = ""
+
+
+class BudgetBreakdown(BaseModel):
+    """Budget line items plus the totals the budget planner reported."""
+
+    items: list[BudgetLineItem] = Field(default_factory=list)
+    subtotal: float | None = Field(default=None, ge=0)
+    grand_total: float | None = Field(default=None, ge=0)
+    total_note: str = ""
+    claimed_status: str = Field(default="", description="Budget status as written by the planner")
+
+    def amount(self, category: str) -> float | None:
+        return next((item.amount for item in self.items if item.category.lower() == category.lower()), None)
+
+
+class DayBlock(BaseModel):
+    """One itinerary day: its markdown block and estimated spend."""
+
+    day: int = Field(..., gt=0)
+    text: str
+    spend: float | None = Field(default=None, ge=0)
+
+
+class Itinerary(BaseModel):
+    days: list[DayBlock] = Field(default_factory=list)
+
+    @property
+    def total_spend(self) -> float:
+        return sum(day.spend or 0 for day in self.days)
+
+
+class ValidationResult(BaseModel):
+    """Outcome of the deterministic checks (and the LLM audit when they failed)."""
+
+    issues: list[str] = Field(default_factory=list)
+    budget_status: str | None = None
+    assumptions: str = DEFAULT_ASSUMPTIONS
+    risks: str = DEFAULT_RISKS
+    validated_in_code: bool = True
+    auditor_notes: str = Field(default="", description="LLM auditor output when the code checks found issues")
+
+
+class TravelPlan(BaseModel):
+    """Typed travel plan; every report format is rendered from this."""
+
+    destination: str
+    travel_dates: str
+    budget_cap: float = Field(..., ge=0)
+    currency: str = ""
+    trip_days: int = Field(..., ge=0)
+    overview: str
+    budget: BudgetBreakdown
+    itinerary: Itinerary
+    validation: ValidationResult
+
+
+def _markdown(plan: TravelPlan) -> str:
+    budget_rows = [f"| {item.category} | {format_amount(item.amount)} | {item.note} |" for item in plan.budget.items]
+    total = format_amount(plan.budget.grand_total) if plan.budget.grand_total is not None else "n/a"
+    budget_rows.append(f"| Total | {total} | {plan.budget.total_note or 'Grand total'} |")
+    validation = plan.validation
+    consistency = (
+        f"Budget arithmetic, {len(plan.itinerary.days)} day blocks and daily spend verified"
+        if not validation.issues
+        else "; ".join(validation.issues).replace("|", "/")
+    )
+    lines = [
+        f"# Travel Plan: {plan.destination}",
+        f"> Trip Window: {plan.travel_dates}",
+        f"> Budget Cap: {format_amount(plan.budget_cap)} {plan.currency}",
+        "---",
+        "## Destination Overview",
+        plan.overview,
+        "---",
+        "## Budget Breakdown",
+        "| Category | Amount | Note |",
+        "| --- | ---: | --- |",
+        *budget_rows,
+        "---",
+        "## Day-wise Itinerary",
+        *(day.text for day in plan.itinerary.days),
+        "---",
+        "## Validation Summary",
+        "| Check | Result |",
+        "| --- | --- |",
+        f"| Budget status | {validation.budget_status or 'Unknown'} |",
+        f"| Assumptions | {validation.assumptions} |",
+        f"| Risk factors | {validation.risks} |",
+        f"| Consistency | {consistency} |",
+    ]
+    if validation.auditor_notes:
+        lines.extend(["", "### Auditor Notes", validation.auditor_notes.strip()])
+    lines.append("")
+    return "\n".join(lines)
+
+
+# Minimal markdown-to-HTML for the free-text blocks: headings, bullet lists and paragraphs.
+def _html_block(markdown: str) -> list[str]:
+    out, in_list = [], False
+    for line in markdown.splitlines():
+        line = line.strip()
+        bullet = line[:2] in ("- ", "* ")
+        if in_list and not bullet:
+            out.append("</ul>")
+            in_list = False
+        if not line:
+            continue
+        heading = MARKDOWN_HEADING.match(line)
+        if heading:
+            level = min(6, len(heading.group(1)) + 1)
+            out.append(f"<h{level}>{html.escape(heading.group(2))}</h{level}>")
+        elif bullet:
+            if not in_list:
+                out.append("<ul>")
+                in_list = True
+            out.append(f"<li>{html.escape(line[2:])}</li>")
+        else:
+            out.append(f"<p>{html.escape(line)}</p>")
+    if in_list:
+        out.append("</ul>")
+    return out
+
+
+def _html(plan: TravelPlan) -> str:
+    escape = html.escape
+    validation = plan.validation
+    total = format_amount(plan.budget.grand_total) if plan.budget.grand_total is not None else "n/a"
+    parts = [
+        "<!DOCTYPE html>",
+        f"<html><head><meta charset=\"utf-8\"><title>Travel Plan: {escape(plan.destination)}</title></head><body>",
+        f"<h1>Travel Plan: {escape(plan.destination)}</h1>",
+        f"<p>Trip Window: {escape(plan.travel_dates)}<br>"
+        f"Budget Cap: {format_amount(plan.budget_cap)} {escape(plan.currency)}</p>",
+        "<h2>Destination Overview</h2>",
+        *_html_block(plan.overview),
+        "<h2>Budget Breakdown</h2>",
+        "<table><tr><th>Category</th><th>Amount</th><th>Note</th></tr>",
+        *(
+            f"<tr><td>{escape(item.category)}</td><td>{format_amount(item.amount)}</td><td>{escape(item.note)}</td></tr>"
+            for item in plan.budget.items
+        ),
+        f"<tr><th>Total</th><th>{total}</th><th>{escape(plan.budget.total_note)}</th></tr></table>",
+        "<h2>Day-wise Itinerary</h2>",
+        *(line for day in plan.itinerary.days for line in _html_block(day.text)),
+        "<h2>Validation Summary</h2>",
+        "<ul>",
+        f"<li>Budget status: {escape(validation.budget_status or 'Unknown')}</li>",
+        f"<li>Assumptions: {escape(validation.assumptions)}</li>",
+        f"<li>Risk factors: {escape(validation.risks)}</li>",
+        *(f"<li>Issue: {escape(issue)}</li>" for issue in validation.issues),
+        "</ul>",
+        *(_html_block(validation.auditor_notes) if validation.auditor_notes else []),
+        "</body></html>",
+        "",
+    ]
+    return "\n".join(parts)
+
+
+# Render a plan as markdown, JSON or HTML in one pass over its sections.
+def render_plan(plan: TravelPlan, fmt: str = "markdown") -> str:
+    if fmt == "markdown":
+        return _markdown(plan)
+    if fmt == "json":
+        return plan.model_dump_json(indent=2)
+    if fmt == "html":
+        return _html(plan)
+    raise ValueError(f"Unknown report format '{fmt}' (use one of: {', '.join(REPORT_FORMATS)}).")
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from bot.coalescing import request_key
+
+# Tasks a budget-only re-plan recomputes; every other stored task output (research, itinerary) is reused.
+BUDGET_STAGE = ("budget_planner_task", "validation_task")
+WORD = re.compile(r"\w+")
+
+
+# Local library of validated plans: near-duplicate requests are answered from a stored plan.
+def plan_library_enabled() -> bool:
+    return os.getenv("PLAN_LIBRARY", "1").lower() not in ("0", "false", "no")
+
+
+# Preference word overlap a stored plan needs to stand in for a request (Jaccard, 0..1).
+def min_similarity() -> float:
+    return float(os.getenv("PLAN_LIBRARY_MIN_SIMILARITY", "0.6"))
+
+
+# Budget difference (fraction of the request's budget) a stored plan may have and still be served as is.
+def budget_tolerance() -> float:
+    return float(os.getenv("PLAN_LIBRARY_BUDGET_TOLERANCE", "0.1"))
+
+
+# Newest plans kept per destination and date range; older near-identical plans add little and slow lookups.
+def max_plans_per_trip() -> int:
+    return int(os.getenv("PLAN_LIBRARY_MAX_PER_TRIP", "200"))
+
+
+# Widest budget difference for which a stored plan's research and itinerary are reused with a new budget.
+def budget_range() -> float:
+    return float(os.getenv("PLAN_LIBRARY_BUDGET_RANGE", "0.5"))
+
+
+def _words(text) -> set[str]:
+    return set(WORD.findall(str(text or "").casefold()))
+
+
+def _similarity(a: set[str], b: set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+# Research and itinerary prompts interpolate the exact dates, so plans are only shared within one date
+# range, trip length and currency; the three are indexed together as a single search token.
+def _bucket(inputs: dict) -> str:
+    dates = " ".join(WORD.findall(str(inputs.get("travel_dates") or "").casefold()))
+    key = f"{dates}|{int(inputs.get('trip_days') or 0)}|{str(inputs.get('currency', '')).upper()}"
+    return "b" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+# FTS5 query: the bucket, every destination word, and any preference word to rank by.
+def _match_query(inputs: dict, destination: set[str], preferences: set[str]) -> str:
+    query = f'bucket : "{_bucket(inputs)}"'
+    query += " AND destination : (" + " AND ".join(f'"{word}"' for word in sorted(destination)) + ")"
+    if preferences:
+        query += " AND preferences : (" + " OR ".join(f'"{word}"' for word in sorted(preferences)) + ")"
+    return query
+
+
+class PlanLibrary:
+    """SQLite store of validated plans (inputs plus task outputs) with a BM25 index over destination and preferences."""
+
+    def __init__(self, path: str | Path, max_plans: int):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_plans = max(1, int(max_plans))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS plans ("
+            " id INTEGER PRIMARY KEY,"
+            " request_key TEXT NOT NULL UNIQUE,"
+            " budget REAL NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " inputs TEXT NOT NULL,"
+            " tasks TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS plans_text USING fts5(bucket, destination, preferences)")
+
+    # Store a validated plan: its inputs and the checkpoint entries of the tasks that produced it.
+    # A newer plan for the same normalized request replaces the older one.
+    def add(self, inputs: dict, tasks: dict[str, dict]) -> int:
+        stored = {name: entry for name, entry in tasks.items() if name != "validation_task"}
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                key = request_key(inputs)
+                previous = self._conn.execute("SELECT id FROM plans WHERE request_key = ?", (key,)).fetchone()
+                if previous is not None:
+                    self._delete([previous[0]])
+                cursor = self._conn.execute(
+                    "INSERT INTO plans (request_key, budget, created_at, inputs, tasks) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        float(inputs.get("budget") or 0),
+                        time.time(),
+                        json.dumps({name: value for name, value in inputs.items() if name != "crewai_trigger_payload"}),
+                        json.dumps(stored),
+                    ),
+                )
+                plan_id = cursor.lastrowid
+                self._conn.execute(
+                    "INSERT INTO plans_text (rowid, bucket, destination, preferences) VALUES (?, ?, ?, ?)",
+                    (plan_id, _bucket(inputs), str(inputs.get("destination", "")), str(inputs.get("preferences", ""))),
+                )
+                self._evict(inputs)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return plan_id
+
+    def _delete(self, ids: list[int]) -> None:
+        if not ids:
+            return
+        self._conn.executemany("DELETE FROM plans WHERE id = ?", [(plan_id,) for plan_id in ids])
+        self._conn.executemany("DELETE FROM plans_text WHERE rowid = ?", [(plan_id,) for plan_id in ids])
+        # Deleted rows stay in the index segments until merged; merge a little per delete so lookups stay fast.
+        self._conn.execute("INSERT INTO plans_text (plans_text, rank) VALUES ('merge', 64)")
+
+    # Drop the oldest plans past the per-trip and overall caps.
+    def _evict(self, inputs: dict) -> None:
+        destination = _words(inputs.get("destination"))
+        same_trip = [
+            plan_id
+            for plan_id, stored_destination in self._conn.execute(
+                "SELECT rowid, destination FROM plans_text WHERE plans_text MATCH ? ORDER BY rowid DESC",
+                (_match_query(inputs, destination, set()),),
+            )
+            if _words(stored_destination) == destination
+        ]
+        self._delete(same_trip[max_plans_per_trip():])
+        excess = self._conn.execute("SELECT COUNT(*) FROM plans").fetchone()[0] - self.max_plans
+        if excess > 0:
+            self._delete([row[0] for row in self._conn.execute("SELECT id FROM plans ORDER BY id LIMIT ?", (excess,))])
+
+    # Stored plans for the same destination words, dates, trip length and currency within the budget range,
+    # best BM25 preference match first, each with its preference similarity.
+    def search(self, inputs: dict, limit: int = 20) -> list[dict]:
+        destination, preferences = _words(inputs.get("destination")), _words(inputs.get("preferences"))
+        if not destination:
+            return []
+        budget = float(inputs.get("budget") or 0)
+        with self._lock:
+            # CROSS JOIN pins the FTS index as the outer loop; SQLite otherwise may re-run MATCH per plan row.
+            rows = self._conn.execute(
+                "SELECT plans.id, plans.budget, plans.inputs, plans_text.destination, plans_text.preferences"
+                " FROM plans_text CROSS JOIN plans ON plans.id = plans_text.rowid"
+                " WHERE plans_text MATCH ? AND plans.budget BETWEEN ? AND ?"
+                " ORDER BY bm25(plans_text) LIMIT ?",
+                (
+                    _match_query(inputs, destination, preferences),
+                    budget * (1 - budget_range()),
+                    budget * (1 + budget_range()),
+                    limit,
+                ),
+            ).fetchall()
+        return [
+            {
+                "plan_id": plan_id,
+                "budget": stored_budget,
+                "inputs": json.loads(stored_inputs),
+                "similarity": round(_similarity(preferences, _words(stored_preferences)), 3),
+            }
+            for plan_id, stored_budget, stored_inputs, stored_destination, stored_preferences in rows
+            # Extra words change the place ("Paris" vs "Paris, Texas"), so destinations must match word for word.
+            if _words(stored_destination) == destination
+        ]
+
+    def tasks(self, plan_id: int) -> dict[str, dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT tasks FROM plans WHERE id = ?", (plan_id,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    # Closest stored plan for a request and how much of it to reuse: `plan` serves it as is (it passes the
+    # deterministic checks against the new budget); `budget` re-runs only the budget stage on its research
+    # and itinerary. None when no stored plan is close enough.
+    def match(self, inputs: dict) -> dict | None:
+        from bot.validator import build_plan, deterministic_validation_enabled
+
+        budget = float(inputs.get("budget") or 0)
+        candidates = [candidate for candidate in self.search(inputs) if candidate["similarity"] >= min_similarity()]
+        if not candidates:
+            return None
+        # A plan within the budget tolerance can be served without any LLM call, so it wins over a closer
+        # preference match that would need a new budget.
+        best = max(
+            candidates,
+            key=lambda candidate: (
+                abs(candidate["budget"] - budget) <= budget * budget_tolerance(),
+                candidate["similarity"],
+                -abs(candidate["budget"] - budget),
+            ),
+        )
+        tasks = self.tasks(best["plan_id"])
+        tier = "budget"
+        if deterministic_validation_enabled() and abs(best["budget"] - budget) <= budget * budget_tolerance():
+            research, budget_markdown, itinerary = (
+                tasks.get(name, {}).get("output", {}).get("raw", "")
+                for name in ("destination_research_task", "budget_planner_task", "itinerary_designer_task")
+            )
+            if not build_plan(research, budget_markdown, itinerary, inputs).validation.issues:
+                tier = "plan"
+        if tier == "budget":
+            tasks = {name: entry for name, entry in tasks.items() if name not in BUDGET_STAGE}
+        return {"plan_id": best["plan_id"], "tier": tier, "similarity": best["similarity"], "tasks": tasks}
+
+    def stats(self) -> dict:
+        with self._lock:
+            plans = self._conn.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+        return {"plans": plans}
+
+
+_libraries: dict[str, PlanLibrary] = {}
+_libraries_lock = threading.Lock()
+
+
+# One library object per database file within the process.
+def get_plan_library() -> PlanLibrary:
+    path = os.getenv("PLAN_LIBRARY_PATH", "cache/plans.sqlite")
+    key = str(Path(path).resolve())
+    with _libraries_lock:
+        if key not in _libraries:
+            _libraries[key] = PlanLibrary(path, max_plans=int(os.getenv("PLAN_LIBRARY_MAX_PLANS", "50000")))
+        return _libraries[key]
@@ -0,0 +1,103 @@
+import json
+import os
+from pathlib import Path
+
+from bot.cache_store import SQLiteCache, get_cache
+from bot.checkpoint import TEMPLATE_VARIABLE
+from bot.coalescing import REQUEST_FIELDS
+from bot.registry import load_yaml
+
+HISTORY_KEY = "prefix_cache"
+HISTORY_TTL_SECONDS = 365 * 24 * 3600
+
+
+# How agents.yaml/tasks.yaml become prompts: `yaml` (default) interpolates the values where the YAML
+# templates place them; opt-in `prefix` keeps every agent prompt (role, goal, backstory, tool
+# descriptions) and the static task instructions request-invariant, with the trip values in a block
+# at the end of each task description, so providers that cache prompt prefixes can reuse them across runs.
+def prompt_layout() -> str:
+    layout = os.getenv("PROMPT_LAYOUT", "yaml").lower()
+    if layout not in ("prefix", "yaml"):
+        raise ValueError(f"Unknown PROMPT_LAYOUT '{layout}' (use prefix or yaml).")
+    return layout
+
+
+# `{destination}` -> `[destination]`: the text stays the same for every request and points at the trip details.
+def _reference(template) -> str:
+    return TEMPLATE_VARIABLE.sub(lambda match: f"[{match.group(1)}]", str(template or ""))
+
+
+# Trip values a task's prompts use (its agent's included), in a fixed order, as a trailing template block.
+def _trip_details(*templates) -> str:
+    used = {name for template in templates for name in TEMPLATE_VARIABLE.findall(str(template or ""))}
+    names = [name for name in REQUEST_FIELDS if name in used] + sorted(used - set(REQUEST_FIELDS))
+    if not names:
+        return ""
+    lines = "\n".join(f"- {name}: {{{name}}}" for name in names)
+    return f"\n\nTrip details (values of the [bracketed] fields above):\n{lines}\n"
+
+
+def _agent_prefix_layout(config: dict) -> dict:
+    return {**config, **{field: _reference(config[field]) for field in ("role", "goal", "backstory") if field in config}}
+
+
+# The trip details go after the description; they list the same variables as before, so task
+# fingerprints still depend on exactly the inputs the task reads.
+def _task_prefix_layout(config: dict, agent_config: dict) -> dict:
+    details = _trip_details(
+        config.get("description"),
+        config.get("expected_output"),
+        *(agent_config.get(field) for field in ("role", "goal", "backstory")),
+    )
+    return {
+        **config,
+        "description": _reference(config.get("description")).rstrip() + details,
+        "expected_output": _reference(config.get("expected_output")),
+    }
+
+
+# agents.yaml or tasks.yaml in the configured layout; task files read their agents from the sibling agents.yaml.
+def load_prompt_config(path: str | Path) -> dict:
+    config = load_yaml(path)
+    if prompt_layout() != "prefix":
+        return config
+    entries = [entry for entry in config.values() if isinstance(entry, dict)]
+    if any("role" in entry for entry in entries):
+        return {name: _agent_prefix_layout(entry) if isinstance(entry, dict) else entry for name, entry in config.items()}
+    agents_path = Path(path).with_name("agents.yaml")
+    agents = load_yaml(agents_path) if agents_path.exists() else {}
+    return {
+        name: _task_prefix_layout(entry, agents.get(entry.get("agent")) or {}) if isinstance(entry, dict) else entry
+        for name, entry in config.items()
+    }
+
+
+# One entry holds the history; concurrent workers fold their runs into it in a transaction.
+def _history_cache() -> SQLiteCache:
+    return get_cache(os.getenv("PREFIX_CACHE_HISTORY_PATH", "cache/prefix_cache.sqlite"), max_bytes=1024 * 1024)
+
+
+# Per-layout, per-task prompt and provider-cached prompt tokens summed over past runs.
+def prefix_cache_history() -> dict:
+    value = _history_cache().get(HISTORY_KEY)
+    return json.loads(value) if value else {}
+
+
+# Fold one run's per-task prompt-cache counts (RunMetrics prefix_cache entries) into the history.
+def record_prefix_cache(entries: list[dict]) -> None:
+    if not entries:
+        return
+    layout = prompt_layout()
+
+    def fold(value: str | None) -> str:
+        history = json.loads(value) if value else {}
+        tasks = history.setdefault(layout, {})
+        for entry in entries:
+            stored = tasks.setdefault(entry["task"], {"runs": 0, "prompt_tokens": 0, "cached_tokens": 0})
+            stored["runs"] += 1
+            stored["prompt_tokens"] += entry["prompt_tokens"]
+            stored["cached_tokens"] += entry["cached_tokens"]
+            stored["hit_ratio"] = round(stored["cached_tokens"] / stored["prompt_tokens"], 3) if stored["prompt_tokens"] else 0.0
+        return json.dumps(history)
+
+    _history_cache().update(HISTORY_KEY, fold, HISTORY_TTL_SECONDS)
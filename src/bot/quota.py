@@ -0,0 +1,168 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+class DailyQuotaExceeded(Exception):
+    """A daily request/token limit is spent; unlike a 429, waiting a few seconds will not help."""
+
+
+class QuotaStore:
+    """SQLite (WAL) quota ledger with atomic reserve-and-check, safe to share across worker processes."""
+
+    def __init__(self, path: str | Path = "logs/quota.sqlite", window_seconds: float = 60.0, retention_days: int = 7):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.window_seconds = window_seconds
+        self.retention_days = retention_days
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS window_events ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " ts REAL NOT NULL,"
+                " requests INTEGER NOT NULL,"
+                " tokens INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS window_events_ts ON window_events(ts)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS daily_usage ("
+                " day TEXT PRIMARY KEY,"
+                " requests INTEGER NOT NULL,"
+                " tokens INTEGER NOT NULL)"
+            )
+
+    # One connection per thread; autocommit mode so transactions are explicit BEGIN IMMEDIATE blocks.
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    # Drop minute-window events that slid out and daily rows past retention.
+    def _expire(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM window_events WHERE ts <= ?", (now - self.window_seconds,))
+        cutoff_day = (datetime.fromtimestamp(now) - timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+        conn.execute("DELETE FROM daily_usage WHERE day < ?", (cutoff_day,))
+
+    @staticmethod
+    def _today(now: float) -> str:
+        return datetime.fromtimestamp(now).strftime("%Y-%m-%d")
+
+    # Seconds until `requests`/`tokens` fit under the sliding-window caps.
+    def _window_wait(self, conn: sqlite3.Connection, requests: int, tokens: int, limits: dict, now: float) -> float:
+        used_requests, used_tokens = conn.execute(
+            "SELECT COALESCE(SUM(requests), 0), COALESCE(SUM(tokens), 0) FROM window_events"
+        ).fetchone()
+        if used_requests + requests <= limits["rpm"] and used_tokens + tokens <= limits["tpm"]:
+            return 0.0
+        # Only the throttled path walks individual events to find when enough usage expires.
+        freed_requests = freed_tokens = 0
+        for ts, event_requests, event_tokens in conn.execute(
+            "SELECT ts, requests, tokens FROM window_events ORDER BY ts"
+        ):
+            freed_requests += event_requests
+            freed_tokens += event_tokens
+            if (
+                used_requests - freed_requests + requests <= limits["rpm"]
+                and used_tokens - freed_tokens + tokens <= limits["tpm"]
+            ):
+                return max(0.001, ts + self.window_seconds - now)
+        return self.window_seconds
+
+    # Atomically check daily + sliding-window limits and reserve on success.
+    # Returns (reservation, 0.0) when admitted, or (None, seconds_to_wait) when the window is full.
+    # `window=False` only enforces the daily limits and records the usage in the window.
+    def reserve(self, requests: int, tokens: int, limits: dict, window: bool = True) -> tuple[dict | None, float]:
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._expire(conn, now)
+            today = self._today(now)
+            day = conn.execute("SELECT requests, tokens FROM daily_usage WHERE day = ?", (today,)).fetchone() or (0, 0)
+            if day[0] + requests > limits["rpd"]:
+                raise DailyQuotaExceeded(
+                    f"Daily LLM request limit reached: {day[0]}/{limits['rpd']}. "
+                    "Try again tomorrow or increase quota."
+                )
+            if day[1] + tokens > limits["tpd"]:
+                raise DailyQuotaExceeded(
+                    f"Daily LLM token limit reached: {day[1]}/{limits['tpd']}. "
+                    "Try again tomorrow or reduce token usage."
+                )
+
+            wait_seconds = self._window_wait(conn, requests, tokens, limits, now) if window else 0.0
+            if wait_seconds > 0:
+                conn.execute("COMMIT")
+                return None, wait_seconds
+
+            cursor = conn.execute(
+                "INSERT INTO window_events (ts, requests, tokens) VALUES (?, ?, ?)", (now, requests, tokens)
+            )
+            self._add_daily(conn, today, requests, tokens)
+            conn.execute("COMMIT")
+            return {"id": cursor.lastrowid, "requests": requests, "tokens": tokens}, 0.0
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _add_daily(conn: sqlite3.Connection, day: str, requests: int, tokens: int) -> None:
+        conn.execute(
+            "INSERT INTO daily_usage (day, requests, tokens) VALUES (?, ?, ?) "
+            "ON CONFLICT(day) DO UPDATE SET requests = requests + excluded.requests, tokens = tokens + excluded.tokens",
+            (day, requests, tokens),
+        )
+
+    # Replace a reservation's estimate with actual usage; record directly when nothing was reserved.
+    # `window_tokens` is what the provider's per-minute budget was charged, when that differs from usage.
+    def settle(self, reservation: dict | None, requests: int, tokens: int, window_tokens: int | None = None) -> None:
+        window_tokens = tokens if window_tokens is None else window_tokens
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._expire(conn, now)
+            if reservation is None:
+                conn.execute(
+                    "INSERT INTO window_events (ts, requests, tokens) VALUES (?, ?, ?)", (now, requests, window_tokens)
+                )
+                self._add_daily(conn, self._today(now), requests, tokens)
+            else:
+                # No-op when the reservation already slid out of the window.
+                conn.execute(
+                    "UPDATE window_events SET requests = ?, tokens = ? WHERE id = ?",
+                    (requests, window_tokens, reservation["id"]),
+                )
+                self._add_daily(
+                    conn, self._today(now), requests - reservation["requests"], tokens - reservation["tokens"]
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    # Current daily and window totals.
+    def usage(self) -> dict:
+        now = time.time()
+        conn = self._connect()
+        day = conn.execute(
+            "SELECT requests, tokens FROM daily_usage WHERE day = ?", (self._today(now),)
+        ).fetchone() or (0, 0)
+        window = conn.execute(
+            "SELECT COALESCE(SUM(requests), 0), COALESCE(SUM(tokens), 0) FROM window_events WHERE ts > ?",
+            (now - self.window_seconds,),
+        ).fetchone()
+        return {
+            "daily_requests": day[0],
+            "daily_tokens": day[1],
+            "window_requests": window[0],
+            "window_tokens": window[1],
+        }
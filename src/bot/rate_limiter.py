@@ -0,0 +1,197 @@
+import re
+import threading
+import time
+
+from bot.quota import DailyQuotaExceeded
+
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)?")
+
+
+# Provider reset values: "7.66s", "2m59.56s", "120ms", "1h2m" or plain seconds ("30").
+def parse_reset_seconds(value: str | None) -> float | None:
+    if not value:
+        return None
+    total = 0.0
+    units = {"ms": 0.001, "h": 3600.0, "m": 60.0, "s": 1.0, None: 1.0}
+    matched = False
+    for amount, unit in DURATION_PART.findall(str(value).strip().lower()):
+        total += float(amount) * units[unit or None]
+        matched = True
+    return total if matched else None
+
+
+# Rate-limit headers with LiteLLM's "llm_provider-" prefix removed and names lowercased.
+def normalize_headers(headers) -> dict:
+    normalized = {}
+    for key, value in dict(headers or {}).items():
+        key = str(key).lower()
+        normalized[key.removeprefix("llm_provider-")] = value
+    return normalized
+
+
+def _header_float(headers: dict, name: str) -> float | None:
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+# Detect provider rate-limit style failures. A spent daily quota is not one: retrying it cannot succeed today.
+def is_rate_limit_error(err: Exception) -> bool:
+    cause = err
+    while cause is not None:
+        if isinstance(cause, DailyQuotaExceeded):
+            return False
+        cause = cause.__cause__ or cause.__context__
+    if getattr(err, "status_code", None) == 429:
+        return True
+    message = str(err).lower()
+    return "429" in message or "rate limit" in message or "resource_exhausted" in message
+
+
+class SharedRateLimiter:
+    """Thread-safe RPM/TPM token bucket shared by every LLM call in the process.
+
+    Buckets refill continuously, are corrected by the provider's x-ratelimit-* headers and
+    shrink multiplicatively on 429s, recovering additively with each successful call (AIMD).
+    """
+
+    def __init__(
+        self,
+        rpm: int,
+        tpm: int,
+        window_seconds: float = 60.0,
+        min_rate_scale: float = 0.1,
+        recovery_step: float = 0.05,
+        backoff_seconds: float = 2.0,
+    ):
+        self.rpm = max(1, int(rpm))
+        self.tpm = max(1, int(tpm))
+        self.window_seconds = window_seconds
+        self.min_rate_scale = min_rate_scale
+        self.recovery_step = recovery_step
+        self.backoff_seconds = backoff_seconds
+        self._condition = threading.Condition()
+        # Fraction of the configured rates currently in use; halved on 429, nudged back up on success.
+        self._rate_scale = 1.0
+        self._requests = float(self.rpm)
+        self._tokens = float(self.tpm)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._consecutive_limits = 0
+        self._rate_limited = 0
+        self._throttled_seconds = 0.0
+
+    def _capacity(self) -> tuple[float, float]:
+        return self.rpm * self._rate_scale, self.tpm * self._rate_scale
+
+    # Add what the buckets earned since the last update, capped at the current (scaled) capacity.
+    def _refill(self, now: float) -> None:
+        request_capacity, token_capacity = self._capacity()
+        elapsed = max(0.0, now - self._updated)
+        self._updated = now
+        self._requests = min(request_capacity, self._requests + elapsed * request_capacity / self.window_seconds)
+        self._tokens = min(token_capacity, self._tokens + elapsed * token_capacity / self.window_seconds)
+
+    # Seconds until one request with `tokens` fits: the provider's block, then both buckets.
+    def _wait_time(self, now: float, tokens: int) -> float:
+        request_capacity, token_capacity = self._capacity()
+        waits = [self._blocked_until - now]
+        if self._requests < 1:
+            waits.append((1 - self._requests) * self.window_seconds / request_capacity)
+        if self._tokens < tokens:
+            waits.append((tokens - self._tokens) * self.window_seconds / token_capacity)
+        return max(waits)
+
+    # Seconds this limiter would make a `tokens`-sized call wait right now (0 when it fits).
+    def wait_seconds(self, tokens: int) -> float:
+        with self._condition:
+            now = time.monotonic()
+            self._refill(now)
+            return max(0.0, self._wait_time(now, min(max(0, int(tokens)), int(self._capacity()[1]))))
+
+    # Block exactly as long as needed for a request to fit, then reserve it; returns a handle for `settle`.
+    def acquire(self, tokens: int) -> dict:
+        started = time.monotonic()
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                # A call larger than the (scaled) bucket would never fit; admit it once the bucket is full.
+                needed = min(max(0, int(tokens)), int(self._capacity()[1]))
+                wait_seconds = self._wait_time(now, needed)
+                if wait_seconds <= 0:
+                    self._requests -= 1
+                    self._tokens -= needed
+                    self._throttled_seconds += now - started
+                    return {"tokens": needed}
+                self._condition.wait(timeout=wait_seconds)
+
+    # Replace a reservation's estimate with the provider-reported tokens; a success also recovers the rate.
+    def settle(self, reservation: dict, actual_tokens: int) -> None:
+        with self._condition:
+            self._tokens -= max(0, int(actual_tokens)) - reservation["tokens"]
+            reservation["tokens"] = max(0, int(actual_tokens))
+            self._consecutive_limits = 0
+            self._rate_scale = min(1.0, self._rate_scale + self.recovery_step)
+            self._condition.notify_all()
+
+    # Align the buckets with the provider's view (x-ratelimit-remaining-* / reset-*), which counts every client.
+    def observe_headers(self, headers) -> None:
+        headers = normalize_headers(headers)
+        with self._condition:
+            now = time.monotonic()
+            self._refill(now)
+            for kind in ("requests", "tokens"):
+                remaining = _header_float(headers, f"x-ratelimit-remaining-{kind}")
+                if remaining is None:
+                    continue
+                if kind == "requests":
+                    self._requests = min(self._requests, remaining)
+                else:
+                    self._tokens = min(self._tokens, remaining)
+                reset = parse_reset_seconds(headers.get(f"x-ratelimit-reset-{kind}"))
+                if remaining <= 0 and reset:
+                    self._blocked_until = max(self._blocked_until, now + reset)
+            self._condition.notify_all()
+
+    # 429: halve the rate and pause every caller until the provider's retry-after/reset (or a backoff).
+    def on_rate_limited(self, reservation: dict | None = None, headers=None) -> float:
+        headers = normalize_headers(headers)
+        with self._condition:
+            now = time.monotonic()
+            self._refill(now)
+            if reservation is not None:
+                # The rejected request did not consume provider tokens.
+                self._tokens += reservation["tokens"]
+                reservation["tokens"] = 0
+            self._rate_limited += 1
+            self._consecutive_limits += 1
+            self._rate_scale = max(self.min_rate_scale, self._rate_scale / 2)
+            wait_seconds = (
+                _header_float(headers, "retry-after")
+                or parse_reset_seconds(headers.get("x-ratelimit-reset-tokens"))
+                or parse_reset_seconds(headers.get("x-ratelimit-reset-requests"))
+                or min(self.window_seconds, self.backoff_seconds * 2 ** (self._consecutive_limits - 1))
+            )
+            self._requests = min(self._requests, 0.0)
+            self._blocked_until = max(self._blocked_until, now + wait_seconds)
+            self._condition.notify_all()
+            return wait_seconds
+
+    # Current headroom for run summaries and health checks.
+    def snapshot(self) -> dict:
+        with self._condition:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "requests_available": max(0, int(self._requests)),
+                "tokens_available": max(0, int(self._tokens)),
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "rate_scale": round(self._rate_scale, 2),
+                "blocked_seconds": round(max(0.0, self._blocked_until - now), 2),
+                "rate_limited": self._rate_limited,
+                "throttled_seconds": round(self._throttled_seconds, 1),
+            }
+
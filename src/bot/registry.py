@@ -0,0 +1,93 @@
+import copy
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable
+
+import yaml
+
+# Process-wide building blocks shared by every Bot, agent, retry and run in this interpreter:
+# parsed YAML configs, tool instances and keep-alive HTTP connection pools.
+
+
+@lru_cache(maxsize=None)
+def _parsed_yaml(path: str, modified_ns: int) -> dict:
+    # libyaml's loader parses the prompt configs about ten times faster than the pure-Python one.
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(path, encoding="utf-8") as file:
+        content = yaml.load(file, Loader=loader)
+    return content if isinstance(content, dict) else {}
+
+
+# Parse a YAML config once per process (again only after the file changes) and hand out a private
+# copy, since CrewBase rewrites agent/task entries in place.
+def load_yaml(path: str | Path) -> dict:
+    return copy.deepcopy(_parsed_yaml(str(path), os.stat(path).st_mtime_ns))
+
+
+_tools: dict[type, Any] = {}
+_tools_lock = threading.Lock()
+
+
+# One instance of a stateless tool for every agent; building one renders its schema description.
+def shared_tool(factory: Callable[[], Any]) -> Any:
+    with _tools_lock:
+        if factory not in _tools:
+            _tools[factory] = factory()
+        return _tools[factory]
+
+
+def _pool_size() -> int:
+    return int(os.getenv("HTTP_POOL_SIZE", "16"))
+
+
+# Idle connections stay open this long; rate-limit pacing often leaves gaps longer than httpx's 5s default.
+def _keepalive_seconds() -> float:
+    return float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+
+
+_sessions: dict[str, Any] = {}
+_sessions_lock = threading.Lock()
+
+
+# Keep-alive `requests` session per API base URL (Serper), so searches reuse TLS connections.
+def http_session(base_url: str):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    with _sessions_lock:
+        if base_url not in _sessions:
+            session = requests.Session()
+            session.mount(base_url, HTTPAdapter(pool_connections=1, pool_maxsize=_pool_size()))
+            _sessions[base_url] = session
+        return _sessions[base_url]
+
+
+_llm_handler = None
+_llm_handler_lock = threading.Lock()
+
+
+# One keep-alive httpx pool behind every LLM call in the process, whichever key, agent or run makes it.
+# OpenAI-compatible models reach it through litellm.client_session; Groq models get the handler per call.
+def llm_http_handler():
+    global _llm_handler
+    with _llm_handler_lock:
+        if _llm_handler is None:
+            import httpx
+            import litellm
+            from litellm.llms.custom_httpx.http_handler import HTTPHandler
+
+            client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=_pool_size() * 4,
+                    max_keepalive_connections=_pool_size(),
+                    keepalive_expiry=_keepalive_seconds(),
+                ),
+                timeout=httpx.Timeout(600.0, connect=5.0),
+                follow_redirects=True,
+            )
+            litellm.client_session = client
+            # The handler closes its client when collected, so the registry holds it for the process lifetime.
+            _llm_handler = HTTPHandler(client=client)
+        return _llm_handler
@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from crewai.tasks.task_output import TaskOutput
+
+from bot.plan import REPORT_FORMATS, TravelPlan, render_plan
+from bot.validator import strip_section_heading
+
+# Report sections in document order and the task whose output fills each one.
+REPORT_SECTIONS = {
+    "Destination Overview": "destination_research_task",
+    "Budget Breakdown": "budget_planner_task",
+    "Day-wise Itinerary": "itinerary_designer_task",
+}
+FINAL_TASK = "validation_task"
+FORMAT_SUFFIXES = {"json": ".json", "html": ".html"}
+
+
+# Formats written next to the markdown report when the plan is final (REPORT_FORMATS=markdown,json,html).
+def report_formats() -> list[str]:
+    formats = [fmt.strip().lower() for fmt in os.getenv("REPORT_FORMATS", "markdown,json").split(",") if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in REPORT_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown REPORT_FORMATS entries: {', '.join(unknown)} (use {', '.join(REPORT_FORMATS)}).")
+    return formats
+
+
+# Replace `path` in one step so readers never see a half-written report.
+def atomic_write_text(path: str | Path, text: str) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class ReportWriter:
+    """Writes the report section by section as tasks finish, then the final document from validation."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        inputs: dict,
+        on_section: Callable[[str, str], None] | None = None,
+    ):
+        self.path = Path(path)
+        self.inputs = inputs
+        # Called with (section heading, section markdown) as each section lands, and ("Final Report", text).
+        self.on_section = on_section
+        self.sections: dict[str, str] = {}
+        self.final: str | None = None
+        self.started = time.perf_counter()
+        self.first_section_seconds: float | None = None
+        self._lock = threading.Lock()
+
+    # Task callback hook: section tasks update the partial report, the validation task replaces it.
+    def on_task_output(self, output: TaskOutput) -> None:
+        if output.name == FINAL_TASK and output.raw:
+            self.write_final(output.raw, output.pydantic if isinstance(output.pydantic, TravelPlan) else None)
+            return
+        heading = next((heading for heading, task in REPORT_SECTIONS.items() if task == output.name), None)
+        if heading is not None and output.raw:
+            self.write_section(heading, output.raw)
+
+    def write_section(self, heading: str, markdown: str) -> None:
+        body = strip_section_heading(markdown)
+        with self._lock:
+            # A late or repeated section never overwrites the finished document.
+            if self.final is not None or self.sections.get(heading) == body:
+                return
+            self.sections[heading] = body
+            if self.first_section_seconds is None:
+                self.first_section_seconds = round(time.perf_counter() - self.started, 2)
+            atomic_write_text(self.path, self.render())
+        if self.on_section is not None:
+            self.on_section(heading, body)
+
+    # The markdown report always; JSON/HTML siblings (same name, other suffix) rendered from the typed plan.
+    def write_final(self, text: str, plan: TravelPlan | None = None) -> None:
+        with self._lock:
+            self.final = text
+            atomic_write_text(self.path, text)
+            for fmt in report_formats() if plan is not None else []:
+                if fmt in FORMAT_SUFFIXES:
+                    atomic_write_text(self.path.with_suffix(FORMAT_SUFFIXES[fmt]), render_plan(plan, fmt))
+        if self.on_section is not None:
+            self.on_section("Final Report", text)
+
+    # Partial report: finished sections in document order, pending ones marked as such.
+    def render(self) -> str:
+        lines = [
+            f"# Travel Plan: {self.inputs.get('destination', '')}",
+            f"> Trip Window: {self.inputs.get('travel_dates', '')}",
+            f"> Budget Cap: {self.inputs.get('budget', '')} {self.inputs.get('currency', '')}",
+        ]
+        for heading in REPORT_SECTIONS:
+            lines.extend(["---", f"## {heading}", self.sections.get(heading, "_Pending._")])
+        lines.extend(["---", "## Validation Summary", "_Pending._", ""])
+        return "\n".join(lines)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sections": len(self.sections),
+                "final": self.final is not None,
+                "first_section_seconds": self.first_section_seconds,
+            }
@@ -0,0 +1,41 @@
+import os
+import re
+
+# Topic research tasks (run concurrently) and the heading each one gets in the merged overview.
+RESEARCH_TOPICS = {
+    "attractions_research_task": "Top Highlights",
+    "transport_research_task": "Getting Around",
+    "food_research_task": "Food Areas",
+    "caveats_research_task": "Date Caveats",
+}
+# One research call covering every topic, for trips too short to repay the fan-out.
+OVERVIEW_RESEARCH_TASK = "overview_research_task"
+
+LEADING_HEADING = re.compile(r"^\s*#{1,6}[^\n]*\n")
+
+
+# Trips shorter than this research in one call: the four topic calls double a short trip's requests
+# and prompt tokens, so under per-key RPM/TPM caps they queue instead of running in parallel.
+def research_fanout_min_days() -> int:
+    return max(1, int(os.getenv("RESEARCH_FANOUT_MIN_DAYS", "8")))
+
+
+# Research tasks of a run: the concurrent topic tasks for long trips, else the single overview task.
+def research_task_names(inputs: dict) -> list[str]:
+    if int(inputs.get("trip_days") or 0) >= research_fanout_min_days():
+        return list(RESEARCH_TOPICS)
+    return [OVERVIEW_RESEARCH_TASK]
+
+
+# Deterministic merge of topic outputs into the "Destination Overview" section downstream tasks read.
+def merge_research_sections(sections: dict[str, str]) -> str:
+    parts = ["## Destination Overview"]
+    if OVERVIEW_RESEARCH_TASK in sections:
+        body = LEADING_HEADING.sub("", (sections[OVERVIEW_RESEARCH_TASK] or "").strip(), count=1).strip()
+        parts.append(body or "- No findings (assumption: verify locally).")
+        return "\n\n".join(parts) + "\n"
+    for task_name, heading in RESEARCH_TOPICS.items():
+        # Topic agents often repeat a section heading; the merged document supplies its own.
+        body = LEADING_HEADING.sub("", (sections.get(task_name) or "").strip(), count=1).strip()
+        parts.append(f"### {heading}\n{body or '- No findings (assumption: verify locally).'}")
+    return "\n\n".join(parts) + "\n"
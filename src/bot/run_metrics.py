@@ -0,0 +1,71 @@
+import threading
+
+
+class RunMetrics:
+    """Thread-safe counters collected by the LLM clients of one crew run (shared across retries)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_hit_tokens = 0
+        # (agent, model) -> provider calls, tokens (and their prompt/completion split) and seconds spent on the model.
+        self.llm_calls: dict[tuple[str, str], dict] = {}
+        # task -> raw vs compacted context tokens (latest build; a task builds its context once per run).
+        self.context: dict[str, dict] = {}
+        # task -> provider prompt tokens and how many of them the provider served from its prefix cache.
+        self.prefix_cache: dict[str, dict] = {}
+
+    # Count a completion served from the local cache and the provider tokens it saved.
+    def record_cache_hit(self, tokens: int) -> None:
+        with self._lock:
+            self.cache_hits += 1
+            self.cache_hit_tokens += max(0, int(tokens))
+
+    # Count one provider call made by `agent` on `model`.
+    def record_llm_call(
+        self, agent: str, model: str, seconds: float, tokens: int, prompt_tokens: int = 0, completion_tokens: int = 0
+    ) -> None:
+        with self._lock:
+            entry = self.llm_calls.setdefault(
+                (agent, model), {"calls": 0, "tokens": 0, "prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0}
+            )
+            entry["calls"] += 1
+            entry["tokens"] += max(0, int(tokens))
+            entry["prompt_tokens"] += max(0, int(prompt_tokens))
+            entry["completion_tokens"] += max(0, int(completion_tokens))
+            entry["seconds"] += max(0.0, seconds)
+
+    # Context size a task would have received raw, and what it got (or would get) after compaction.
+    def record_context(self, task: str, raw_tokens: int, compact_tokens: int, applied: bool) -> None:
+        with self._lock:
+            self.context[task] = {"raw_tokens": raw_tokens, "compact_tokens": compact_tokens, "applied": applied}
+
+    # Prompt tokens a finished task sent and the share its provider reported as cached.
+    def record_prefix_cache(self, task: str, prompt_tokens: int, cached_tokens: int) -> None:
+        with self._lock:
+            entry = self.prefix_cache.setdefault(task, {"prompt_tokens": 0, "cached_tokens": 0})
+            entry["prompt_tokens"] += max(0, int(prompt_tokens))
+            entry["cached_tokens"] += max(0, int(cached_tokens))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "cache_hits": self.cache_hits,
+                "cache_hit_tokens": self.cache_hit_tokens,
+                "agents": [
+                    {"agent": agent, "model": model, **entry, "seconds": round(entry["seconds"], 2)}
+                    for (agent, model), entry in sorted(self.llm_calls.items())
+                ],
+                "context": [
+                    {"task": task, **entry, "saved_tokens": entry["raw_tokens"] - entry["compact_tokens"]}
+                    for task, entry in self.context.items()
+                ],
+                "prefix_cache": [
+                    {
+                        "task": task,
+                        **entry,
+                        "hit_ratio": round(entry["cached_tokens"] / entry["prompt_tokens"], 3) if entry["prompt_tokens"] else 0.0,
+                    }
+                    for task, entry in self.prefix_cache.items()
+                ],
+            }
@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from bot.checkpoint import CheckpointStore
+from bot.coalescing import coalescing_enabled, get_coalescing_stats, request_key
+from bot.crew import Bot
+from bot.main import (
+    _build_inputs_from_record,
+    _check_daily_quota,
+    _credential_pool,
+    _extract_token_usage,
+    _kickoff_with_backoff,
+    _match_plan_library,
+    _record_coalescing,
+    _record_usage,
+    _reset_final_output_file,
+    _store_plan,
+)
+from bot.plan import REPORT_FORMATS, TravelPlan, render_plan
+from bot.run_metrics import RunMetrics
+
+
+class TripRequest(BaseModel):
+    """HTTP request body for one trip plan."""
+
+    destination: str = Field(..., min_length=1)
+    travel_dates: str = Field(..., description="YYYY-MM-DD to YYYY-MM-DD")
+    budget: float = Field(..., gt=0)
+    preferences: str = Field(default="culture, food, walking, low-cost local experiences")
+    currency: str = Field(default="USD")
+
+
+class Job:
+    """One queued/running/finished trip plan plus its ordered progress events."""
+
+    def __init__(self, job_id: str, inputs: dict, report_path: Path):
+        self.id = job_id
+        self.inputs = inputs
+        self.report_path = report_path
+        self.status = "queued"
+        self.error: str | None = None
+        self.token_usage: dict | None = None
+        self.plan: TravelPlan | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.events: list[dict] = []
+        self._condition = threading.Condition()
+        # Identical requests attached while this job was queued or running; they finish with it.
+        self.followers: list[Job] = []
+        self.coalesced_with: str | None = None
+        self.library_match: dict | None = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    # Append a progress event and wake any SSE subscribers; attached jobs receive it too.
+    def add_event(self, event: str, **data) -> None:
+        with self._condition:
+            self.events.append({"event": event, "job_id": self.id, "at": time.time(), **data})
+            self._condition.notify_all()
+            followers = list(self.followers)
+        for follower in followers:
+            follower.status, follower.started_at = self.status, self.started_at
+            follower.add_event(event, **data)
+
+    # Attach an identical request: it shares this job's report and result, and replays the progress so far.
+    def attach(self, follower: "Job") -> None:
+        follower.coalesced_with = self.id
+        follower.report_path = self.report_path
+        follower.status = self.status
+        follower.started_at = self.started_at
+        with self._condition:
+            for event in self.events:
+                if event["event"] in ("job_started", "task_completed", "section_ready"):
+                    data = {key: value for key, value in event.items() if key not in ("event", "job_id", "at")}
+                    follower.add_event(event["event"], **data)
+            self.followers.append(follower)
+
+    # Copy the outcome to attached jobs before the final event wakes their subscribers.
+    def finish_followers(self) -> None:
+        for follower in self.followers:
+            follower.error = self.error
+            follower.token_usage = self.token_usage
+            follower.plan = self.plan
+            follower.library_match = self.library_match
+            follower.finished_at = self.finished_at
+
+    # Block (in a worker thread) until events past `cursor` exist, the job ends, or timeout.
+    def wait_for_events(self, cursor: int, timeout: float) -> tuple[list[dict], bool]:
+        with self._condition:
+            if len(self.events) <= cursor and not self.done:
+                self._condition.wait(timeout=timeout)
+            return self.events[cursor:], self.done
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "destination": self.inputs["destination"],
+            "travel_dates": self.inputs["travel_dates"],
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "tasks_completed": sum(1 for event in self.events if event["event"] == "task_completed"),
+            "sections_ready": [event["section"] for event in self.events if event["event"] == "section_ready"],
+            "token_usage": self.token_usage,
+            "coalesced_with": self.coalesced_with,
+            "library_match": self.library_match,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Bounded worker pool that runs queued jobs on warm, reusable Bot instances."""
+
+    def __init__(self, workers: int, max_queue: int, max_jobs: int, reports_dir: str):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.max_jobs = max_jobs
+        self.reports_dir = reports_dir
+        self.jobs: dict[str, Job] = {}
+        # Queued or running job per request key; identical requests attach to it instead of running.
+        self._inflight: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="trip-worker")
+        # Each Bot keeps parsed configs, agents and LLM clients alive between jobs.
+        self._bots: queue.Queue[Bot] = queue.Queue()
+
+    # Build one warm Bot per worker up front so the first requests skip construction cost.
+    def warm_up(self) -> None:
+        for _ in range(self.workers):
+            self._bots.put(self._new_bot())
+
+    def _new_bot(self) -> Bot:
+        # Bot._report_path fills `{run_id}` from each run's inputs, so one warm Bot writes every job's report.
+        return Bot(credentials=_credential_pool(), output_file=f"{self.reports_dir}/{{run_id}}.md")
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # Register and enqueue a job, or attach it to an identical queued/running one; rejects when the queue is full.
+    def submit(self, request: TripRequest) -> Job:
+        with self._lock:
+            job_id = uuid.uuid4().hex
+            inputs = _build_inputs_from_record(request.model_dump(), job_id)
+            inputs["run_id"] = job_id
+            job = Job(job_id, inputs, Path(self.reports_dir) / f"{job_id}.md")
+            key = request_key(inputs) if coalescing_enabled() else job_id
+            leader = self._inflight.get(key)
+            # Attached jobs take no worker or queue slot.
+            if leader is None and len(self._inflight) >= self.max_queue + self.workers:
+                raise HTTPException(status_code=503, detail="Job queue is full. Retry later.")
+            self.jobs[job_id] = job
+            self._evict_finished()
+            job.add_event("job_queued")
+            if leader is not None:
+                # Under the lock, so the leader cannot finish between the lookup and the attach.
+                job.add_event("job_coalesced", leader_job_id=leader.id)
+                leader.attach(job)
+                get_coalescing_stats().record_attached()
+                return job
+            self._inflight[key] = job
+        self._executor.submit(self._run_job, job, key)
+        return job
+
+    # Keep memory bounded by forgetting the oldest finished jobs.
+    def _evict_finished(self) -> None:
+        finished = sorted((job for job in self.jobs.values() if job.done), key=lambda job: job.created_at)
+        while len(self.jobs) > self.max_jobs and finished:
+            self.jobs.pop(finished.pop(0).id, None)
+
+    def get(self, job_id: str) -> Job:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+        return job
+
+    def _run_job(self, job: Job, key: str) -> None:
+        # No warm Bot free (e.g. before warm_up): build one rather than wait on the pool.
+        try:
+            bot = self._bots.get_nowait()
+        except queue.Empty:
+            bot = self._new_bot()
+        job.status = "running"
+        job.started_at = time.time()
+        job.add_event("job_started")
+        try:
+            metrics = RunMetrics()
+            checkpoints = CheckpointStore(job.id)
+            checkpoints.start(job.inputs)
+            _match_plan_library(checkpoints, job.inputs)
+            job.library_match = checkpoints.library_match
+            bot.prepare_run(
+                metrics=metrics,
+                task_callback=lambda output: job.add_event("task_completed", task=output.name, agent=output.agent),
+                checkpoints=checkpoints,
+                inputs=job.inputs,
+                section_callback=lambda heading, markdown: job.add_event(
+                    "section_ready", section=heading, markdown=markdown
+                ),
+            )
+            _check_daily_quota(job.inputs)
+            _reset_final_output_file(job.report_path)
+            result = _kickoff_with_backoff(job.inputs, metrics, bot=bot)
+            job.token_usage = _extract_token_usage(result, metrics)
+            _record_usage(job.inputs, job.token_usage, calibrate=not checkpoints.restored)
+            _record_coalescing(checkpoints)
+            _store_plan(job.inputs, result, checkpoints)
+            job.plan = result.pydantic
+            job.status = "succeeded"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            bot.prepare_run()
+            self._bots.put(bot)
+            # Later identical requests start a fresh run rather than attach to a finished one.
+            with self._lock:
+                self._inflight.pop(key, None)
+            job.finished_at = time.time()
+            job.finish_followers()
+            job.add_event(f"job_{job.status}", error=job.error)
+
+
+# Format one server-sent event frame.
+def _sse_frame(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+def create_app() -> FastAPI:
+    manager = JobManager(
+        workers=int(os.getenv("SERVICE_WORKERS", "2")),
+        max_queue=int(os.getenv("SERVICE_MAX_QUEUE", "100")),
+        max_jobs=int(os.getenv("SERVICE_MAX_JOBS", "1000")),
+        reports_dir=os.getenv("SERVICE_REPORTS_DIR", "reports"),
+    )
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI):
+        manager.warm_up()
+        yield
+        manager.shutdown()
+
+    app = FastAPI(title="Travel Planner Crew", lifespan=lifespan)
+    app.state.jobs = manager
+
+    @app.post("/trips", status_code=202)
+    def submit_trip(request: TripRequest) -> dict:
+        return manager.submit(request).to_dict()
+
+    @app.get("/trips/{job_id}")
+    def get_trip(job_id: str) -> dict:
+        return manager.get(job_id).to_dict()
+
+    @app.get("/trips/{job_id}/events")
+    async def stream_trip_events(job_id: str) -> StreamingResponse:
+        job = manager.get(job_id)
+
+        async def event_stream():
+            cursor = 0
+            while True:
+                events, done = await asyncio.to_thread(job.wait_for_events, cursor, 15.0)
+                for event in events:
+                    yield _sse_frame(event)
+                cursor += len(events)
+                if done and not events:
+                    return
+                if not events:
+                    yield ": keep-alive\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    # Finished report, or the sections written so far while the job runs (X-Report-Complete: false).
+    # `format=json|html` renders the finished typed plan instead of the markdown file.
+    @app.get("/trips/{job_id}/report", response_class=PlainTextResponse)
+    def get_trip_report(job_id: str, format: str = "markdown") -> PlainTextResponse:
+        job = manager.get(job_id)
+        if format not in REPORT_FORMATS:
+            raise HTTPException(status_code=422, detail=f"Unknown format '{format}'; use one of {', '.join(REPORT_FORMATS)}.")
+        if format != "markdown":
+            if job.plan is None:
+                raise HTTPException(status_code=409, detail=f"Job is {job.status}; plan not available.")
+            media_type = "application/json" if format == "json" else "text/html"
+            return PlainTextResponse(render_plan(job.plan, format), media_type=media_type)
+        content = job.report_path.read_text(encoding="utf-8") if job.report_path.exists() else ""
+        if job.status == "failed" or not content.strip():
+            raise HTTPException(status_code=409, detail=f"Job is {job.status}; report not available.")
+        return PlainTextResponse(
+            content,
+            media_type="text/markdown",
+            headers={"X-Report-Complete": "true" if job.status == "succeeded" else "false"},
+        )
+
+    @app.get("/healthz")
+    def healthz() -> dict:
+        return {
+            "status": "ok",
+            "workers": manager.workers,
+            "credentials": _credential_pool().snapshot(),
+            "coalescing": get_coalescing_stats().snapshot(),
+        }
+
+    return app
+
+
+# Long-running HTTP entrypoint.
+def serve():
+    """Serve the travel planner over HTTP."""
+    import uvicorn
+
+    uvicorn.run(
+        create_app(),
+        host=os.getenv("SERVICE_HOST", "127.0.0.1"),
+        port=int(os.getenv("SERVICE_PORT", "8000")),
+    )
+
+
+if __name__ == "__main__":
+    serve()
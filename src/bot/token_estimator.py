@@ -0,0 +1,269 @@
+import importlib.util
+import json
+import math
+import os
+from functools import lru_cache
+from pathlib import Path
+
+from bot.cache_store import SQLiteCache, get_cache
+from bot.checkpoint import TEMPLATE_VARIABLE
+from bot.itinerary import chunk_task_config, plan_itinerary_chunks
+from bot.model_routing import agent_route, context_compaction_mode
+from bot.prompt_layout import load_prompt_config
+from bot.research import research_task_names
+
+CONFIG_DIR = Path(__file__).parent / "config"
+
+# Upstream outputs each LLM task receives as context (mirrors the wiring in Bot.crew()).
+TASK_CONTEXT = {
+    "budget_planner_task": ("destination_research_task",),
+    "itinerary_designer_task": ("destination_research_task", "budget_planner_task"),
+    "validation_task": ("destination_research_task", "budget_planner_task", "itinerary_designer_task"),
+}
+# Tool schemas plus the ReAct tool-use instructions CrewAI adds for agents that have tools.
+TOOL_PROMPT_TOKENS = {"destination_researcher": 450, "budget_planner": 300}
+# Agents with tools usually need one tool round-trip before the final answer.
+CALLS_PER_TASK = {"destination_researcher": 2, "budget_planner": 2}
+# CrewAI framing around every call (format instructions, "Current Task" headers).
+CALL_OVERHEAD_TOKENS = 150
+# Uncalibrated completion sizes.
+COMPLETION_TOKENS = {"topic": 300, "overview": 450, "budget": 450, "day": 120, "summary": 200}
+
+CALIBRATION_ALPHA = 0.3
+CALIBRATION_BOUNDS = (0.25, 4.0)
+CALIBRATION_KEY = "token_calibration"
+CALIBRATION_TTL_SECONDS = 365 * 24 * 3600
+
+
+# Local tokenizer; LiteLLM ships the cl100k_base file, so no download is needed once it is importable.
+# The estimate runs before LiteLLM is imported, so its tokenizer directory is located without importing it.
+# tiktoken only reads its cache directory from the environment, so it is set for the load and then restored.
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        litellm = importlib.util.find_spec("litellm")
+        if "TIKTOKEN_CACHE_DIR" in os.environ or litellm is None or not litellm.submodule_search_locations:
+            return tiktoken.get_encoding(os.getenv("TOKEN_ESTIMATOR_ENCODING", "cl100k_base"))
+        bundled = Path(list(litellm.submodule_search_locations)[0]) / "litellm_core_utils" / "tokenizers"
+        os.environ["TIKTOKEN_CACHE_DIR"] = os.getenv("CUSTOM_TIKTOKEN_CACHE_DIR", str(bundled))
+        try:
+            return tiktoken.get_encoding(os.getenv("TOKEN_ESTIMATOR_ENCODING", "cl100k_base"))
+        finally:
+            os.environ.pop("TIKTOKEN_CACHE_DIR", None)
+    except Exception:
+        return None
+
+
+# Token count of `text`; falls back to characters / 4 when no tokenizer is available.
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return len(text or "") // 4
+    return len(encoding.encode(text or "", disallowed_special=()))
+
+
+def _configs() -> tuple[dict, dict]:
+    return load_prompt_config(CONFIG_DIR / "agents.yaml"), load_prompt_config(CONFIG_DIR / "tasks.yaml")
+
+
+def _render(template: str, inputs: dict) -> str:
+    return TEMPLATE_VARIABLE.sub(lambda match: str(inputs.get(match.group(1), match.group(0))), template or "")
+
+
+# Rendered agent + task prompt tokens for one call of `task_config`.
+def _prompt_tokens(task_config: dict, agent_config: dict, inputs: dict) -> int:
+    prompt = "\n".join(
+        _render(str(config.get(field, "")), inputs)
+        for config, fields in ((agent_config, ("role", "goal", "backstory")), (task_config, ("description", "expected_output")))
+        for field in fields
+    )
+    return count_tokens(prompt) + CALL_OVERHEAD_TOKENS
+
+
+# Every LLM call group of one run as (task name, task config, completion tokens), plus each task's
+# total completion (the context its downstream tasks receive).
+def _run_calls(inputs: dict, tasks_config: dict) -> tuple[list[tuple[str, dict, int]], dict]:
+    trip_days = max(1, int(inputs.get("trip_days") or 1))
+    research_tasks = research_task_names(inputs)
+    research_completion = COMPLETION_TOKENS["topic"] if len(research_tasks) > 1 else COMPLETION_TOKENS["overview"]
+    completions = {
+        "destination_research_task": research_completion * len(research_tasks),
+        "budget_planner_task": COMPLETION_TOKENS["budget"],
+        "itinerary_designer_task": COMPLETION_TOKENS["day"] * trip_days,
+    }
+    completions["validation_task"] = sum(completions.values()) + COMPLETION_TOKENS["summary"]
+
+    calls = [(name, tasks_config[name], research_completion) for name in research_tasks]
+    calls.append(("budget_planner_task", tasks_config["budget_planner_task"], completions["budget_planner_task"]))
+    itinerary_config = tasks_config["itinerary_designer_task"]
+    chunks = plan_itinerary_chunks(inputs)
+    for chunk in chunks:
+        chunk_config = {**itinerary_config, **chunk_task_config(itinerary_config, chunk, len(chunks), trip_days)}
+        days = chunk["last_day"] - chunk["first_day"] + 1
+        calls.append(("itinerary_designer_task", chunk_config, COMPLETION_TOKENS["day"] * days))
+    if not chunks:
+        calls.append(("itinerary_designer_task", itinerary_config, completions["itinerary_designer_task"]))
+    calls.append(("validation_task", tasks_config["validation_task"], completions["validation_task"]))
+    return calls, completions
+
+
+# Uncalibrated usage of one run per agent: every LLM task's rendered prompt, context, tool schemas and completion.
+def _raw_agent_estimates(inputs: dict) -> dict[str, dict]:
+    agents_config, tasks_config = _configs()
+    calls, completions = _run_calls(inputs, tasks_config)
+    compacted = context_compaction_mode() == "on"
+    estimates: dict[str, dict] = {}
+    for task_name, task_config, completion in calls:
+        agent_name = task_config["agent"]
+        context = sum(completions[upstream] for upstream in TASK_CONTEXT.get(task_name, ()))
+        if compacted:
+            context = min(context, agent_route(agent_name)["context_tokens"])
+        task_calls = CALLS_PER_TASK.get(agent_name, 1)
+        per_call = _prompt_tokens(task_config, agents_config[agent_name], inputs) + TOOL_PROMPT_TOKENS.get(agent_name, 0)
+        estimate = estimates.setdefault(agent_name, {"prompt_tokens": 0, "completion_tokens": 0, "requests": 0})
+        # Each follow-up call re-sends the prompt plus the previous tool result.
+        estimate["prompt_tokens"] += task_calls * (per_call + context) + (task_calls - 1) * completion
+        estimate["completion_tokens"] += completion
+        estimate["requests"] += task_calls
+    return estimates
+
+
+def _sum_estimates(estimates) -> dict:
+    return {
+        field: sum(estimate[field] for estimate in estimates) for field in ("prompt_tokens", "completion_tokens", "requests")
+    }
+
+
+# Uncalibrated usage of one run.
+def raw_run_estimate(inputs: dict) -> dict:
+    return _sum_estimates(_raw_agent_estimates(inputs).values())
+
+
+# Model an agent's calls are expected to use before any key is picked: its pinned model, else the
+# tier's default (FAST_MODEL for fast agents when set, MODEL otherwise).
+def planned_model(agent_name: str) -> str:
+    route = agent_route(agent_name)
+    if route["model"]:
+        return route["model"]
+    if route["tier"] == "fast" and os.getenv("FAST_MODEL"):
+        return os.environ["FAST_MODEL"]
+    return os.getenv("MODEL", "")
+
+
+# Ratios per model live in one entry; concurrent workers fold their runs into it in a transaction.
+def _calibration_cache() -> SQLiteCache:
+    return get_cache(os.getenv("TOKEN_CALIBRATION_PATH", "cache/token_calibration.sqlite"), max_bytes=1024 * 1024)
+
+
+def _read_calibration() -> dict:
+    value = _calibration_cache().get(CALIBRATION_KEY)
+    return json.loads(value) if value else {}
+
+
+# Learned actual/estimated ratios for `model` (default MODEL; 1.0 until a run on it has been observed).
+def calibration(stored: dict | None = None, model: str | None = None) -> dict:
+    stored = _read_calibration() if stored is None else stored
+    learned = stored.get(os.getenv("MODEL", "") if model is None else model, {})
+    return {
+        "prompt_ratio": learned.get("prompt_ratio", 1.0),
+        "completion_ratio": learned.get("completion_ratio", 1.0),
+        "requests_ratio": learned.get("requests_ratio", 1.0),
+        "samples": learned.get("samples", 0),
+    }
+
+
+# Calibrated token and request estimate for one full run; each agent's share uses its planned model's ratios.
+def estimate_run_usage(inputs: dict) -> dict:
+    stored = _read_calibration()
+    prompt_tokens = completion_tokens = requests = 0.0
+    for agent_name, raw in _raw_agent_estimates(inputs).items():
+        ratios = calibration(stored, planned_model(agent_name))
+        prompt_tokens += raw["prompt_tokens"] * ratios["prompt_ratio"]
+        completion_tokens += raw["completion_tokens"] * ratios["completion_ratio"]
+        requests += raw["requests"] * ratios["requests_ratio"]
+    return {"total_tokens": math.ceil(prompt_tokens + completion_tokens), "requests": math.ceil(requests)}
+
+
+# Calibrated requests and completion tokens, which need no tokenizer; the completions are a lower
+# bound on total_tokens, enough to reject a run the remaining quota cannot cover anyway.
+def estimate_run_floor(inputs: dict) -> dict:
+    _, tasks_config = _configs()
+    calls, _ = _run_calls(inputs, tasks_config)
+    stored = _read_calibration()
+    completion_tokens = requests = 0.0
+    for _, task_config, completion in calls:
+        ratios = calibration(stored, planned_model(task_config["agent"]))
+        completion_tokens += completion * ratios["completion_ratio"]
+        requests += CALLS_PER_TASK.get(task_config["agent"], 1) * ratios["requests_ratio"]
+    return {"completion_tokens": math.ceil(completion_tokens), "requests": math.ceil(requests)}
+
+
+def _blend(previous: float, observed: float, samples: int) -> float:
+    observed = min(max(observed, CALIBRATION_BOUNDS[0]), CALIBRATION_BOUNDS[1])
+    # The first observation replaces the default outright; later ones move an exponential average.
+    return observed if samples == 0 else previous + CALIBRATION_ALPHA * (observed - previous)
+
+
+# Actual and raw-estimated usage per model that answered the run's calls. Each agent's estimate is split
+# across the models it used by call count (a key pool may serve one agent from several models); usage
+# without a per-agent breakdown is attributed to MODEL.
+def _usage_by_model(inputs: dict, usage: dict) -> dict[str, tuple[dict, dict]]:
+    agents = [entry for entry in usage.get("agents") or [] if entry.get("calls")]
+    if not agents or not any(entry.get("prompt_tokens") for entry in agents):
+        return {os.getenv("MODEL", ""): (usage, raw_run_estimate(inputs))}
+    raw_by_agent = _raw_agent_estimates(inputs)
+    calls_by_agent: dict[str, int] = {}
+    for entry in agents:
+        calls_by_agent[entry["agent"]] = calls_by_agent.get(entry["agent"], 0) + entry["calls"]
+    by_model: dict[str, tuple[dict, dict]] = {}
+    for entry in agents:
+        raw = raw_by_agent.get(entry["agent"])
+        if raw is None:
+            continue
+        share = entry["calls"] / calls_by_agent[entry["agent"]]
+        actual, estimated = by_model.setdefault(
+            entry["model"],
+            (
+                {"prompt_tokens": 0, "completion_tokens": 0, "successful_requests": 0},
+                {"prompt_tokens": 0.0, "completion_tokens": 0.0, "requests": 0.0},
+            ),
+        )
+        actual["prompt_tokens"] += entry.get("prompt_tokens", 0)
+        actual["completion_tokens"] += entry.get("completion_tokens", 0)
+        actual["successful_requests"] += entry["calls"]
+        for field in estimated:
+            estimated[field] += raw[field] * share
+    return by_model
+
+
+# Fold the provider-reported usage of a complete run (no cache hits, no restored tasks) into the ratios
+# of each model that served it.
+def record_run_usage(inputs: dict, usage: dict) -> None:
+    if not usage.get("successful_requests") or not usage.get("prompt_tokens"):
+        return
+    by_model = {
+        model: (actual, raw)
+        for model, (actual, raw) in _usage_by_model(inputs, usage).items()
+        if actual["prompt_tokens"] and actual["successful_requests"] and raw["prompt_tokens"] and raw["completion_tokens"]
+    }
+    if not by_model:
+        return
+
+    def fold(value: str | None) -> str:
+        stored = json.loads(value) if value else {}
+        for model, (actual, raw) in by_model.items():
+            current = calibration(stored, model)
+            samples = current["samples"]
+            stored[model] = {
+                "prompt_ratio": _blend(current["prompt_ratio"], actual["prompt_tokens"] / raw["prompt_tokens"], samples),
+                "completion_ratio": _blend(
+                    current["completion_ratio"], actual["completion_tokens"] / raw["completion_tokens"], samples
+                ),
+                "requests_ratio": _blend(current["requests_ratio"], actual["successful_requests"] / raw["requests"], samples),
+                "samples": samples + 1,
+            }
+        return json.dumps(stored)
+
+    _calibration_cache().update(CALIBRATION_KEY, fold, CALIBRATION_TTL_SECONDS)
@@ -1,3 +1,4 @@
+from .cached_serper_tool import CachedSerperDevTool
 from .custom_tool import TravelBudgetCalculatorTool
 
-__all__ = ["TravelBudgetCalculatorTool"]
+__all__ = ["CachedSerperDevTool", "TravelBudgetCalculatorTool"]
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import re
+from typing import Any
+
+from crewai_tools import SerperDevTool
+from pydantic import Field
+
+from bot.cache_store import SQLiteCache, get_cache
+from bot.execution_log import log
+from bot.registry import http_session
+from bot.tracing import span
+
+
+# Offline mode serves only cached results, so tests and benchmarks never touch the network.
+def search_offline_mode() -> bool:
+    return os.getenv("SERPER_OFFLINE", "").lower() in ("1", "true", "yes")
+
+
+# Shared Serper result cache for this process.
+def get_search_cache() -> SQLiteCache:
+    return get_cache(
+        os.getenv("SERPER_CACHE_PATH", "cache/serper.sqlite"),
+        max_bytes=int(float(os.getenv("SERPER_CACHE_MAX_MB", "50")) * 1024 * 1024),
+    )
+
+
+# Collapse case/whitespace/trailing punctuation so trivially different queries share an entry.
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().strip("?.!").lower()
+
+
+class CachedSerperDevTool(SerperDevTool):
+    """SerperDevTool with a disk-backed TTL cache in front of the live API."""
+
+    cache_ttl_seconds: int = Field(
+        default_factory=lambda: int(os.getenv("SERPER_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    )
+    # Serper-compatible endpoint override (e.g. the local fake provider used by the benchmarks).
+    base_url: str = Field(default_factory=lambda: os.getenv("SERPER_BASE_URL", "https://google.serper.dev"))
+
+    # Key on everything that changes the Serper response, not just the query text.
+    def _cache_key(self, search_query: str, search_type: str) -> str:
+        payload = {
+            "q": normalize_query(search_query),
+            "type": search_type.lower(),
+            "num": self.n_results,
+            "gl": self.country,
+            "location": self.location,
+            "hl": self.locale,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    # SerperDevTool's request and error logging, sent over the process-wide keep-alive session instead of a
+    # new connection per search.
+    def _make_api_request(self, search_query: str, search_type: str) -> dict[str, Any]:
+        import requests
+
+        payload = {"q": search_query, "num": self.n_results}
+        if self.country != "":
+            payload["gl"] = self.country
+        if self.location != "":
+            payload["location"] = self.location
+        if self.locale != "":
+            payload["hl"] = self.locale
+
+        response = None
+        try:
+            response = http_session(self.base_url).post(
+                self._get_search_url(search_type),
+                headers={"X-API-KEY": os.environ["SERPER_API_KEY"], "content-type": "application/json"},
+                json=payload,
+                timeout=10,
+            )
+            response.raise_for_status()
+            results = response.json()
+            if not results:
+                log.error("Empty response from Serper API")
+                raise ValueError("Empty response from Serper API")
+            return results
+        except requests.exceptions.RequestException as e:
+            error_msg = f"Error making request to Serper API: {e}"
+            if response is not None and hasattr(response, "content"):
+                error_msg += f"\nResponse content: {response.content.decode('utf-8', errors='replace')}"
+            log.error(error_msg)
+            raise
+        except json.JSONDecodeError as e:
+            if response is not None and hasattr(response, "content"):
+                log.error("Error decoding JSON response: %s", e)
+                log.error("Response content: %s", response.content.decode("utf-8", errors="replace"))
+            else:
+                log.error("Error decoding JSON response: %s (No response content available)", e)
+            raise
+
+    def _run(self, **kwargs: Any) -> Any:
+        search_query = kwargs.get("search_query") or kwargs.get("query")
+        search_type = kwargs.get("search_type", self.search_type)
+        if not search_query:
+            raise ValueError("search_query is required")
+
+        with span(self.name, "tool_call", query=search_query, search_type=search_type) as tool_span:
+            cache = get_search_cache()
+            key = self._cache_key(search_query, search_type)
+            cached = cache.get(key)
+            tool_span.set(cache_hit=cached is not None)
+            log.debug("Search '%s' (%s): %s", search_query, search_type, "cache hit" if cached is not None else "cache miss")
+            if cached is not None:
+                return json.loads(cached)
+            if search_offline_mode():
+                tool_span.set(offline=True)
+                return f"No cached Serper results for '{search_query}' (offline mode). Label related facts as assumptions."
+
+            results = super()._run(**kwargs)
+            cache.set(key, json.dumps(results), ttl_seconds=self.cache_ttl_seconds)
+            return results
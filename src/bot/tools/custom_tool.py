@@ -3,6 +3,8 @@ from typing import Type
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field, model_validator
 
+from bot.tracing import traced_tool
+
 
 class TravelBudgetCalculatorInput(BaseModel):
     """Input schema for travel budget calculation."""
@@ -39,6 +41,7 @@ class TravelBudgetCalculatorTool(BaseTool):
     args_schema: Type[BaseModel] = TravelBudgetCalculatorInput
 
     # Compute category allocations and return a compact JSON string for downstream parsing.
+    @traced_tool("total_budget", "trip_days")
     def _run(
         self,
         total_budget: float,
@@ -0,0 +1,441 @@
+#!/usr/bin/env python
+import argparse
+import atexit
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+# Span kinds, outermost first: a run holds tasks, a task holds agent iterations, an iteration holds
+# LLM and tool calls, an LLM call holds quota waits; backoff sleeps sit between kickoff attempts.
+SPAN_KINDS = ("run", "task", "agent_iteration", "llm_call", "tool_call", "quota_wait", "backoff")
+TRACE_EXPORTERS = ("jsonl", "otlp", "off")
+OTLP_BATCH_SPANS = 64
+
+_current: contextvars.ContextVar["Span | None"] = contextvars.ContextVar("bot_trace_span", default=None)
+
+
+class Span:
+    """One timed operation; finished spans go to the configured exporters."""
+
+    def __init__(self, name: str, kind: str, parent: "Span | None" = None, attributes: dict | None = None):
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent = parent
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter()
+        self.duration_ms: float | None = None
+        self.error: str | None = None
+        # Agent iteration opened lazily by the first LLM call of that iteration (task spans only), and the
+        # context token that made it current.
+        self.open_iteration: Span | None = None
+        self.iteration_token: contextvars.Token | None = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    # Add to a numeric attribute (token counts, retries) that may be bumped several times.
+    def add(self, key: str, amount: float = 1) -> None:
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def finish(self, error: BaseException | None = None) -> None:
+        if self.duration_ms is not None:
+            return
+        if self.open_iteration is not None:
+            self.open_iteration.finish()
+            self.open_iteration = None
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        _export(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent is not None else None,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms or 0.0, 3),
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+# Name of the run span the current span belongs to (the run / request id), if any.
+def current_run_id() -> str | None:
+    node = _current.get()
+    while node is not None and node.kind != "run":
+        node = node.parent
+    return node.name if node is not None else None
+
+
+# Time a block as a child of `parent` (default: the span in scope on this thread / asyncio task).
+# Threads started by CrewAI do not inherit the caller's context, so pass their parent explicitly.
+@contextmanager
+def span(name: str, kind: str, parent: Span | None = None, **attributes: Any) -> Iterator[Span]:
+    opened = Span(name, kind, parent if parent is not None else _current.get(), attributes)
+    token = _current.set(opened)
+    error = None
+    try:
+        yield opened
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _exit_agent_iteration(opened)
+        opened.finish(error)
+        _current.reset(token)
+
+
+# Record an operation that already happened (e.g. a limiter wait timed by the caller) under the current span.
+def record_span(name: str, kind: str, seconds: float, **attributes: Any) -> None:
+    recorded = Span(name, kind, _current.get(), attributes)
+    recorded.start_ns -= int(seconds * 1e9)
+    recorded.duration_ms = seconds * 1000
+    _export(recorded)
+
+
+# Decorate a tool's `_run` so each call is a tool_call span named after the tool, tagged with the named arguments.
+def traced_tool(*argument_names: str):
+    def decorate(run):
+        @functools.wraps(run)
+        def traced_run(self, *args, **kwargs):
+            with span(self.name, "tool_call", **{name: kwargs.get(name) for name in argument_names}):
+                return run(self, *args, **kwargs)
+
+        return traced_run
+
+    return decorate
+
+
+# Enter agent iteration `index` of the task in scope: LLM calls open it and the next iteration
+# (or the end of the task) closes it, so tool calls made in between nest under it.
+def enter_agent_iteration(index: int | None) -> None:
+    current = _current.get()
+    if index is None or current is None:
+        return
+    task_span = current.parent if current.kind == "agent_iteration" else current
+    if task_span is None or task_span.kind != "task":
+        return
+    if current.kind == "agent_iteration":
+        if current.attributes.get("iteration") == index:
+            return
+        _exit_agent_iteration(task_span)
+    task_span.open_iteration = Span("iteration", "agent_iteration", task_span, {"iteration": index})
+    task_span.iteration_token = _current.set(task_span.open_iteration)
+
+
+# Close the iteration open under `task_span` and make the task span current again.
+def _exit_agent_iteration(task_span: Span) -> None:
+    if task_span.open_iteration is not None:
+        task_span.open_iteration.finish()
+        task_span.open_iteration = None
+    if task_span.iteration_token is not None:
+        _current.reset(task_span.iteration_token)
+        task_span.iteration_token = None
+
+
+class JsonlSpanExporter:
+    """Appends finished spans to a JSONL file, rotating it to `<path>.1..N` past `max_bytes`."""
+
+    def __init__(self, path: str | Path, max_bytes: int, backups: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+
+    def _rotate(self) -> None:
+        for index in range(self.backups, 0, -1):
+            source = self.path if index == 1 else self.path.with_name(f"{self.path.name}.{index - 1}")
+            if source.exists():
+                os.replace(source, self.path.with_name(f"{self.path.name}.{index}"))
+        if self.backups == 0:
+            self.path.unlink(missing_ok=True)
+
+    def export(self, spans: list[dict]) -> None:
+        lines = "".join(json.dumps(item, default=str) + "\n" for item in spans)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.path.exists() and self.path.stat().st_size + len(lines) > self.max_bytes:
+                self._rotate()
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write(lines)
+
+    def flush(self) -> None:
+        pass
+
+
+# OTLP attribute value for a plain Python value.
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpSpanExporter:
+    """Posts spans as OTLP/HTTP JSON to a collector, batched until a run ends or the batch fills."""
+
+    def __init__(self, endpoint: str, headers: dict | None = None, timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.timeout = timeout
+        self._pending: list[dict] = []
+        self._lock = threading.Lock()
+        self._warned = False
+
+    def export(self, spans: list[dict]) -> None:
+        with self._lock:
+            self._pending.extend(spans)
+            full = len(self._pending) >= OTLP_BATCH_SPANS
+        # Root spans close a run: ship its trace right away.
+        if full or any(item["parent_id"] is None for item in spans):
+            self.flush()
+
+    def _payload(self, spans: list[dict]) -> dict:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "bot"}}]},
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "bot.tracing"},
+                            "spans": [
+                                {
+                                    "traceId": item["trace_id"],
+                                    "spanId": item["span_id"],
+                                    **({"parentSpanId": item["parent_id"]} if item["parent_id"] else {}),
+                                    "name": f"{item['kind']} {item['name']}",
+                                    "kind": 1,
+                                    "startTimeUnixNano": str(item["start_ns"]),
+                                    "endTimeUnixNano": str(item["start_ns"] + int(item["duration_ms"] * 1e6)),
+                                    "attributes": [
+                                        {"key": key, "value": _otlp_value(value)}
+                                        for key, value in {"bot.kind": item["kind"], **item["attributes"]}.items()
+                                        if value is not None
+                                    ],
+                                    "status": {"code": 2, "message": item["error"]} if item["error"] else {"code": 1},
+                                }
+                                for item in spans
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def flush(self) -> None:
+        import urllib.request
+
+        with self._lock:
+            spans, self._pending = self._pending, []
+        if not spans:
+            return
+        request = urllib.request.Request(
+            self.endpoint, data=json.dumps(self._payload(spans)).encode("utf-8"), headers=self.headers, method="POST"
+        )
+        try:
+            urllib.request.urlopen(request, timeout=self.timeout).close()
+        except Exception as e:
+            # Tracing must never fail a run; warn once per process.
+            if not self._warned:
+                self._warned = True
+                print(f"Trace export to {self.endpoint} failed: {e}", file=sys.stderr)
+
+
+# Collector URL: TRACE_OTLP_ENDPOINT, else the standard OTEL_EXPORTER_OTLP_* variables, else a local collector.
+def _otlp_endpoint() -> str:
+    explicit = os.getenv("TRACE_OTLP_ENDPOINT") or os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT")
+    if explicit:
+        return explicit
+    return os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318").rstrip("/") + "/v1/traces"
+
+
+def _otlp_headers() -> dict:
+    pairs = [pair.split("=", 1) for pair in os.getenv("OTEL_EXPORTER_OTLP_HEADERS", "").split(",") if "=" in pair]
+    return {key.strip(): value.strip() for key, value in pairs}
+
+
+# Local span file (TRACE_PATH).
+def trace_path() -> Path:
+    return Path(os.getenv("TRACE_PATH", "logs/traces.jsonl"))
+
+
+# Exporters named by TRACE_EXPORTER (comma-separated: jsonl, otlp, off).
+def _build_exporters() -> list:
+    names = [name.strip().lower() for name in os.getenv("TRACE_EXPORTER", "jsonl").split(",") if name.strip()]
+    unknown = [name for name in names if name not in TRACE_EXPORTERS]
+    if unknown:
+        raise ValueError(f"Unknown TRACE_EXPORTER entries: {', '.join(unknown)} (use {', '.join(TRACE_EXPORTERS)}).")
+    exporters = []
+    if "jsonl" in names:
+        exporters.append(
+            JsonlSpanExporter(
+                trace_path(),
+                max_bytes=int(float(os.getenv("TRACE_MAX_MB", "20")) * 1024 * 1024),
+                backups=int(os.getenv("TRACE_BACKUPS", "3")),
+            )
+        )
+    if "otlp" in names:
+        exporters.append(OtlpSpanExporter(_otlp_endpoint(), _otlp_headers()))
+    return exporters
+
+
+_exporters: list | None = None
+_exporters_lock = threading.Lock()
+
+
+def _get_exporters() -> list:
+    global _exporters
+    with _exporters_lock:
+        if _exporters is None:
+            _exporters = _build_exporters()
+            atexit.register(flush_traces)
+        return _exporters
+
+
+def _export(finished: Span) -> None:
+    exporters = _get_exporters()
+    if not exporters:
+        return
+    record = finished.to_dict()
+    for exporter in exporters:
+        exporter.export([record])
+
+
+# Push buffered spans to the collector (called at exit; runs flush their trace as they finish).
+def flush_traces() -> None:
+    for exporter in _exporters or []:
+        exporter.flush()
+
+
+# Spans from the local file, oldest first; `include_rotated` adds the rotated backups.
+def load_spans(path: str | Path, include_rotated: bool = False) -> list[dict]:
+    path = Path(path)
+    files = [path]
+    if include_rotated:
+        files = sorted(path.parent.glob(f"{path.name}.*"), key=lambda item: -int(item.suffix[1:] or 0)) + files
+    spans = []
+    for file in files:
+        if not file.exists():
+            continue
+        with file.open(encoding="utf-8") as handle:
+            spans.extend(json.loads(line) for line in handle if line.strip())
+    return spans
+
+
+# Runs and iterations aggregate under their kind; everything else under kind and name.
+def _label(item: dict) -> str:
+    return item["kind"] if item["kind"] in ("run", "agent_iteration") else f"{item['kind']} {item['name']}"
+
+
+# Time, self time, tokens and counts per call path (root label > child label > ...) across the given traces.
+def flame_breakdown(spans: list[dict]) -> tuple[dict[tuple, dict], float]:
+    children: dict[str, list[dict]] = {}
+    known = {item["span_id"] for item in spans}
+    roots = []
+    for item in spans:
+        if item["parent_id"] in known:
+            children.setdefault(item["parent_id"], []).append(item)
+        else:
+            roots.append(item)
+    paths: dict[tuple, dict] = {}
+
+    def visit(item: dict, prefix: tuple) -> int:
+        path = prefix + (_label(item),)
+        entry = paths.setdefault(path, {"seconds": 0.0, "self_seconds": 0.0, "count": 0, "tokens": 0, "errors": 0})
+        child_items = children.get(item["span_id"], [])
+        tokens = int(item["attributes"].get("tokens", 0) or 0) if item["kind"] == "llm_call" else 0
+        tokens += sum(visit(child, path) for child in child_items)
+        seconds = item["duration_ms"] / 1000
+        # Concurrent children (async tasks) can add up to more than their parent.
+        child_seconds = sum(child["duration_ms"] for child in child_items) / 1000
+        entry["seconds"] += seconds
+        entry["self_seconds"] += max(0.0, seconds - child_seconds)
+        entry["count"] += 1
+        entry["tokens"] += tokens
+        entry["errors"] += item["status"] == "error"
+        return tokens
+
+    for root in roots:
+        visit(root, ())
+    return paths, sum(root["duration_ms"] for root in roots) / 1000
+
+
+# Indented breakdown: each path under its parent, heaviest first, with a bar sized by share of total time.
+def format_breakdown(paths: dict[tuple, dict], total_seconds: float, max_depth: int | None = None) -> str:
+    lines = [f"{'span':<58} {'total':>9} {'self':>9} {'share':>6}  {'':<20} {'count':>5} {'tokens':>8}"]
+
+    def emit(prefix: tuple) -> None:
+        if max_depth is not None and len(prefix) >= max_depth:
+            return
+        below = [path for path in paths if len(path) == len(prefix) + 1 and path[: len(prefix)] == prefix]
+        for path in sorted(below, key=lambda item: -paths[item]["seconds"]):
+            entry = paths[path]
+            share = entry["seconds"] / total_seconds if total_seconds else 0.0
+            label = ("  " * len(prefix) + path[-1])[:58]
+            errors = f"  errors={entry['errors']}" if entry["errors"] else ""
+            lines.append(
+                f"{label:<58} {entry['seconds']:>8.2f}s {entry['self_seconds']:>8.2f}s {share:>6.1%}  "
+                f"{'█' * round(min(share, 1.0) * 20):<20} {entry['count']:>5} {entry['tokens']:>8}{errors}"
+            )
+            emit(path)
+
+    emit(())
+    return "\n".join(lines)
+
+
+# `bot-trace summarize`: where time and tokens went in the traced runs.
+def summarize(args: argparse.Namespace) -> None:
+    spans = load_spans(args.path, include_rotated=args.all_files)
+    roots = sorted((item for item in spans if item["parent_id"] is None), key=lambda item: item["start_ns"])
+    if args.trace:
+        trace_ids = {args.trace}
+    else:
+        trace_ids = {item["trace_id"] for item in (roots[-args.last :] if args.last else roots)}
+    selected = [item for item in spans if item["trace_id"] in trace_ids]
+    if not selected:
+        print(f"No spans found in {args.path}.")
+        return
+    paths, total_seconds = flame_breakdown(selected)
+    print(f"Traces: {len(trace_ids)} | spans: {len(selected)} | run time: {total_seconds:.2f}s")
+    print(format_breakdown(paths, total_seconds, args.depth))
+
+
+# CLI entrypoint for trace tooling.
+def trace_cli():
+    """Inspect local trace files."""
+    parser = argparse.ArgumentParser(prog="bot-trace", description="Inspect travel planner traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+    summary = commands.add_parser("summarize", help="Flame-style breakdown of time and tokens per span path")
+    summary.add_argument("path", nargs="?", default=str(trace_path()))
+    summary.add_argument("--trace", help="Only this trace id")
+    summary.add_argument("--last", type=int, default=0, help="Only the last N runs (default: every run in the file)")
+    summary.add_argument("--depth", type=int, default=None, help="Deepest span level to print")
+    summary.add_argument("--all-files", action="store_true", help="Include rotated files (<path>.1, <path>.2, ...)")
+    args = parser.parse_args()
+    if args.command == "summarize":
+        summarize(args)
+
+
+if __name__ == "__main__":
+    trace_cli()
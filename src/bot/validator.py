@@ -0,0 +1,210 @@
+import os
+import re
+
+from bot.plan import (
+    DEFAULT_ASSUMPTIONS,
+    DEFAULT_RISKS,
+    BudgetBreakdown,
+    BudgetLineItem,
+    DayBlock,
+    Itinerary,
+    TravelPlan,
+    ValidationResult,
+    format_amount,
+)
+
+BUDGET_CATEGORIES = ("Accommodation", "Food", "Transport", "Activities", "Contingency")
+
+AMOUNT = re.compile(r"(\d[\d,]*(?:\.\d+)?)(?:\s*(?:-|–|to)\s*(\d[\d,]*(?:\.\d+)?))?")
+DAY_HEADING = re.compile(r"(?im)^\s*(?:#{1,6}\s*|\*\*|-\s*)?Day\s+(\d+)\b[^\n]*$")
+DAY_SPEND = re.compile(r"(?i)estimated\s+(?:daily\s+)?spend[^:\n]*:\s*([^\n]+)")
+PLACEHOLDER = re.compile(r"<[^<>\n]{1,40}>|\bTBD\b|\[insert[^\]]*\]|lorem ipsum", re.IGNORECASE)
+SECTION_HEADING = re.compile(r"(?im)^\s*#{1,6}\s*(?:destination\s+overview|budget\s+breakdown|day-wise\s+itinerary)\s*:?\s*$")
+
+
+# The LLM auditor is skipped whenever the plan passes every deterministic check.
+def deterministic_validation_enabled() -> bool:
+    return os.getenv("DETERMINISTIC_VALIDATION", "1").lower() not in ("0", "false", "no")
+
+
+# Parse a money cell; ranges ("80-120") count as their upper bound so checks stay conservative.
+def parse_amount(text: str) -> float | None:
+    match = AMOUNT.search(text or "")
+    if not match:
+        return None
+    return float((match.group(2) or match.group(1)).replace(",", ""))
+
+
+# Budget table rows as {label: {"amount": float | None, "note": str, "text": str}}.
+def parse_budget_table(markdown: str) -> dict:
+    rows = {}
+    for line in (markdown or "").splitlines():
+        cells = [cell.strip() for cell in line.strip().strip("|").split("|")]
+        if len(cells) < 2 or not line.strip().startswith("|"):
+            continue
+        label = re.sub(r"[*_`]", "", cells[0]).strip()
+        if not label or set(label) <= set("-: ") or label.lower() == "category":
+            continue
+        rows[label.lower()] = {
+            "label": label,
+            "amount": parse_amount(cells[1]),
+            "text": cells[1],
+            "note": cells[2] if len(cells) > 2 else "",
+        }
+    return rows
+
+
+# Itinerary day blocks in order: [{"day": int, "text": str, "spend": float | None}].
+def parse_itinerary_days(markdown: str) -> list[dict]:
+    headings = list(DAY_HEADING.finditer(markdown or ""))
+    days = []
+    for index, heading in enumerate(headings):
+        end = headings[index + 1].start() if index + 1 < len(headings) else len(markdown)
+        block = markdown[heading.start():end]
+        spend = DAY_SPEND.search(block)
+        days.append(
+            {
+                "day": int(heading.group(1)),
+                "text": block.strip(),
+                "spend": parse_amount(spend.group(1)) if spend else None,
+            }
+        )
+    return days
+
+
+def _budget_status(total: float, budget: float) -> str:
+    if total < budget:
+        return "Under budget"
+    if total > budget:
+        return "Over budget"
+    return "At budget"
+
+
+def _close(a: float, b: float) -> bool:
+    return abs(a - b) <= max(1.0, 0.01 * max(abs(a), abs(b)))
+
+
+# Budget planner markdown as typed line items and totals (category rows in BUDGET_CATEGORIES order).
+def parse_budget(markdown: str) -> BudgetBreakdown:
+    rows = parse_budget_table(markdown)
+    totals = rows.get("grand total") or rows.get("total") or {}
+    return BudgetBreakdown(
+        items=[
+            BudgetLineItem(category=name, amount=rows[name.lower()]["amount"], note=rows[name.lower()]["note"])
+            for name in BUDGET_CATEGORIES
+            if rows.get(name.lower(), {}).get("amount") is not None
+        ],
+        subtotal=rows.get("subtotal", {}).get("amount"),
+        grand_total=totals.get("amount"),
+        total_note=totals.get("note", ""),
+        claimed_status=rows.get("budget status", {}).get("text", ""),
+    )
+
+
+def parse_itinerary(markdown: str) -> Itinerary:
+    return Itinerary(
+        days=[DayBlock(**day) for day in parse_itinerary_days(markdown) if day["day"] > 0]
+    )
+
+
+# Run every code-checkable rule from the validation checklist over a parsed plan.
+# `sources` holds the raw upstream outputs, scanned for unresolved placeholders.
+def validate_plan(plan: TravelPlan, sources: dict[str, str]) -> ValidationResult:
+    issues = []
+    budget = plan.budget
+    budget_cap = plan.budget_cap
+
+    categories = {name: budget.amount(name) for name in BUDGET_CATEGORIES}
+    missing = [name for name in BUDGET_CATEGORIES[:4] if categories[name] is None]
+    if missing:
+        issues.append(f"Budget table is missing amounts for: {', '.join(missing)}.")
+    grand_total = budget.grand_total
+    if grand_total is None:
+        issues.append("Budget table has no Grand Total row.")
+
+    category_sum = sum(item.amount for item in budget.items)
+    if grand_total is not None and not missing and not _close(category_sum, grand_total):
+        issues.append(
+            f"Budget categories sum to {format_amount(category_sum)} but Grand Total is {format_amount(grand_total)}."
+        )
+    if budget.subtotal is not None and not missing:
+        # Subtotal may be shown before or after contingency.
+        before_contingency = category_sum - (categories["Contingency"] or 0)
+        if not (_close(budget.subtotal, before_contingency) or _close(budget.subtotal, category_sum)):
+            issues.append(f"Subtotal {format_amount(budget.subtotal)} does not match the category amounts.")
+
+    status = None
+    if grand_total is not None and budget_cap > 0:
+        status = _budget_status(grand_total, budget_cap)
+        claimed = budget.claimed_status
+        if claimed and status.split()[0].lower() not in claimed.lower():
+            issues.append(f"Budget table claims '{claimed}' but Grand Total is {status.lower()}.")
+        if status == "Over budget":
+            issues.append("Grand Total exceeds the budget cap; concrete adjustments are needed.")
+
+    days = plan.itinerary.days
+    if [day.day for day in days] != list(range(1, plan.trip_days + 1)):
+        issues.append(f"Itinerary has {len(days)} day blocks; expected Day 1..Day {plan.trip_days}.")
+    missing_spend = [str(day.day) for day in days if day.spend is None]
+    if missing_spend:
+        issues.append(f"Missing estimated spend for day(s): {', '.join(missing_spend)}.")
+    daily_total = plan.itinerary.total_spend
+    if budget_cap > 0 and daily_total > budget_cap * 1.01:
+        issues.append(
+            f"Per-day spend sums to {format_amount(daily_total)}, above the {format_amount(budget_cap)} cap."
+        )
+
+    if not plan.overview:
+        issues.append("Destination overview is empty.")
+    for name, text in sources.items():
+        placeholder = PLACEHOLDER.search(text or "")
+        if placeholder:
+            issues.append(f"Unresolved placeholder in {name}: {placeholder.group(0)}")
+
+    return ValidationResult(
+        issues=issues,
+        budget_status=status,
+        assumptions=_summary_lines(r"assum|uncertain|may vary", plan.overview, *(day.text for day in days))
+        or DEFAULT_ASSUMPTIONS,
+        risks=_summary_lines(r"risk|caveat|closure|closed|weather|crowd|delay", plan.overview, *(day.text for day in days))
+        or DEFAULT_RISKS,
+    )
+
+
+# Parse the upstream task outputs once into a typed plan and validate it.
+def build_plan(research: str, budget_markdown: str, itinerary_markdown: str, inputs: dict) -> TravelPlan:
+    plan = TravelPlan(
+        destination=str(inputs.get("destination", "")),
+        travel_dates=str(inputs.get("travel_dates", "")),
+        budget_cap=float(inputs.get("budget") or 0),
+        currency=str(inputs.get("currency", "")),
+        trip_days=int(inputs.get("trip_days") or 0),
+        overview=strip_section_heading(research),
+        budget=parse_budget(budget_markdown),
+        itinerary=parse_itinerary(itinerary_markdown),
+        validation=ValidationResult(),
+    )
+    plan.validation = validate_plan(
+        plan, {"research": research, "budget": budget_markdown, "itinerary": itinerary_markdown}
+    )
+    return plan
+
+
+# Drop the section's own heading; the final document supplies its own.
+def strip_section_heading(markdown: str) -> str:
+    return SECTION_HEADING.sub("", markdown or "", count=1).strip()
+
+
+# Bullet lines from the upstream outputs that match `pattern`, for the validation summary.
+def _summary_lines(pattern: str, *texts: str, limit: int = 3) -> str:
+    found = []
+    for text in texts:
+        for line in (text or "").splitlines():
+            line = line.strip().lstrip("-*• ").strip()
+            if not line or line.startswith(("|", "#")) or not re.search(pattern, line, re.IGNORECASE):
+                continue
+            # Pipes would break the summary table cell.
+            line = line.replace("|", "/")
+            if line not in found:
+                found.append(line)
+    return "; ".join(found[:limit])
@@ -0,0 +1,54 @@
+import json
+import os
+import urllib.error
+import urllib.request
+from typing import Callable
+
+# Fields of the service's TripRequest body.
+TRIP_FIELDS = ("destination", "travel_dates", "budget", "preferences", "currency")
+
+
+def _open(url: str, body: dict | None = None, timeout: float = 10.0):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"} if data else {})
+    try:
+        return urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        # A worker that answered is reachable; its rejection is a plain error, not a connection failure.
+        detail = e.read().decode("utf-8", "replace")
+        raise Exception(f"Worker returned HTTP {e.code} for {url}: {detail}") from None
+
+
+def _get_json(url: str) -> dict:
+    with _open(url) as response:
+        return json.loads(response.read())
+
+
+# Queue a trip on a warm `serve` worker; raises OSError when nothing is listening at `base_url`.
+def submit_trip(base_url: str, inputs: dict) -> str:
+    body = {field: inputs[field] for field in TRIP_FIELDS}
+    with _open(f"{base_url.rstrip('/')}/trips", body) as response:
+        return json.loads(response.read())["job_id"]
+
+
+# Follow the job's event stream until it ends; returns the job status and its markdown report.
+def wait_for_trip(
+    base_url: str, job_id: str, section_callback: Callable[[str, str], None] | None = None
+) -> tuple[dict, str]:
+    base_url = base_url.rstrip("/")
+    # The service sends a keep-alive every 15s, so a silent stream means the worker is gone.
+    timeout = float(os.getenv("BOT_WORKER_TIMEOUT", "60"))
+    with _open(f"{base_url}/trips/{job_id}/events", timeout=timeout) as stream:
+        for line in stream:
+            if not line.startswith(b"data: "):
+                continue
+            event = json.loads(line[len(b"data: "):])
+            if event["event"] == "section_ready" and section_callback is not None:
+                section_callback(event["section"], event["markdown"])
+            if event["event"] in ("job_succeeded", "job_failed"):
+                break
+    job = _get_json(f"{base_url}/trips/{job_id}")
+    if job["status"] != "succeeded":
+        raise Exception(f"Worker job {job_id} {job['status']}: {job['error']}")
+    with _open(f"{base_url}/trips/{job_id}/report") as response:
+        return job, response.read().decode("utf-8")
@@ -0,0 +1,97 @@
+from crewai.tasks.task_output import TaskOutput
+
+from bot.context_compaction import compact_context
+from bot.crew import Bot
+
+INPUTS = {
+    "destination": "Lisbon, Portugal",
+    "travel_dates": "2026-05-01 to 2026-05-02",
+    "budget": 1000.0,
+    "preferences": "food",
+    "currency": "EUR",
+    "trip_days": 2,
+}
+# Category rows add up to 900, but the planner wrote a Grand Total of 1200 (and Over budget).
+BUDGET = """## Budget Breakdown
+| Category | Estimated Cost | Rationale |
+| --- | ---: | --- |
+| Accommodation | 400 | hostel |
+| Food | 200 | markets |
+| Transport | 100 | metro |
+| Activities | 100 | museums |
+| Contingency | 100 | buffer |
+| Grand Total | 1200 | Final total trip estimate |
+| Budget Status | Over budget | Compared with 1000 EUR |"""
+ITINERARY = """## Day-wise Itinerary
+### Day 1: 2026-05-01
+- Morning: Alfama walk from Graca viewpoint down to the cathedral and river
+- Estimated spend: 150 EUR
+### Day 2: 2026-05-02
+- Morning: Belem
+- Estimated spend: 150 EUR"""
+AUDITED = (
+    "# Travel Plan: Lisbon, Portugal\n"
+    + BUDGET.replace("| Grand Total | 1200 |", "| Grand Total | 900 |").replace("Over budget", "Under budget")
+    + "\n\n"
+    + ITINERARY
+    + "\n\n## Validation Summary\n| Check | Result |\n| --- | --- |\n| Budget status | Corrected Grand Total to 900 |\n"
+)
+
+
+def _output(name: str, raw: str) -> TaskOutput:
+    return TaskOutput(name=name, description=name, raw=raw, agent="test")
+
+
+# Bot whose upstream tasks finished with the over-total budget and ITINERARY.
+def _audited_bot(tmp_path, monkeypatch) -> Bot:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("MODEL", "openai/fake-model")
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("SERPER_OFFLINE", "1")
+    bot = Bot(inputs=INPUTS)
+    bot.destination_research_task().output = _output("destination_research_task", "## Destination Overview\n- Trams")
+    bot.budget_planner_task().output = _output("budget_planner_task", BUDGET)
+    bot.itinerary_designer_task().output = _output("itinerary_designer_task", ITINERARY)
+    assert bot._build_plan(INPUTS).validation.issues
+    return bot
+
+
+# The auditor only runs when the deterministic checks failed; its corrections must reach the report.
+def test_auditor_corrected_total_reaches_the_report(tmp_path, monkeypatch):
+    bot = _audited_bot(tmp_path, monkeypatch)
+
+    output = _output("validation_task", AUDITED)
+    bot._on_task_complete(output)
+
+    assert output.pydantic.budget.grand_total == 900
+    assert "| Total | 900" in output.raw
+    assert "1200" not in output.raw
+    assert "Corrected Grand Total to 900" in output.pydantic.validation.auditor_notes
+    assert bot.validation_issues == []
+
+
+# An auditor fed the compacted context echoes clipped "Day N | ... | spend" lines; the report keeps the real days.
+def test_compacted_auditor_days_do_not_replace_the_itinerary(tmp_path, monkeypatch):
+    bot = _audited_bot(tmp_path, monkeypatch)
+    summary = compact_context(
+        [_output("budget_planner_task", BUDGET), _output("itinerary_designer_task", ITINERARY)], token_budget=60
+    )
+    assert "Day 1 (2026-05-01)" in summary and "cathedral" not in summary
+    corrected = summary.replace("Grand Total: 1200", "Grand Total: 900")
+    audited = (
+        "# Travel Plan: Lisbon, Portugal\n"
+        + BUDGET.replace("| Grand Total | 1200 |", "| Grand Total | 900 |").replace("Over budget", "Under budget")
+        + "\n\n"
+        + corrected
+        + "\n\n## Validation Summary\n| Check | Result |\n| --- | --- |\n| Budget status | Corrected Grand Total to 900 |\n"
+    )
+
+    output = _output("validation_task", audited)
+    bot._on_task_complete(output)
+
+    plan = output.pydantic
+    assert plan.budget.grand_total == 900
+    assert [day.day for day in plan.itinerary.days] == [1, 2]
+    assert "down to the cathedral and river" in plan.itinerary.days[0].text
+    assert "down to the cathedral and river" in output.raw
+    assert bot.validation_issues == []
@@ -0,0 +1,145 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from types import SimpleNamespace
+
+from crewai.tasks.task_output import TaskOutput
+
+from bot import batch
+
+REQUESTS = 8
+
+
+class FakeCrew:
+    """Crew whose kickoff computes the one claimed task and publishes it, like a real run's task callback."""
+
+    def __init__(self, checkpoints, tasks: list[str]):
+        self.checkpoints = checkpoints
+        self.tasks = tasks
+
+    def kickoff(self, inputs: dict):
+        time.sleep(0.2)
+        output = TaskOutput(name="research_task", description="research", raw="overview", agent="researcher")
+        self.checkpoints.save("research_task", "fingerprint", output, tokens=10, seconds=0.2)
+        return SimpleNamespace(token_usage=None, pydantic=None)
+
+    # CrewAI's kickoff_async is kickoff on the loop's default executor.
+    async def kickoff_async(self, inputs: dict):
+        return await asyncio.to_thread(self.kickoff, inputs)
+
+
+class FakeBot:
+    """Bot whose crew build restores or claims a single shared task, as Bot._restore_checkpoints does."""
+
+    def __init__(self, checkpoints, **kwargs):
+        self.checkpoints = checkpoints
+
+    def build_crew(self) -> FakeCrew:
+        output = self.checkpoints.load("research_task", "fingerprint")
+        if output is None:
+            output = self.checkpoints.claim("research_task", "fingerprint")
+        return FakeCrew(self.checkpoints, [] if output is not None else ["research_task"])
+
+    def restored_output(self):
+        return SimpleNamespace(token_usage=None, pydantic=None)
+
+
+# More identical requests than the stock executor has threads on a 1-CPU box (cpu + 4): waiters on the
+# in-flight claim must not take every thread the claim holder needs to finish its kickoff.
+def test_identical_requests_beyond_executor_threads_do_not_deadlock(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TASK_MEMO_PATH", str(tmp_path / "tasks.sqlite"))
+    monkeypatch.setenv("TASK_FLIGHT_TTL_SECONDS", "20")
+    monkeypatch.setenv("PLAN_LIBRARY", "0")
+    monkeypatch.setattr(os, "cpu_count", lambda: 1)
+    monkeypatch.setattr(batch, "Bot", FakeBot)
+    monkeypatch.setattr(batch, "_credential_pool", lambda: None)
+    monkeypatch.setattr(batch, "_check_daily_quota", lambda inputs: None)
+    record = {"destination": "Lisbon, Portugal", "travel_dates": "2026-05-01 to 2026-05-05", "budget": 2000}
+    requests_path = tmp_path / "requests.jsonl"
+    requests_path.write_text("\n".join(json.dumps(record) for _ in range(REQUESTS)) + "\n", encoding="utf-8")
+    args = argparse.Namespace(
+        input=str(requests_path),
+        output_dir=str(tmp_path / "reports"),
+        results=str(tmp_path / "reports" / "results.jsonl"),
+        concurrency=REQUESTS,
+    )
+
+    started = time.perf_counter()
+    rows = asyncio.run(batch._run_batch_async(args))
+
+    assert time.perf_counter() - started < 10
+    assert [row["status"] for row in rows] == ["ok"] * REQUESTS
+    assert sum(1 for row in rows if row["shared_tasks"]) == REQUESTS - 1
+
+
+# A record with a malformed field is reported as an error row; the records around it still run.
+def test_malformed_record_does_not_stop_the_batch(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TASK_MEMO_PATH", str(tmp_path / "tasks.sqlite"))
+    monkeypatch.setenv("PLAN_LIBRARY", "0")
+    monkeypatch.setattr(batch, "Bot", FakeBot)
+    monkeypatch.setattr(batch, "_credential_pool", lambda: None)
+    monkeypatch.setattr(batch, "_check_daily_quota", lambda inputs: None)
+    records = [
+        {"destination": "Lisbon, Portugal", "budget": 2000},
+        {"destination": "Porto, Portugal", "budget": "abc"},
+        {"destination": "Faro, Portugal", "budget": None},
+        {"destination": "Braga, Portugal", "budget": 900},
+    ]
+    requests_path = tmp_path / "requests.jsonl"
+    requests_path.write_text("\n".join(json.dumps(record) for record in records) + "\n", encoding="utf-8")
+    args = argparse.Namespace(
+        input=str(requests_path),
+        output_dir=str(tmp_path / "reports"),
+        results=str(tmp_path / "reports" / "results.jsonl"),
+        concurrency=1,
+    )
+
+    rows = asyncio.run(batch._run_batch_async(args))
+
+    statuses = {row["request_id"]: row["status"] for row in rows}
+    assert statuses == {
+        "requests-00001": "ok",
+        "requests-00002": "error",
+        "requests-00003": "error",
+        "requests-00004": "ok",
+    }
+    written = (tmp_path / "reports" / "results.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(written) == len(records)
+
+
+# Default ids come from the file name and line; a repeated explicit id is rejected rather than run over the first.
+def test_request_ids_are_unique_within_and_across_batches(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TASK_MEMO_PATH", str(tmp_path / "tasks.sqlite"))
+    monkeypatch.setenv("PLAN_LIBRARY", "0")
+    monkeypatch.setattr(batch, "Bot", FakeBot)
+    monkeypatch.setattr(batch, "_credential_pool", lambda: None)
+    monkeypatch.setattr(batch, "_check_daily_quota", lambda inputs: None)
+    record = {"destination": "Lisbon, Portugal", "budget": 2000}
+    rows = []
+    for name, records in (
+        ("monday", [record, {**record, "request_id": "trip 7"}, {**record, "request_id": "trip_7"}]),
+        ("tuesday", [record]),
+    ):
+        requests_path = tmp_path / f"{name}.jsonl"
+        requests_path.write_text("\n".join(json.dumps(item) for item in records) + "\n", encoding="utf-8")
+        args = argparse.Namespace(
+            input=str(requests_path),
+            output_dir=str(tmp_path / "reports"),
+            results=str(tmp_path / "reports" / f"{name}.results.jsonl"),
+            concurrency=1,
+        )
+        rows.extend(asyncio.run(batch._run_batch_async(args)))
+
+    by_id = {row["request_id"]: row for row in rows}
+    assert {request_id: row["status"] for request_id, row in by_id.items()} == {
+        "monday-00001": "ok",
+        "trip_7": "ok",
+        "trip_7@3": "error",
+        "tuesday-00001": "ok",
+    }
+    assert by_id["trip_7@3"]["error"] == "Duplicate request_id 'trip_7' on line 3 (first used on line 2)."
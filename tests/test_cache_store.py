@@ -0,0 +1,69 @@
+import json
+import time
+
+from bot.cache_store import SQLiteCache
+
+
+# Expired entries are misses and are removed on read.
+def test_expired_entries_are_misses(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite", max_bytes=1024)
+    cache.set("fresh", "a", ttl_seconds=60)
+    cache.set("stale", "b", ttl_seconds=0.05)
+    time.sleep(0.1)
+
+    assert cache.get("fresh") == "a"
+    assert cache.get("stale") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1, "bytes": 1}
+
+
+# Past the size cap the least recently read entries go first.
+def test_size_cap_evicts_least_recently_used(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite", max_bytes=30)
+    for key in ("a", "b", "c"):
+        cache.set(key, "x" * 10, ttl_seconds=60)
+        time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+
+    cache.set("d", "x" * 10, ttl_seconds=60)
+
+    assert [key for key in "abcd" if cache.get(key) is not None] == ["a", "c", "d"]
+
+
+# One holder per claim until it is released or its TTL runs out.
+def test_claim_is_single_flight_until_release_or_expiry(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite", max_bytes=1024)
+
+    assert cache.claim("inflight:abc", "run-1", ttl_seconds=60)
+    assert not cache.claim("inflight:abc", "run-2", ttl_seconds=60)
+    cache.release("inflight:abc")
+    assert cache.claim("inflight:abc", "run-2", ttl_seconds=0.05)
+    time.sleep(0.1)
+    assert cache.claim("inflight:abc", "run-3", ttl_seconds=60)
+
+
+# Filling the memo past its cap must not drop a claim another run is waiting on.
+def test_size_eviction_keeps_held_claims(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite", max_bytes=20)
+    assert cache.claim("inflight:abc", "run-1", ttl_seconds=60)
+
+    for index in range(5):
+        cache.set(f"output-{index}", "x" * 10, ttl_seconds=60)
+
+    assert cache.stats()["bytes"] <= 20
+    assert not cache.claim("inflight:abc", "run-2", ttl_seconds=60)
+
+
+# update() folds into the live value; an expired value reads as None.
+def test_update_folds_into_the_live_value(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite", max_bytes=1024)
+
+    def add_one(value):
+        return json.dumps((json.loads(value) if value else 0) + 1)
+
+    cache.update("count", add_one, ttl_seconds=0.05)
+    time.sleep(0.1)
+    cache.update("count", add_one, ttl_seconds=60)
+    cache.update("count", add_one, ttl_seconds=60)
+
+    assert cache.get("count") == "2"
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+import requests
+
+from bot.execution_log import log
+from bot.tools import cached_serper_tool
+from bot.tools.cached_serper_tool import CachedSerperDevTool
+
+RESULTS = {"organic": [{"title": "Alfama", "link": "https://example.com/alfama", "snippet": "Old town"}]}
+
+
+class FakeResponse:
+    def __init__(self, status: int, body: bytes):
+        self.status_code = status
+        self.content = body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Server Error")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeSession:
+    def __init__(self, response: FakeResponse):
+        self.response = response
+        self.posts = []
+
+    def post(self, url, headers, json, timeout):
+        self.posts.append((url, json))
+        return self.response
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    monkeypatch.setenv("SERPER_CACHE_PATH", str(tmp_path / "serper.sqlite"))
+    monkeypatch.setenv("SERPER_API_KEY", "test")
+    monkeypatch.delenv("SERPER_OFFLINE", raising=False)
+    session = FakeSession(FakeResponse(200, json.dumps(RESULTS).encode()))
+    monkeypatch.setattr(cached_serper_tool, "http_session", lambda base_url: session)
+    return session
+
+
+# The first search goes to Serper with upstream's payload (empty gl/location/hl omitted, None kept);
+# a normalized repeat is served from the cache without a request.
+def test_search_misses_then_hits_the_cache(session):
+    tool = CachedSerperDevTool(base_url="https://serper.test", location=None)
+
+    first = tool._run(search_query="Lisbon food markets?")
+    second = tool._run(search_query="  lisbon FOOD markets ")
+
+    assert session.posts == [("https://serper.test/search", {"q": "Lisbon food markets?", "num": 10, "location": None})]
+    assert first["organic"][0]["title"] == "Alfama"
+    assert second == first
+
+
+# A different search type is a different cache entry.
+def test_search_type_is_part_of_the_key(session):
+    tool = CachedSerperDevTool(base_url="https://serper.test")
+
+    tool._run(search_query="Lisbon", search_type="search")
+    tool._run(search_query="Lisbon", search_type="news")
+
+    assert [url for url, _ in session.posts] == ["https://serper.test/search", "https://serper.test/news"]
+
+
+# HTTP errors are logged with the response body, re-raised and never cached.
+def test_failed_search_is_logged_and_not_cached(session, caplog):
+    session.response = FakeResponse(500, b"quota exceeded")
+    tool = CachedSerperDevTool(base_url="https://serper.test")
+    log.addHandler(caplog.handler)
+    try:
+        with pytest.raises(requests.exceptions.HTTPError):
+            tool._run(search_query="Lisbon")
+    finally:
+        log.removeHandler(caplog.handler)
+
+    assert "Error making request to Serper API: 500 Server Error\nResponse content: quota exceeded" in caplog.text
+    session.response = FakeResponse(200, json.dumps(RESULTS).encode())
+    tool._run(search_query="Lisbon")
+    assert len(session.posts) == 2
@@ -0,0 +1,106 @@
+import time
+
+import pytest
+from crewai.tasks.task_output import TaskOutput
+
+from bot import checkpoint
+from bot.checkpoint import CheckpointStore, task_fingerprint
+
+TASK = {"description": "Research {destination} for {travel_dates}", "expected_output": "Overview"}
+AGENT = {"role": "Researcher", "goal": "Know {destination}", "backstory": "Travels"}
+INPUTS = {"destination": "Lisbon", "travel_dates": "2026-05-01 to 2026-05-02", "budget": 1000.0}
+
+
+def _fingerprint(inputs=INPUTS, upstream=(), model="openai/fake-model") -> str:
+    return task_fingerprint("destination_research_task", TASK, AGENT, inputs, list(upstream), model=model)
+
+
+def _output(raw: str) -> TaskOutput:
+    return TaskOutput(name="destination_research_task", description="research", raw=raw, agent="test")
+
+
+@pytest.fixture(autouse=True)
+def stores(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+    monkeypatch.setenv("TASK_MEMO_PATH", str(tmp_path / "tasks.sqlite"))
+    monkeypatch.setattr(checkpoint, "FLIGHT_POLL_SECONDS", 0.01)
+
+
+# Same prompts, used inputs, model and upstream give the same fingerprint whatever the dict order.
+def test_fingerprint_is_stable():
+    reordered = dict(reversed(list(INPUTS.items())))
+
+    assert _fingerprint() == _fingerprint(reordered)
+    assert _fingerprint() == _fingerprint({**INPUTS, "budget": 2000.0})
+
+
+# Anything the task's prompt reads, its model or an upstream fingerprint changes the fingerprint.
+@pytest.mark.parametrize(
+    "changed",
+    [
+        {"inputs": {**INPUTS, "destination": "Porto"}},
+        {"model": "openai/other-model"},
+        {"upstream": ["abc"]},
+    ],
+)
+def test_fingerprint_changes_with_what_the_task_reads(changed):
+    assert _fingerprint(**changed) != _fingerprint()
+
+
+# `--resume` rebuilds the run from its own directory, even with the cross-run memo off.
+def test_resume_loads_saved_outputs_and_inputs(monkeypatch):
+    monkeypatch.setenv("TASK_MEMO", "0")
+    first = CheckpointStore("trip 1")
+    first.start(INPUTS)
+    first.save("destination_research_task", _fingerprint(), _output("## Overview"), tokens=120, seconds=1.5)
+
+    resumed = CheckpointStore("trip 1")
+
+    assert resumed.directory.name == "trip_1"
+    assert resumed.saved_inputs() == INPUTS
+    assert resumed.load("destination_research_task", _fingerprint()).raw == "## Overview"
+    assert resumed.savings() == {"restored_tasks": 1, "saved_tokens": 120, "saved_seconds": 1.5}
+
+
+# A changed input gives a new fingerprint, so neither the checkpoint nor the memo serves the stale output.
+def test_changed_input_invalidates_the_checkpoint():
+    store = CheckpointStore("trip-1")
+    store.save("destination_research_task", _fingerprint(), _output("## Lisbon"), tokens=120, seconds=1.5)
+
+    assert store.load("destination_research_task", _fingerprint({**INPUTS, "destination": "Porto"})) is None
+    assert CheckpointStore("trip-2").load("destination_research_task", _fingerprint()).raw == "## Lisbon"
+
+
+# A failed attempt releases its claims, so the next run computes the task instead of waiting on it.
+def test_failed_attempt_releases_its_claim(monkeypatch):
+    monkeypatch.setenv("TASK_FLIGHT_WAIT_SECONDS", "0")
+    failed, waiting = CheckpointStore("trip-1"), CheckpointStore("trip-2")
+    assert failed.claim("destination_research_task", _fingerprint()) is None
+
+    failed.release()
+
+    assert waiting.claim("destination_research_task", _fingerprint()) is None
+    assert waiting._claims == {f"inflight:{_fingerprint()}"}
+
+
+# A run that saves while others wait hands them its output.
+def test_waiting_run_reuses_the_published_output():
+    holder, waiting = CheckpointStore("trip-1"), CheckpointStore("trip-2")
+    holder.claim("destination_research_task", _fingerprint())
+    holder.save("destination_research_task", _fingerprint(), _output("## Shared"), tokens=120, seconds=1.5)
+
+    assert waiting.claim("destination_research_task", _fingerprint()).raw == "## Shared"
+    assert not waiting._claims
+
+
+# A claim held past TASK_FLIGHT_WAIT_SECONDS stops blocking: the waiter computes the task without owning it.
+def test_claim_wait_times_out(monkeypatch):
+    monkeypatch.setenv("TASK_FLIGHT_WAIT_SECONDS", "0.2")
+    holder, waiting = CheckpointStore("trip-1"), CheckpointStore("trip-2")
+    holder.claim("destination_research_task", _fingerprint())
+
+    started = time.monotonic()
+    assert waiting.claim("destination_research_task", _fingerprint()) is None
+
+    assert 0.2 <= time.monotonic() - started < 5
+    assert not waiting._claims and holder._claims
@@ -0,0 +1,58 @@
+from crewai.tasks.task_output import TaskOutput
+
+from bot.context_compaction import compact_context
+from bot.token_estimator import count_tokens
+
+RESEARCH = """## Destination Overview
+### Transport
+- Trams and the metro cover the centre (source: visitlisboa.com)
+- A 24h pass costs about 7 EUR https://www.carris.pt/fares
+### Food
+- Pasteis de nata from Belem are the classic pastry (via: timeout.com)
+- Pasteis de nata from Belem are the classic pastry (via: timeout.com)"""
+BUDGET = """| Category | Estimated Cost | Rationale |
+| --- | ---: | --- |
+| Accommodation | 400 | a long note on hostel choice that compaction leaves out |
+| Food | 200 | markets |
+| Grand Total | 600 | Final total trip estimate |"""
+ITINERARY = """### Day 1: 2026-05-01
+- Morning: Alfama walk from Graca viewpoint down to the cathedral and river
+- Evening: Fado dinner
+- Estimated spend: 150 EUR
+### Day 2: 2026-05-02
+- Morning: Belem tower and monastery
+- Estimated spend: 120 EUR"""
+
+
+def _outputs() -> list[TaskOutput]:
+    return [
+        TaskOutput(name=name, description=name, raw=raw, agent="test")
+        for name, raw in (
+            ("destination_research_task", RESEARCH),
+            ("budget_planner_task", BUDGET),
+            ("itinerary_designer_task", ITINERARY),
+        )
+    ]
+
+
+# With room to spare: one line per topic (duplicates dropped), budget rows without notes, clipped day lines.
+def test_summary_keeps_facts_sources_budget_and_days():
+    summary = compact_context(_outputs(), token_budget=10_000)
+
+    assert "- Transport: Trams and the metro cover the centre; A 24h pass costs about 7 EUR" in summary
+    assert summary.count("Pasteis de nata") == 1
+    assert "- visitlisboa.com" in summary and "- https://www.carris.pt/fares" in summary
+    assert "- Accommodation: 400" in summary and "hostel choice" not in summary
+    assert "- Day 1 (2026-05-01) | Alfama walk from Graca viewpoint down…; Fado dinner | spend 150" in summary
+    assert count_tokens(summary) < count_tokens(RESEARCH + BUDGET + ITINERARY)
+
+
+# Under a tight budget sources go first, then facts, then day activities; budget numbers always stay.
+def test_tight_budget_trims_sources_facts_then_activities():
+    summary = compact_context(_outputs(), token_budget=40)
+
+    assert "### Sources" not in summary and "### Key Facts" not in summary
+    assert "- Day 1 (2026-05-01) | spend 150" in summary
+    assert "- Day 2 (2026-05-02) | spend 120" in summary
+    for line in ("- Accommodation: 400", "- Food: 200", "- Grand Total: 600"):
+        assert line in summary
@@ -0,0 +1,93 @@
+import pytest
+
+from bot import llm, main
+from bot.credentials import Credential, CredentialPool
+from bot.llm import RateLimitedLLM
+from bot.quota import DailyQuotaExceeded
+from bot.rate_limiter import is_rate_limit_error
+
+MESSAGES = [{"role": "user", "content": "plan"}]
+
+
+class ProviderRateLimit(Exception):
+    status_code = 429
+
+
+def _pool(tmp_path, **limits) -> CredentialPool:
+    return CredentialPool(
+        [
+            Credential(name, "openai/fake-model", f"secret-{name}", ledger_path=tmp_path / f"{name}.sqlite", limits=limits)
+            for name in ("key-a", "key-b")
+        ]
+    )
+
+
+def _client(pool: CredentialPool) -> RateLimitedLLM:
+    return RateLimitedLLM(
+        model="openai/fake-model", api_key="unused", credentials=pool, agent_name="budget_planner", route={"tier": "reasoning"}
+    )
+
+
+@pytest.fixture(autouse=True)
+def no_completion_cache(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE", "0")
+
+
+# A 429 on the key with the most headroom pauses that key; the retry goes to the other one.
+def test_429_on_one_key_fails_over_to_the_other(tmp_path, monkeypatch):
+    pool = _pool(tmp_path)
+    calls = []
+
+    def provider(self, messages, tools=None, **kwargs):
+        calls.append(self._active.credential.name)
+        if self._active.credential.name == "key-a":
+            raise ProviderRateLimit("Rate limit reached for tokens")
+        return "answer"
+
+    monkeypatch.setattr(llm.LLM, "call", provider)
+
+    assert _client(pool).call(MESSAGES) == "answer"
+
+    key_a, key_b = pool.credentials
+    assert calls == ["key-a", "key-b"]
+    assert key_a.snapshot()["rate_limited"] == 1 and key_a.snapshot()["blocked_seconds"] > 0
+    # The rejected call is handed back to key A's shared window; key B booked the call that went through.
+    assert key_a.quota.usage()["window_requests"] == 0
+    assert key_b.quota.usage()["daily_requests"] == 1
+    assert pool.acquire(10)[0] is key_b
+
+
+# Every key spent for the day: the call fails at once without reaching the provider or pausing any key.
+def test_exhausted_pool_raises_without_retrying(tmp_path, monkeypatch):
+    pool = _pool(tmp_path, rpd=0)
+    monkeypatch.setattr(llm.LLM, "call", lambda self, messages, tools=None, **kwargs: pytest.fail("provider called"))
+
+    with pytest.raises(DailyQuotaExceeded, match="every configured credential") as raised:
+        _client(pool).call(MESSAGES)
+
+    assert not is_rate_limit_error(raised.value)
+    assert all(credential.snapshot()["rate_limited"] == 0 for credential in pool.credentials)
+
+
+# A spent daily quota ends the run on the first attempt instead of rebuilding the crew LLM_MAX_RETRIES times.
+def test_daily_quota_is_not_retried_as_a_rate_limit(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("LLM_MAX_RETRIES", "3")
+    monkeypatch.setattr(main, "_credential_pool", lambda: pytest.fail("retry backoff consulted the pool"))
+    builds = []
+
+    class SpentBot:
+        checkpoints = None
+
+        def build_crew(self):
+            builds.append(1)
+            try:
+                raise DailyQuotaExceeded("Daily LLM token limit reached: 500000/500000. Try again tomorrow or reduce token usage.")
+            except DailyQuotaExceeded as e:
+                # CrewAI may re-raise a task failure as a plain exception that still mentions the quota.
+                raise Exception(f"Task failed: {e}") from e
+
+    with pytest.raises(Exception, match="failed after retries: Task failed: Daily LLM token limit"):
+        main._kickoff_with_backoff({"destination": "Lisbon"}, bot=SpentBot())
+
+    assert builds == [1]
@@ -0,0 +1,51 @@
+import gzip
+
+import pytest
+
+from bot import tracing
+from bot.execution_log import log, setup_execution_log, stop_execution_log
+from bot.tracing import span
+
+
+@pytest.fixture
+def log_dir(tmp_path, monkeypatch):
+    # Another test may have started the process-wide writer on its own directory.
+    stop_execution_log()
+    monkeypatch.setenv("LOG_DIR", str(tmp_path))
+    monkeypatch.setenv("LOG_LEVEL", "INFO")
+    monkeypatch.setenv("LOG_MAX_MB", str(2048 / (1024 * 1024)))
+    monkeypatch.setenv("LOG_BACKUPS", "2")
+    monkeypatch.setattr(tracing, "_exporters", [])
+    setup_execution_log()
+    yield tmp_path
+    stop_execution_log()
+
+
+# Records go through the queue to execution.log and the run's own file, tagged with the run id in scope.
+def test_records_reach_the_shared_and_per_run_files(log_dir):
+    log.info("before any run")
+    with span("trip-1", "run"):
+        log.info("Run started: Lisbon")
+        log.debug("below LOG_LEVEL")
+        log.info("Run succeeded (900 tokens)", extra={"run_finished": True})
+    stop_execution_log()
+
+    shared = (log_dir / "execution.log").read_text(encoding="utf-8")
+    assert "INFO [-] before any run" in shared
+    assert "INFO [trip-1] Run started: Lisbon" in shared
+    assert "below LOG_LEVEL" not in shared
+    run_lines = (log_dir / "runs" / "trip-1.log").read_text(encoding="utf-8").splitlines()
+    assert [line.split("] ", 1)[1] for line in run_lines] == ["Run started: Lisbon", "Run succeeded (900 tokens)"]
+
+
+# Past LOG_MAX_MB the file rotates into gzip parts, keeping at most LOG_BACKUPS of them.
+def test_execution_log_rotates_into_gzip_parts(log_dir):
+    for index in range(60):
+        log.info("record %03d %s", index, "x" * 80)
+    stop_execution_log()
+
+    parts = sorted(path.name for path in log_dir.glob("execution.log*"))
+    assert parts == ["execution.log", "execution.log.1.gz", "execution.log.2.gz"]
+    newest_rotated = gzip.decompress((log_dir / "execution.log.1.gz").read_bytes()).decode("utf-8")
+    assert "record" in newest_rotated
+    assert "record 059" in (log_dir / "execution.log").read_text(encoding="utf-8")
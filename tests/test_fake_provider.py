@@ -0,0 +1,24 @@
+from fastapi.testclient import TestClient
+
+from bot.fake_provider import create_app
+from bot.rate_limiter import is_rate_limit_error
+
+
+def _complete(provider: TestClient, content: str, max_tokens: int):
+    body = {"model": "fake", "messages": [{"role": "user", "content": content}], "max_tokens": max_tokens}
+    return provider.post("/v1/chat/completions", json=body, headers={"authorization": "Bearer key-a"})
+
+
+# A call that can never fit the per-minute token budget is refused outright, not answered with a retryable 429.
+def test_request_larger_than_tpm_is_refused_without_retry_after(monkeypatch):
+    monkeypatch.setenv("FAKE_PROVIDER_TPM", "1000")
+    monkeypatch.setenv("FAKE_PROVIDER_LATENCY_MS", "0")
+    monkeypatch.setenv("FAKE_PROVIDER_TOOL_CALLS", "0")
+    provider = TestClient(create_app())
+
+    response = _complete(provider, "x" * 2000, max_tokens=600)
+
+    assert response.status_code == 413
+    assert "retry-after" not in response.headers
+    assert not is_rate_limit_error(Exception(response.json()["error"]["message"]))
+    assert _complete(provider, "x" * 2000, max_tokens=400).status_code == 200
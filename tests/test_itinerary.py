@@ -0,0 +1,58 @@
+from bot.crew import Bot
+from bot.itinerary import plan_itinerary_chunks, stitch_itinerary
+from bot.validator import parse_itinerary_days
+
+INPUTS = {
+    "destination": "Lisbon, Portugal",
+    "travel_dates": "2026-05-01 to 2026-05-16",
+    "budget": 1600.0,
+    "preferences": "food",
+    "currency": "EUR",
+    "trip_days": 16,
+}
+
+
+def _days(first: int, last: int) -> str:
+    return "\n".join(f"### Day {day}: 2026-01-01\n- Morning: walk {day}\n- Estimated spend: 100 EUR" for day in range(first, last + 1))
+
+
+# Consecutive day ranges covering the trip, each with its even share of the budget cap.
+def test_long_trip_splits_into_consecutive_day_ranges():
+    chunks = plan_itinerary_chunks(INPUTS, chunk_days=7)
+
+    assert [(chunk["first_day"], chunk["last_day"]) for chunk in chunks] == [(1, 7), (8, 14), (15, 16)]
+    assert [(chunk["first_date"], chunk["last_date"]) for chunk in chunks][1] == ("2026-05-08", "2026-05-14")
+    assert sum(chunk["budget_share"] for chunk in chunks) == 1600.0
+    assert plan_itinerary_chunks({**INPUTS, "trip_days": 7}, chunk_days=7) == []
+
+
+# A chunk that restarted at Day 1 is renumbered, days outside a chunk's range are dropped, dates are rewritten.
+def test_stitch_renumbers_and_drops_days_outside_each_chunk():
+    chunks = plan_itinerary_chunks(INPUTS, chunk_days=7)
+    outputs = [_days(1, 8), _days(1, 7), _days(15, 16)]
+
+    stitched = stitch_itinerary(outputs, chunks)
+
+    days = parse_itinerary_days(stitched)
+    assert [day["day"] for day in days] == list(range(1, 17))
+    assert all(day["spend"] == 100 for day in days)
+    assert "### Day 8: 2026-05-08\n- Morning: walk 1" in stitched
+    assert "### Day 16: 2026-05-16\n- Morning: walk 16" in stitched
+
+
+# A warm Bot rebuilds its chunk designers per crew without keeping the previous build's LLM clients.
+def test_rebuilding_a_chunked_crew_does_not_grow_the_llm_list(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("MODEL", "openai/fake-model")
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("SERPER_OFFLINE", "1")
+    bot = Bot(inputs=INPUTS)
+
+    bot.build_crew()
+    llm_count = len(bot._llms)
+    bot.build_crew()
+    bot.build_crew()
+
+    assert len(bot._itinerary_chunks) == 3
+    assert len(bot._llms) == llm_count
+    assert {id(chunk.agent.llm) for chunk in bot._itinerary_chunks} <= {id(llm) for llm in bot._llms}
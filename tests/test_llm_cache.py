@@ -0,0 +1,50 @@
+from bot import llm
+from bot.credentials import Credential, CredentialPool
+from bot.llm import RateLimitedLLM
+from bot.run_metrics import RunMetrics
+
+MESSAGES = [{"role": "system", "content": "You plan trips."}, {"role": "user", "content": "Two days in Lisbon"}]
+
+
+# A repeated identical call is answered from the completion cache: no provider call, no quota booked.
+def test_repeated_call_is_served_from_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_CACHE", "1")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm.sqlite"))
+    pool = CredentialPool([Credential("key-a", "openai/fake-model", "secret", ledger_path=tmp_path / "key-a.sqlite")])
+    metrics = RunMetrics()
+    client = RateLimitedLLM(
+        model="openai/fake-model", api_key="unused", credentials=pool, metrics=metrics, agent_name="budget_planner"
+    )
+    calls = []
+
+    def provider(self, messages, tools=None, **kwargs):
+        calls.append(messages)
+        self._track_token_usage_internal({"prompt_tokens": 40, "completion_tokens": 10, "total_tokens": 50})
+        return "Day 1: Alfama"
+
+    monkeypatch.setattr(llm.LLM, "call", provider)
+
+    first = client.call(MESSAGES)
+    booked = pool.credentials[0].quota.usage()
+    second = client.call([dict(message) for message in MESSAGES])
+
+    assert first == second == "Day 1: Alfama"
+    assert len(calls) == 1
+    assert booked["daily_requests"] == 1
+    assert pool.credentials[0].quota.usage() == booked
+    snapshot = metrics.snapshot()
+    assert snapshot["cache_hits"] == 1 and snapshot["cache_hit_tokens"] == 50
+    assert snapshot["agents"][0]["calls"] == 1
+
+
+# A different sampling setting misses the cache and reaches the provider.
+def test_changed_sampling_params_miss_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_CACHE", "1")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm.sqlite"))
+    calls = []
+    monkeypatch.setattr(llm.LLM, "call", lambda self, messages, tools=None, **kwargs: calls.append(1) or "answer")
+
+    RateLimitedLLM(model="openai/fake-model", api_key="unused", temperature=0.1).call(MESSAGES)
+    RateLimitedLLM(model="openai/fake-model", api_key="unused", temperature=0.7).call(MESSAGES)
+
+    assert len(calls) == 2
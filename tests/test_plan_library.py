@@ -0,0 +1,86 @@
+import pytest
+
+from bot.plan_library import PlanLibrary
+
+INPUTS = {
+    "destination": "Lisbon, Portugal",
+    "travel_dates": "2026-05-01 to 2026-05-02",
+    "budget": 1000.0,
+    "preferences": "food, museums, walking",
+    "currency": "EUR",
+    "trip_days": 2,
+}
+BUDGET = """| Category | Estimated Cost | Rationale |
+| --- | ---: | --- |
+| Accommodation | 400 | hostel |
+| Food | 200 | markets |
+| Transport | 100 | metro |
+| Activities | 100 | museums |
+| Contingency | 100 | buffer |
+| Grand Total | 900 | Final total trip estimate |
+| Budget Status | Under budget | Compared with the cap |"""
+ITINERARY = """### Day 1: 2026-05-01
+- Morning: Alfama walk
+- Estimated spend: 150 EUR
+### Day 2: 2026-05-02
+- Morning: Belem
+- Estimated spend: 150 EUR"""
+
+
+def _entry(raw: str) -> dict:
+    return {"fingerprint": "f", "tokens": 100, "output": {"raw": raw}}
+
+
+@pytest.fixture
+def library(tmp_path):
+    library = PlanLibrary(tmp_path / "plans.sqlite", max_plans=100)
+    library.add(
+        INPUTS,
+        {
+            "destination_research_task": _entry("## Destination Overview\n- Trams"),
+            "budget_planner_task": _entry(BUDGET),
+            "itinerary_designer_task": _entry(ITINERARY),
+            "validation_task": _entry("final report"),
+        },
+    )
+    return library
+
+
+# Same trip, preferences reworded, budget within tolerance and the stored plan still passes: served whole.
+def test_near_duplicate_is_served_as_a_plan(library):
+    match = library.match({**INPUTS, "budget": 950.0, "preferences": "Walking, food and museums"})
+
+    assert match["tier"] == "plan"
+    assert match["similarity"] == 0.75
+    assert set(match["tasks"]) == {"destination_research_task", "budget_planner_task", "itinerary_designer_task"}
+
+
+# A budget outside the tolerance (or one the stored total breaks) reuses research and itinerary only.
+@pytest.mark.parametrize("budget", [1300.0, 880.0])
+def test_different_budget_reruns_the_budget_stage(library, budget):
+    match = library.match({**INPUTS, "budget": budget})
+
+    assert match["tier"] == "budget"
+    assert set(match["tasks"]) == {"destination_research_task", "itinerary_designer_task"}
+
+
+# Other places, dates or tastes, and budgets past PLAN_LIBRARY_BUDGET_RANGE, get no match.
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"destination": "Lisbon, Portugal, Ohio"},
+        {"travel_dates": "2026-06-01 to 2026-06-02"},
+        {"currency": "USD"},
+        {"preferences": "nightlife, beaches"},
+        {"budget": 2500.0},
+    ],
+)
+def test_unrelated_requests_do_not_match(library, changes):
+    assert library.match({**INPUTS, **changes}) is None
+
+
+# Re-adding the same normalized request replaces the older plan.
+def test_same_request_replaces_the_stored_plan(library):
+    library.add({**INPUTS, "destination": "  lisbon,  PORTUGAL "}, {"budget_planner_task": _entry(BUDGET)})
+
+    assert library.stats() == {"plans": 1}
@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from bot.quota import QuotaStore
+
+LIMITS = {"rpm": 3, "tpm": 1000, "rpd": 5, "tpd": 10_000}
+
+
+# Calls are admitted until the sliding window is full, then told how long until the oldest one expires.
+def test_full_window_returns_a_wait_instead_of_a_reservation(tmp_path):
+    store = QuotaStore(tmp_path / "quota.sqlite", window_seconds=60)
+    for _ in range(3):
+        reservation, wait_seconds = store.reserve(1, 100, LIMITS)
+        assert reservation is not None and wait_seconds == 0.0
+
+    reservation, wait_seconds = store.reserve(1, 100, LIMITS)
+
+    assert reservation is None
+    assert 59 < wait_seconds <= 60
+    assert store.usage() == {"daily_requests": 3, "daily_tokens": 300, "window_requests": 3, "window_tokens": 300}
+
+
+# A token-heavy call waits on the token cap even while requests are left.
+def test_token_cap_limits_the_window(tmp_path):
+    store = QuotaStore(tmp_path / "quota.sqlite", window_seconds=60)
+    store.reserve(1, 900, LIMITS)
+
+    reservation, wait_seconds = store.reserve(1, 200, LIMITS)
+
+    assert reservation is None and wait_seconds > 0
+    assert store.reserve(1, 100, LIMITS)[0] is not None
+
+
+# Daily limits fail fast; `window=False` still enforces them.
+def test_daily_limits_raise(tmp_path):
+    store = QuotaStore(tmp_path / "quota.sqlite", window_seconds=60)
+    store.reserve(5, 100, LIMITS, window=False)
+
+    with pytest.raises(Exception, match="Daily LLM request limit reached: 5/5"):
+        store.reserve(1, 100, LIMITS, window=False)
+    with pytest.raises(Exception, match="Daily LLM token limit reached"):
+        store.reserve(0, 10_001, LIMITS, window=False)
+
+
+# Settling swaps the estimate for actual usage; the window can be charged on a different basis than the day.
+def test_settle_replaces_the_estimate(tmp_path):
+    store = QuotaStore(tmp_path / "quota.sqlite", window_seconds=60)
+    reservation, _ = store.reserve(1, 500, LIMITS)
+
+    store.settle(reservation, 1, 320, window_tokens=400)
+    store.settle(None, 1, 50)
+
+    assert store.usage() == {"daily_requests": 2, "daily_tokens": 370, "window_requests": 2, "window_tokens": 450}
+
+
+# Concurrent reservations never overshoot the window.
+def test_concurrent_reservations_respect_the_window(tmp_path):
+    store = QuotaStore(tmp_path / "quota.sqlite", window_seconds=60)
+    limits = {**LIMITS, "rpm": 10, "rpd": 100}
+    admitted = []
+
+    def reserve():
+        for _ in range(5):
+            reservation, _ = store.reserve(1, 10, limits)
+            if reservation is not None:
+                admitted.append(reservation)
+
+    threads = [threading.Thread(target=reserve) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(admitted) == 10
+    assert store.usage()["window_requests"] == 10
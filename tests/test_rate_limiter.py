@@ -0,0 +1,109 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from bot.fake_provider import create_app
+from bot.rate_limiter import SharedRateLimiter, parse_reset_seconds
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    monkeypatch.setenv("FAKE_PROVIDER_RPM", "2")
+    monkeypatch.setenv("FAKE_PROVIDER_TPM", "1000")
+    monkeypatch.setenv("FAKE_PROVIDER_LATENCY_MS", "0")
+    monkeypatch.setenv("FAKE_PROVIDER_TOOL_CALLS", "0")
+    return TestClient(create_app())
+
+
+def _complete(provider: TestClient, max_tokens: int = 10):
+    body = {"model": "fake", "messages": [{"role": "user", "content": "plan"}], "max_tokens": max_tokens}
+    return provider.post("/v1/chat/completions", json=body, headers={"authorization": "Bearer key-a"})
+
+
+@pytest.mark.parametrize(
+    ("value", "seconds"),
+    [("7.66s", 7.66), ("2m59.56s", 179.56), ("120ms", 0.12), ("1h2m", 3720.0), ("30", 30.0), ("", None)],
+)
+def test_parse_reset_seconds(value, seconds):
+    assert parse_reset_seconds(value) == pytest.approx(seconds)
+
+
+# Another client spent the key: the provider's 429 pauses every caller for its retry-after and halves the rate.
+def test_provider_429_pauses_for_retry_after_and_halves_the_rate(provider):
+    assert _complete(provider).status_code == 200
+    assert _complete(provider).status_code == 200
+    # Sized so the halved local request bucket refills well before the provider's 30s retry-after.
+    limiter = SharedRateLimiter(rpm=30, tpm=1000)
+    reservation = limiter.acquire(20)
+
+    response = _complete(provider)
+    wait_seconds = limiter.on_rate_limited(reservation, response.headers)
+
+    assert response.status_code == 429
+    assert wait_seconds == pytest.approx(float(response.headers["retry-after"]))
+    assert limiter.wait_seconds(20) == pytest.approx(wait_seconds, abs=0.05)
+    snapshot = limiter.snapshot()
+    assert snapshot["rate_scale"] == 0.5
+    assert snapshot["rate_limited"] == 1
+    assert snapshot["blocked_seconds"] == pytest.approx(wait_seconds, abs=0.05)
+    # The rejected call's reservation goes back to the (now halved) token bucket.
+    assert reservation["tokens"] == 0
+    assert snapshot["tokens_available"] == 500
+
+
+# Without provider hints the backoff doubles per consecutive 429; each success recovers the rate additively.
+def test_backoff_doubles_and_successes_recover_the_rate():
+    limiter = SharedRateLimiter(rpm=30, tpm=6000, recovery_step=0.05, backoff_seconds=2.0)
+
+    assert [limiter.on_rate_limited() for _ in range(3)] == [2.0, 4.0, 8.0]
+    assert limiter.snapshot()["rate_scale"] == 0.12
+    for _ in range(4):
+        limiter.on_rate_limited()
+    assert limiter.snapshot()["rate_scale"] == 0.1
+
+    for _ in range(8):
+        limiter.settle({"tokens": 0}, 0)
+    assert limiter.snapshot()["rate_scale"] == 0.5
+    assert limiter.on_rate_limited() == 2.0
+    for _ in range(40):
+        limiter.settle({"tokens": 0}, 0)
+    assert limiter.snapshot()["rate_scale"] == 1.0
+
+
+# The provider's remaining/reset headers correct the local buckets, and the wait to refill matches its reset.
+def test_provider_headers_set_the_remaining_tokens_and_wait(provider):
+    response = _complete(provider, max_tokens=900)
+    limiter = SharedRateLimiter(rpm=2, tpm=1000)
+
+    limiter.observe_headers(response.headers)
+
+    remaining = int(response.headers["x-ratelimit-remaining-tokens"])
+    assert limiter.snapshot()["tokens_available"] == remaining
+    assert limiter.wait_seconds(1000) == pytest.approx(
+        parse_reset_seconds(response.headers["x-ratelimit-reset-tokens"]), abs=0.05
+    )
+
+
+# An exhausted provider window blocks until its reset, LiteLLM's "llm_provider-" prefix included.
+def test_exhausted_window_blocks_until_reset():
+    limiter = SharedRateLimiter(rpm=30, tpm=6000)
+
+    limiter.observe_headers({"llm_provider-x-ratelimit-remaining-requests": "0", "llm_provider-x-ratelimit-reset-requests": "2m3.5s"})
+
+    assert limiter.wait_seconds(0) == pytest.approx(123.5, abs=0.05)
+    assert limiter.snapshot()["requests_available"] == 0
+
+
+# acquire() blocks just long enough for the request bucket to refill, and the wait shows up as throttling.
+def test_acquire_waits_for_the_bucket_to_refill():
+    limiter = SharedRateLimiter(rpm=2, tpm=1000, window_seconds=0.5)
+    limiter.acquire(10)
+    limiter.acquire(10)
+
+    started = time.monotonic()
+    limiter.acquire(10)
+
+    assert 0.2 <= time.monotonic() - started < 0.5
+    assert limiter.snapshot()["requests_available"] == 0
+    assert limiter.snapshot()["throttled_seconds"] >= 0.2
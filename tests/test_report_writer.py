@@ -0,0 +1,98 @@
+import json
+
+from crewai.tasks.task_output import TaskOutput
+
+from bot import llm
+from bot.crew import Bot
+from bot.report_writer import ReportWriter
+from bot.validator import build_plan
+
+INPUTS = {
+    "destination": "Lisbon, Portugal",
+    "travel_dates": "2026-05-01 to 2026-05-02",
+    "budget": 1000.0,
+    "preferences": "food",
+    "currency": "EUR",
+    "trip_days": 2,
+    "request_id": "trip-1",
+}
+RESEARCH = "## Destination Overview\n- Trams run late"
+BUDGET = """## Budget Breakdown
+| Category | Estimated Cost | Rationale |
+| --- | ---: | --- |
+| Accommodation | 400 | hostel |
+| Food | 200 | markets |
+| Transport | 100 | metro |
+| Activities | 100 | museums |
+| Contingency | 100 | buffer |
+| Grand Total | 1200 | Final total trip estimate |
+| Budget Status | Over budget | Compared with 1000 EUR |"""
+ITINERARY = """## Day-wise Itinerary
+### Day 1: 2026-05-01
+- Morning: Alfama walk
+- Estimated spend: 150 EUR
+### Day 2: 2026-05-02
+- Morning: Belem
+- Estimated spend: 150 EUR"""
+AUDITED = (
+    BUDGET.replace("| Grand Total | 1200 |", "| Grand Total | 900 |").replace("Over budget", "Under budget")
+    + "\n\n## Validation Summary\n| Check | Result |\n| --- | --- |\n| Budget status | Corrected Grand Total to 900 |"
+)
+
+
+def _output(name: str, raw: str) -> TaskOutput:
+    return TaskOutput(name=name, description=name, raw=raw, agent="test")
+
+
+# Sections land in document order with pending ones marked; the final document and its JSON sibling replace them.
+def test_sections_then_final_report_are_written_atomically(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPORT_FORMATS", "markdown,json")
+    path = tmp_path / "reports" / "trip.md"
+    sections = []
+    writer = ReportWriter(path, INPUTS, on_section=lambda heading, body: sections.append(heading))
+
+    writer.on_task_output(_output("budget_planner_task", BUDGET))
+    partial = path.read_text(encoding="utf-8")
+    assert "## Destination Overview\n_Pending._" in partial
+    assert "| Grand Total | 1200 |" in partial
+
+    plan = build_plan(RESEARCH, BUDGET.replace("1200", "900").replace("Over", "Under"), ITINERARY, INPUTS)
+    writer.write_final("# Final", plan)
+    writer.on_task_output(_output("itinerary_designer_task", ITINERARY))
+
+    assert path.read_text(encoding="utf-8") == "# Final"
+    assert json.loads(path.with_suffix(".json").read_text(encoding="utf-8"))["budget"]["grand_total"] == 900
+    assert sections == ["Budget Breakdown", "Final Report"]
+    assert writer.stats()["final"] and not list(path.parent.glob(".*.tmp"))
+
+
+# An executed LLM audit is rendered from the typed plan into the run's report; CrewAI must not then
+# overwrite it (or ./output.md) with the auditor's raw text.
+def test_audited_report_survives_the_validation_task(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("MODEL", "openai/fake-model")
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("SERPER_OFFLINE", "1")
+    monkeypatch.setenv("LLM_CACHE", "0")
+    monkeypatch.setattr(llm.LLM, "call", lambda self, messages, tools=None, **kwargs: f"Thought: done\nFinal Answer: {AUDITED}")
+    bot = Bot(inputs=INPUTS, output_file="reports/{request_id}.md")
+    research_task, budget_task, itinerary_task = (
+        bot.destination_research_task(),
+        bot.budget_planner_task(),
+        bot.itinerary_designer_task(),
+    )
+    research_task.output = _output("destination_research_task", RESEARCH)
+    budget_task.output = _output("budget_planner_task", BUDGET)
+    itinerary_task.output = _output("itinerary_designer_task", ITINERARY)
+    bot.report_writer = ReportWriter(bot._report_path(), INPUTS)
+    validation_task = bot.validation_task()
+    validation_task.callback = bot._on_task_complete
+
+    validation_task.execute_sync(agent=bot.validation_agent(), context=AUDITED)
+
+    report = (tmp_path / "reports" / "trip-1.md").read_text(encoding="utf-8")
+    assert validation_task.output_file is None
+    assert not (tmp_path / "output.md").exists()
+    assert report == validation_task.output.raw
+    assert "| Total | 900" in report and "| Grand Total |" not in report
+    assert "Corrected Grand Total to 900" in report
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+from crewai.tasks.task_output import TaskOutput
+from fastapi.testclient import TestClient
+
+from bot import credentials, llm
+from bot.main import _build_inputs_from_record
+from bot.plan_library import get_plan_library
+from bot.service import create_app
+
+REQUEST = {"destination": "Lisbon, Portugal", "travel_dates": "2026-05-01 to 2026-05-02", "budget": 1000, "currency": "EUR"}
+RESEARCH = "## Destination Overview\n- Trams run late"
+BUDGET = """## Budget Breakdown
+| Category | Estimated Cost | Rationale |
+| --- | ---: | --- |
+| Accommodation | 400 | hostel |
+| Food | 200 | markets |
+| Transport | 100 | metro |
+| Activities | 100 | museums |
+| Contingency | 100 | buffer |
+| Grand Total | 900 | Final total trip estimate |
+| Budget Status | Under budget | Compared with 1000 EUR |"""
+ITINERARY = """## Day-wise Itinerary
+### Day 1: 2026-05-01
+- Morning: Alfama walk
+- Estimated spend: 150 EUR
+### Day 2: 2026-05-02
+- Morning: Belem
+- Estimated spend: 150 EUR"""
+
+
+def _entry(name: str, raw: str) -> dict:
+    output = TaskOutput(name=name, description=name, raw=raw, agent="test")
+    return {"fingerprint": "stored", "tokens": 100, "output": output.model_dump(mode="json")}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name, value in {
+        "MODEL": "openai/fake-model",
+        "GROQ_API_KEY": "test",
+        "SERPER_OFFLINE": "1",
+        "LLM_CACHE": "0",
+        "SERVICE_WORKERS": "1",
+        "SERVICE_REPORTS_DIR": str(tmp_path / "reports"),
+        "CHECKPOINT_DIR": str(tmp_path / "checkpoints"),
+        "TASK_MEMO_PATH": str(tmp_path / "tasks.sqlite"),
+        "PLAN_LIBRARY_PATH": str(tmp_path / "plans.sqlite"),
+        "TOKEN_CALIBRATION_PATH": str(tmp_path / "calibration.sqlite"),
+    }.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setattr(credentials, "_credential_pool", None)
+    # Answer rather than raise: a failing call inside CrewAI's async task thread would stall the run.
+    llm_calls = []
+    monkeypatch.setattr(
+        llm.LLM, "call", lambda self, messages, tools=None, **kwargs: llm_calls.append(self.agent_name) or "Final Answer: -"
+    )
+    # A stored plan for the same trip answers the request in code, so the whole service path runs offline.
+    get_plan_library().add(
+        _build_inputs_from_record(REQUEST, "stored"),
+        {
+            "overview_research_task": _entry("overview_research_task", RESEARCH),
+            "destination_research_task": _entry("destination_research_task", RESEARCH),
+            "budget_planner_task": _entry("budget_planner_task", BUDGET),
+            "itinerary_designer_task": _entry("itinerary_designer_task", ITINERARY),
+        },
+    )
+    with TestClient(create_app()) as client:
+        yield client
+    assert llm_calls == []
+
+
+def _wait_until_done(client: TestClient, job_id: str) -> dict:
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        status = client.get(f"/trips/{job_id}").json()
+        if status["status"] in ("succeeded", "failed"):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+# Submit, poll the status, then fetch the report the warm Bot wrote to reports/<job_id>.md.
+def test_submit_status_report(client, tmp_path):
+    submitted = client.post("/trips", json=REQUEST)
+    assert submitted.status_code == 202
+    job_id = submitted.json()["job_id"]
+
+    status = _wait_until_done(client, job_id)
+    report = client.get(f"/trips/{job_id}/report")
+
+    assert status["status"] == "succeeded", status["error"]
+    assert status["library_match"]["tier"] == "plan"
+    assert report.status_code == 200 and report.headers["X-Report-Complete"] == "true"
+    assert report.text == (tmp_path / "reports" / f"{job_id}.md").read_text(encoding="utf-8")
+    assert "Alfama walk" in report.text
+    assert client.get(f"/trips/{job_id}/report", params={"format": "json"}).json()["budget"]["grand_total"] == 900
+
+
+# Unknown jobs and report formats are rejected.
+def test_unknown_job_and_format(client):
+    job_id = client.post("/trips", json=REQUEST).json()["job_id"]
+
+    assert client.get("/trips/missing").status_code == 404
+    assert client.get(f"/trips/{job_id}/report", params={"format": "pdf"}).status_code == 422
@@ -0,0 +1,97 @@
+import pytest
+
+from bot.token_estimator import (
+    _raw_agent_estimates,
+    calibration,
+    estimate_run_usage,
+    raw_run_estimate,
+    record_run_usage,
+)
+
+INPUTS = {
+    "destination": "Lisbon, Portugal",
+    "travel_dates": "2026-05-01 to 2026-05-03",
+    "budget": 1000.0,
+    "preferences": "food",
+    "currency": "EUR",
+    "trip_days": 3,
+    "current_year": "2026",
+}
+
+
+@pytest.fixture(autouse=True)
+def calibration_store(tmp_path, monkeypatch):
+    monkeypatch.setenv("TOKEN_CALIBRATION_PATH", str(tmp_path / "calibration.sqlite"))
+    monkeypatch.setenv("MODEL", "openai/fake-model")
+
+
+def _usage(ratio: float) -> dict:
+    raw = raw_run_estimate(INPUTS)
+    return {
+        "prompt_tokens": int(raw["prompt_tokens"] * ratio),
+        "completion_tokens": int(raw["completion_tokens"] * ratio),
+        "successful_requests": raw["requests"],
+    }
+
+
+# The first observed run replaces the default ratios; later runs move them by CALIBRATION_ALPHA.
+def test_calibration_learns_from_observed_runs():
+    assert calibration()["samples"] == 0
+
+    record_run_usage(INPUTS, _usage(2.0))
+    assert calibration()["prompt_ratio"] == pytest.approx(2.0, rel=0.01)
+
+    record_run_usage(INPUTS, _usage(1.0))
+    learned = calibration()
+    assert learned["prompt_ratio"] == pytest.approx(1.7, rel=0.01)
+    assert learned["requests_ratio"] == 1.0
+    assert learned["samples"] == 2
+
+
+# Calibrated estimates scale with the learned ratios; outliers are clamped to CALIBRATION_BOUNDS.
+def test_estimate_uses_clamped_ratios():
+    baseline = estimate_run_usage(INPUTS)["total_tokens"]
+
+    record_run_usage(INPUTS, _usage(10.0))
+
+    assert calibration()["prompt_ratio"] == 4.0
+    assert estimate_run_usage(INPUTS)["total_tokens"] == pytest.approx(4 * baseline, rel=0.01)
+
+
+# Runs without provider-reported usage (cache hits, restored tasks) teach nothing.
+def test_runs_without_usage_are_ignored():
+    record_run_usage(INPUTS, {"prompt_tokens": 0, "completion_tokens": 0, "successful_requests": 0})
+
+    assert calibration()["samples"] == 0
+
+
+# Ratios are learned per model that answered each agent's calls, and estimates apply each agent's planned model.
+def test_calibration_is_keyed_by_the_model_each_agent_used(monkeypatch):
+    monkeypatch.setenv("FAST_MODEL", "openai/fast-model")
+    raw = _raw_agent_estimates(INPUTS)
+    baseline = estimate_run_usage(INPUTS)["total_tokens"]
+    agents = [
+        {
+            "agent": agent,
+            "model": "openai/fast-model" if agent == "destination_researcher" else "openai/big-model",
+            "calls": estimate["requests"],
+            "prompt_tokens": estimate["prompt_tokens"] * (3 if agent == "destination_researcher" else 1),
+            "completion_tokens": estimate["completion_tokens"],
+        }
+        for agent, estimate in raw.items()
+    ]
+    usage = {
+        "prompt_tokens": sum(entry["prompt_tokens"] for entry in agents),
+        "completion_tokens": sum(entry["completion_tokens"] for entry in agents),
+        "successful_requests": sum(entry["calls"] for entry in agents),
+        "agents": agents,
+    }
+
+    record_run_usage(INPUTS, usage)
+
+    assert calibration(model="openai/fast-model")["prompt_ratio"] == pytest.approx(3.0, rel=0.01)
+    assert calibration(model="openai/big-model")["prompt_ratio"] == pytest.approx(1.0, rel=0.01)
+    assert calibration()["samples"] == 0
+    # Estimates go by planned model: both fast-tier agents (researcher and validator) now get the 3x prompt ratio.
+    fast_prompt = sum(raw[agent]["prompt_tokens"] for agent in ("destination_researcher", "validation_agent"))
+    assert estimate_run_usage(INPUTS)["total_tokens"] == pytest.approx(baseline + 2 * fast_prompt, abs=2)
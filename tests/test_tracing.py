@@ -0,0 +1,74 @@
+import pytest
+
+from bot import tracing
+from bot.tracing import (
+    JsonlSpanExporter,
+    current_run_id,
+    enter_agent_iteration,
+    flame_breakdown,
+    load_spans,
+    record_span,
+    span,
+)
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "_exporters", [JsonlSpanExporter(path, max_bytes=1024 * 1024, backups=2)])
+    return path
+
+
+# A run's spans nest run > task > agent iteration > LLM call > quota wait, with tool calls under the iteration.
+def test_span_tree_is_exported_with_parents_and_attributes(trace_file):
+    with span("trip-1", "run", destination="Lisbon") as run_span:
+        with span("budget_planner_task", "task", agent="budget_planner"):
+            enter_agent_iteration(0)
+            with span("budget_planner", "llm_call", model="openai/fake-model") as call_span:
+                record_span("key-a", "quota_wait", 0.25, tokens_reserved=900)
+                call_span.set(tokens=120)
+                assert current_run_id() == "trip-1"
+            with span("search", "tool_call", query="Lisbon hostels"):
+                pass
+            enter_agent_iteration(1)
+            with pytest.raises(ValueError):
+                with span("budget_planner", "llm_call"):
+                    raise ValueError("bad answer")
+        run_span.set(attempts=1)
+
+    spans = load_spans(trace_file)
+    by_kind = {}
+    for item in spans:
+        by_kind.setdefault(item["kind"], []).append(item)
+    run, task = by_kind["run"][0], by_kind["task"][0]
+    first, second = sorted(by_kind["agent_iteration"], key=lambda item: item["attributes"]["iteration"])
+    ok_call, failed_call = by_kind["llm_call"]
+
+    assert {item["trace_id"] for item in spans} == {run["trace_id"]}
+    assert run["parent_id"] is None and run["attributes"] == {"destination": "Lisbon", "attempts": 1}
+    assert task["parent_id"] == run["span_id"]
+    assert first["parent_id"] == second["parent_id"] == task["span_id"]
+    assert ok_call["parent_id"] == by_kind["tool_call"][0]["parent_id"] == first["span_id"]
+    assert by_kind["quota_wait"][0]["parent_id"] == ok_call["span_id"]
+    assert by_kind["quota_wait"][0]["duration_ms"] == 250.0
+    assert ok_call["attributes"] == {"model": "openai/fake-model", "tokens": 120}
+    assert failed_call["parent_id"] == second["span_id"]
+    assert failed_call["status"] == "error" and failed_call["error"] == "ValueError: bad answer"
+    assert by_kind["tool_call"][0]["attributes"] == {"query": "Lisbon hostels"}
+
+    paths, _ = flame_breakdown(spans)
+    assert paths[("run",)]["tokens"] == 120
+    assert paths[("run", "task budget_planner_task", "agent_iteration")]["count"] == 2
+
+
+# Past max_bytes the file rotates to <path>.1; rotated files can be read back oldest first.
+def test_jsonl_exporter_rotates(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = JsonlSpanExporter(path, max_bytes=200, backups=1)
+
+    for index in range(3):
+        exporter.export([{"span_id": str(index), "parent_id": None, "padding": "x" * 100}])
+
+    assert [item["span_id"] for item in load_spans(path)] == ["2"]
+    assert [item["span_id"] for item in load_spans(path, include_rotated=True)] == ["1", "2"]
+    assert not path.with_name("traces.jsonl.2").exists()
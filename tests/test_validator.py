@@ -0,0 +1,78 @@
+from bot.validator import build_plan, parse_budget_table
+
+INPUTS = {
+    "destination": "Lisbon, Portugal",
+    "travel_dates": "2026-05-01 to 2026-05-02",
+    "budget": 1000.0,
+    "currency": "EUR",
+    "trip_days": 2,
+}
+RESEARCH = "## Destination Overview\n- Trams run late (assumption: summer timetable)"
+BUDGET = """## Budget Breakdown
+| Category | Estimated Cost | Rationale |
+| --- | ---: | --- |
+| **Accommodation** | 400 | hostel |
+| Food | 150-200 | markets |
+| Transport | 100 | metro |
+| Activities | 100 | museums |
+| Contingency | 100 | buffer |
+| Subtotal | 800 | before contingency |
+| Grand Total | 900 | Final total trip estimate |
+| Budget Status | Under budget | Compared with 1000 EUR |"""
+ITINERARY = """## Day-wise Itinerary
+### Day 1: 2026-05-01
+- Morning: Alfama walk
+- Estimated spend: 150 EUR
+### Day 2: 2026-05-02
+- Morning: Belem
+- Estimated spend: 150 EUR"""
+
+
+# Markup is stripped from labels, ranges count as their upper bound and the header row is skipped.
+def test_parse_budget_table_rows():
+    rows = parse_budget_table(BUDGET)
+
+    assert "category" not in rows
+    assert rows["accommodation"]["label"] == "Accommodation"
+    assert rows["food"] == {"label": "Food", "amount": 200.0, "text": "150-200", "note": "markets"}
+    assert rows["budget status"]["amount"] is None
+
+
+# A consistent plan passes every check, so the LLM auditor can be skipped.
+def test_consistent_plan_has_no_issues():
+    plan = build_plan(RESEARCH, BUDGET, ITINERARY, INPUTS)
+
+    assert plan.validation.issues == []
+    assert plan.validation.budget_status == "Under budget"
+    assert plan.budget.grand_total == 900
+    assert [day.spend for day in plan.itinerary.days] == [150, 150]
+    assert "summer timetable" in plan.validation.assumptions
+
+
+# Each inconsistency the auditor would have to fix is reported.
+def test_inconsistent_plan_lists_every_issue():
+    budget = BUDGET.replace("| Grand Total | 900 |", "| Grand Total | 1200 |").replace("| Subtotal | 800 |", "| Subtotal | 500 |")
+    itinerary = ITINERARY.split("### Day 2")[0].replace("Alfama walk", "<activity>")
+
+    issues = build_plan(RESEARCH, budget, itinerary, INPUTS).validation.issues
+
+    assert issues == [
+        "Budget categories sum to 900 but Grand Total is 1,200.",
+        "Subtotal 500 does not match the category amounts.",
+        "Budget table claims 'Under budget' but Grand Total is over budget.",
+        "Grand Total exceeds the budget cap; concrete adjustments are needed.",
+        "Itinerary has 1 day blocks; expected Day 1..Day 2.",
+        "Unresolved placeholder in itinerary: <activity>",
+    ]
+
+
+# Missing categories, totals and day spends are issues too.
+def test_missing_budget_rows_and_day_spend():
+    budget = "\n".join(line for line in BUDGET.splitlines() if not line.startswith(("| Food", "| Grand Total")))
+    itinerary = ITINERARY.replace("- Estimated spend: 150 EUR\n### Day 2", "### Day 2")
+
+    issues = build_plan(RESEARCH, budget, itinerary, INPUTS).validation.issues
+
+    assert "Budget table is missing amounts for: Food." in issues
+    assert "Budget table has no Grand Total row." in issues
+    assert "Missing estimated spend for day(s): 1." in issues
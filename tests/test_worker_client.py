@@ -0,0 +1,115 @@
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from bot import main
+from bot.worker_client import submit_trip, wait_for_trip
+
+REPORT = "# Travel Plan: Lisbon\n\n## Budget Breakdown\n- Food: 200"
+
+
+class FakeWorker(BaseHTTPRequestHandler):
+    """The slice of the `serve` API the worker client uses, for one job that succeeds or fails."""
+
+    submitted: list[dict] = []
+    status = "succeeded"
+
+    def _send(self, code: int, body: bytes, content_type: str = "application/json") -> None:
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if body["budget"] <= 0:
+            return self._send(422, b'{"detail": "budget must be positive"}')
+        self.submitted.append(body)
+        self._send(202, json.dumps({"job_id": "job-1", "status": "queued"}).encode())
+
+    def do_GET(self):
+        if self.path == "/trips/job-1/events":
+            events = [
+                {"event": "job_started"},
+                {"event": "section_ready", "section": "Budget Breakdown", "markdown": "- Food: 200"},
+                {"event": f"job_{self.status}"},
+            ]
+            frames = "".join(f"event: {event['event']}\ndata: {json.dumps(event)}\n\n" for event in events)
+            return self._send(200, frames.encode(), "text/event-stream")
+        if self.path == "/trips/job-1":
+            job = {"job_id": "job-1", "status": self.status, "error": "quota spent", "token_usage": None}
+            return self._send(200, json.dumps(job).encode())
+        if self.path == "/trips/job-1/report":
+            return self._send(200, REPORT.encode(), "text/markdown")
+        self._send(404, b'{"detail": "Unknown job"}')
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    monkeypatch.setattr(FakeWorker, "submitted", [])
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeWorker)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def _closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+INPUTS = {
+    "destination": "Lisbon",
+    "travel_dates": "2026-05-01 to 2026-05-02",
+    "budget": 1000.0,
+    "preferences": "food",
+    "currency": "EUR",
+    "request_id": "local-only",
+}
+
+
+# Only the TripRequest fields are sent; sections stream to the callback and the report comes back at the end.
+def test_submit_and_wait_for_a_trip(worker):
+    sections = []
+
+    job_id = submit_trip(worker, INPUTS)
+    job, report = wait_for_trip(worker, job_id, section_callback=lambda heading, markdown: sections.append(heading))
+
+    assert FakeWorker.submitted == [{key: INPUTS[key] for key in ("destination", "travel_dates", "budget", "preferences", "currency")}]
+    assert sections == ["Budget Breakdown"]
+    assert job["status"] == "succeeded" and report == REPORT
+
+
+# A rejection is an error from a reachable worker; a failed job raises with its error; nothing listening is an OSError.
+def test_worker_errors(worker, monkeypatch):
+    with pytest.raises(Exception, match="HTTP 422"):
+        submit_trip(worker, {**INPUTS, "budget": 0})
+
+    monkeypatch.setattr(FakeWorker, "status", "failed")
+    with pytest.raises(Exception, match="job-1 failed: quota spent"):
+        wait_for_trip(worker, "job-1")
+
+    with pytest.raises(OSError):
+        submit_trip(f"http://127.0.0.1:{_closed_port()}", INPUTS)
+
+
+# `run` hands a fresh trip to the worker without checking the local quota; the worker enforces it.
+def test_run_hands_off_without_a_local_quota_check(worker, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("BOT_WORKER_URL", worker)
+    monkeypatch.setattr("sys.argv", ["bot", "--destination", "Lisbon", "--budget", "1000"])
+    monkeypatch.setattr(main, "_check_daily_quota", lambda inputs: pytest.fail("CLI checked the quota"))
+
+    main.run()
+
+    assert FakeWorker.submitted[0]["destination"] == "Lisbon"
+    assert (tmp_path / "output.md").read_text(encoding="utf-8") == REPORT